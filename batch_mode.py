@@ -0,0 +1,610 @@
+import json
+import os
+import shutil
+import time
+import uuid
+
+# Offline batch mode: instead of one chat call per article, the summarize, tag
+# and theme-mapping prompts are written to JSONL request files, submitted to a
+# provider batch API (or the local stand-in), polled until complete and then
+# ingested back into the pipeline artifacts by article Id.
+
+BATCH_DIR = "results/batch"
+KINDS = ("summarize", "tag", "themes")
+DEFAULT_BACKENDS = {"summarize": "groq", "tag": "groq", "themes": "openai"}
+# Times the failed requests of a job are resubmitted before they are given up on
+MAX_RETRIES = 2
+
+
+def request_line(custom_id, model, messages, temperature, json_mode=False):
+    """
+    Build one line of a batch request file in the OpenAI/Groq batch format.
+
+    Args:
+        custom_id (str): Identifier echoed back in the result line
+        model (str): Model name
+        messages (list): Chat messages
+        temperature (float): Sampling temperature
+        json_mode (bool): Request a JSON object reply if the model supports it
+
+    Returns:
+        dict: Request line
+    """
+    from llm_router import NO_JSON_MODE_MODELS
+
+    body = {"model": model, "messages": messages, "temperature": temperature}
+    if json_mode and model not in NO_JSON_MODE_MODELS:
+        body["response_format"] = {"type": "json_object"}
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": body,
+    }
+
+
+def build_requests(kind, df, batch_size=20, existing_themes=None, model_name="gpt-4"):
+    """
+    Build batch request lines for one kind of prompt.
+
+    Summaries and keywords get one request per article, identified as
+    "<kind>-<Id>". Theme mapping gets one request per batch of summaries,
+    identified as "themes-<batch index>"; every batch is seeded with the same
+    existing themes because batch requests cannot see each other's output.
+
+    Args:
+        kind (str): "summarize", "tag" or "themes"
+        df (DataFrame): Articles with 'Id' and 'Content' (or 'Summary' for themes)
+        batch_size (int): Articles per theme-mapping request
+        existing_themes (list): Theme names to seed theme mapping with
+        model_name (str): Model used for theme mapping
+
+    Returns:
+        list: Request lines
+    """
+    if kind == "summarize":
+        from llm_router import SUMMARY_MODEL
+        from summarizer import build_summary_messages
+        return [
+            request_line(f"summarize-{row['Id']}", SUMMARY_MODEL, build_summary_messages(row["Content"]), 0.2)
+            for _, row in df.iterrows()
+        ]
+
+    if kind == "tag":
+        from llm_router import TAG_MODEL
+        from tagger import build_tag_messages
+        return [
+            request_line(f"tag-{row['Id']}", TAG_MODEL, build_tag_messages(row["Content"]), 0.1)
+            for _, row in df.iterrows()
+        ]
+
+    if kind == "themes":
+        from cluster import batch_articles, get_theme_mapping_prompt, prepare_articles_from_df
+        articles, _ = prepare_articles_from_df(df)
+        prompt_template = get_theme_mapping_prompt()
+        existing_json = json.dumps(sorted(existing_themes or []), indent=2)
+        lines = []
+        for batch_idx, batch in enumerate(batch_articles(articles, batch_size=batch_size)):
+            new_json = json.dumps([a.model_dump(exclude_none=True) for a in batch], indent=2, ensure_ascii=False)
+            prompt = prompt_template.format(existing_themes_json=existing_json, new_articles_json=new_json)
+            lines.append(request_line(f"themes-{batch_idx}", model_name, [{"role": "user", "content": prompt}], 0.1,
+                                      json_mode=True))
+        return lines
+
+    raise Exception(f"Unknown batch kind '{kind}'")
+
+
+def write_requests(lines, path):
+    """
+    Write request lines to a JSONL file.
+
+    Args:
+        lines (list): Request lines
+        path (str): Output file path
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    print(f"Wrote {len(lines)} batch requests to {path}")
+
+
+def read_results(path):
+    """
+    Read a batch result file into a custom_id → reply text mapping.
+
+    Args:
+        path (str): Result JSONL file
+
+    Returns:
+        dict: custom_id → reply text, or None for failed requests
+    """
+    results = {}
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            body = response.get("body") or {}
+            if record.get("error") or response.get("status_code") != 200 or not body.get("choices"):
+                results[record["custom_id"]] = None
+                continue
+            results[record["custom_id"]] = body["choices"][0]["message"]["content"].strip()
+    return results
+
+
+class ProviderBatchBackend:
+    """
+    Batch backend for the OpenAI and Groq batch APIs, which share the same
+    files/batches interface.
+
+    Args:
+        provider (str): "openai" or "groq"
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._client = None
+
+    def client(self):
+        """
+        Create the provider client on first use.
+
+        Returns:
+            Client object for the provider
+        """
+        if self._client is None:
+            from utils import load_env_variables
+            env_vars = load_env_variables(validate=False)
+            if self.provider == "groq":
+                from groq import Groq
+                self._client = Groq(api_key=env_vars["groq_api_key"])
+            else:
+                from openai import OpenAI
+                self._client = OpenAI(api_key=env_vars["openai_api_key"])
+        return self._client
+
+    def submit(self, path):
+        """
+        Upload a request file and start a batch job.
+
+        Args:
+            path (str): Request JSONL file
+
+        Returns:
+            str: Job id
+        """
+        with open(path, "rb") as f:
+            uploaded = self.client().files.create(file=f, purpose="batch")
+        job = self.client().batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return job.id
+
+    def status(self, job_id):
+        """
+        Get the status of a batch job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            str: Provider status, e.g. "in_progress", "completed" or "failed"
+        """
+        return self.client().batches.retrieve(job_id).status
+
+    def download(self, job_id, path):
+        """
+        Download the result file of a completed batch job.
+
+        Args:
+            job_id (str): Job id
+            path (str): Where to write the result JSONL
+        """
+        job = self.client().batches.retrieve(job_id)
+        if not job.output_file_id:
+            raise Exception(f"Batch {job_id} has no output file (status: {job.status})")
+        content = self.client().files.content(job.output_file_id)
+        with open(path, "wb") as f:
+            f.write(content.read())
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for a provider batch API, for tests and offline runs.
+    A submitted job is "processed" on its first status poll by answering each
+    request with `responder`.
+
+    Args:
+        directory (str): Directory holding the local jobs
+        responder (callable): Function of a request body returning the reply text;
+            defaults to echoing the start of the last message
+    """
+
+    def __init__(self, directory=os.path.join(BATCH_DIR, "local"), responder=None):
+        self.directory = directory
+        self.responder = responder or (lambda body: body["messages"][-1]["content"][:300])
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def submit(self, path):
+        """
+        Copy a request file into a new local job.
+
+        Args:
+            path (str): Request JSONL file
+
+        Returns:
+            str: Job id
+        """
+        job_id = f"local-{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._job_dir(job_id), exist_ok=True)
+        shutil.copyfile(path, os.path.join(self._job_dir(job_id), "input.jsonl"))
+        with open(os.path.join(self._job_dir(job_id), "status"), "w") as f:
+            f.write("in_progress")
+        return job_id
+
+    def status(self, job_id):
+        """
+        Get the status of a local job, processing it on the first poll.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            str: "completed" or "failed"
+        """
+        status_path = os.path.join(self._job_dir(job_id), "status")
+        if not os.path.exists(status_path):
+            return "failed"
+        with open(status_path, "r") as f:
+            status = f.read().strip()
+        if status == "in_progress":
+            self._process(job_id)
+            status = "completed"
+        return status
+
+    def _process(self, job_id):
+        """
+        Answer every request of a job and write the result file.
+
+        Args:
+            job_id (str): Job id
+        """
+        with open(os.path.join(self._job_dir(job_id), "input.jsonl"), "r") as src, \
+                open(os.path.join(self._job_dir(job_id), "output.jsonl"), "w") as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                try:
+                    content = self.responder(request["body"])
+                    result = {
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+                        "error": None,
+                    }
+                except Exception as e:
+                    result = {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+                dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+        with open(os.path.join(self._job_dir(job_id), "status"), "w") as f:
+            f.write("completed")
+
+    def download(self, job_id, path):
+        """
+        Copy the result file of a processed local job.
+
+        Args:
+            job_id (str): Job id
+            path (str): Where to write the result JSONL
+        """
+        shutil.copyfile(os.path.join(self._job_dir(job_id), "output.jsonl"), path)
+
+
+def get_batch_backend(name, batch_dir=BATCH_DIR):
+    """
+    Create a batch backend by name.
+
+    Args:
+        name (str): "openai", "groq" or "local"
+        batch_dir (str): Directory holding batch files (used by the local backend)
+
+    Returns:
+        Batch backend object
+    """
+    if name == "local":
+        return LocalBatchBackend(os.path.join(batch_dir, "local"))
+    if name in ("openai", "groq"):
+        return ProviderBatchBackend(name)
+    raise Exception(f"Unknown batch backend '{name}'")
+
+
+def load_jobs(batch_dir=BATCH_DIR):
+    """
+    Load the record of submitted batch jobs.
+
+    Args:
+        batch_dir (str): Directory holding batch files
+
+    Returns:
+        dict: kind → job record
+    """
+    path = os.path.join(batch_dir, "jobs.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_jobs(jobs, batch_dir=BATCH_DIR):
+    """
+    Save the record of submitted batch jobs.
+
+    Args:
+        jobs (dict): kind → job record
+        batch_dir (str): Directory holding batch files
+    """
+    os.makedirs(batch_dir, exist_ok=True)
+    with open(os.path.join(batch_dir, "jobs.json"), "w") as f:
+        json.dump(jobs, f, indent=2)
+
+
+def submit_batch(kind, df, backend_name=None, batch_dir=BATCH_DIR, **request_options):
+    """
+    Write the request file for one kind of prompt and submit it.
+
+    Args:
+        kind (str): "summarize", "tag" or "themes"
+        df (DataFrame): Articles to build requests for
+        backend_name (str): Batch backend; defaults to the provider of the kind's model
+        batch_dir (str): Directory holding batch files
+        **request_options: Extra build_requests arguments
+
+    Returns:
+        str: Job id
+    """
+    backend_name = backend_name or DEFAULT_BACKENDS[kind]
+    request_path = os.path.join(batch_dir, f"{kind}_requests.jsonl")
+    write_requests(build_requests(kind, df, **request_options), request_path)
+
+    job_id = get_batch_backend(backend_name, batch_dir).submit(request_path)
+    jobs = load_jobs(batch_dir)
+    jobs[kind] = {"job_id": job_id, "backend": backend_name, "requests": request_path, "submitted_at": time.time()}
+    save_jobs(jobs, batch_dir)
+    print(f"Submitted {kind} batch {job_id} to {backend_name}")
+    return job_id
+
+
+def wait_for_batch(kind, batch_dir=BATCH_DIR, poll_interval=60, timeout=None):
+    """
+    Poll a submitted job until it finishes and download its results.
+
+    Args:
+        kind (str): "summarize", "tag" or "themes"
+        batch_dir (str): Directory holding batch files
+        poll_interval (float): Seconds between status checks
+        timeout (float): Give up after this many seconds; None waits indefinitely
+
+    Returns:
+        str: Path of the downloaded result file
+    """
+    jobs = load_jobs(batch_dir)
+    if kind not in jobs:
+        raise Exception(f"No {kind} batch has been submitted")
+    job = jobs[kind]
+    backend = get_batch_backend(job["backend"], batch_dir)
+
+    start = time.monotonic()
+    while True:
+        status = backend.status(job["job_id"])
+        if status == "completed":
+            break
+        if status in ("failed", "expired", "cancelled"):
+            raise Exception(f"{kind} batch {job['job_id']} ended with status '{status}'")
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise Exception(f"Timed out waiting for {kind} batch {job['job_id']} (status: {status})")
+        print(f"{kind} batch {job['job_id']} is {status}; checking again in {poll_interval}s")
+        time.sleep(poll_interval)
+
+    result_path = os.path.join(batch_dir, f"{kind}_results.jsonl")
+    backend.download(job["job_id"], result_path)
+    print(f"Downloaded {kind} batch results to {result_path}")
+    return result_path
+
+
+def resubmit_failed(kind, custom_ids, batch_dir=BATCH_DIR):
+    """
+    Submit the requests of failed custom_ids again as a new job of the same
+    kind, on the same backend.
+
+    Args:
+        kind (str): "summarize", "tag" or "themes"
+        custom_ids (list): custom_ids whose requests failed
+        batch_dir (str): Directory holding batch files
+
+    Returns:
+        str: Job id of the retry
+    """
+    jobs = load_jobs(batch_dir)
+    job = jobs[kind]
+    retries = job.get("retries", 0) + 1
+    wanted = set(custom_ids)
+    with open(job["requests"], "r") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    retry_path = os.path.join(batch_dir, f"{kind}_retry{retries}_requests.jsonl")
+    write_requests([line for line in lines if line["custom_id"] in wanted], retry_path)
+
+    job_id = get_batch_backend(job["backend"], batch_dir).submit(retry_path)
+    job.update({"job_id": job_id, "retries": retries, "submitted_at": time.time()})
+    save_jobs(jobs, batch_dir)
+    print(f"Resubmitted {len(wanted)} failed {kind} request(s) as batch {job_id}")
+    return job_id
+
+
+def collect_batch(kind, batch_dir=BATCH_DIR, poll_interval=60, timeout=None, max_retries=MAX_RETRIES):
+    """
+    Download the results of a job, merged with the results of the job it
+    retried, and resubmit the requests that failed.
+
+    Failed requests are resubmitted up to `max_retries` times. Without a
+    timeout the retries are waited for; otherwise collection stops after
+    resubmitting and the next collect picks up the retry.
+
+    Args:
+        kind (str): "summarize", "tag" or "themes"
+        batch_dir (str): Directory holding batch files
+        poll_interval (float): Seconds between status checks
+        timeout (float): Give up waiting after this many seconds; None waits indefinitely
+        max_retries (int): Resubmissions of failed requests per job
+
+    Returns:
+        Tuple containing:
+        - custom_id → reply text, or None for requests that still failed
+        - True if the results are final, False if a retry is still pending
+    """
+    collected_path = os.path.join(batch_dir, f"{kind}_collected.json")
+    while True:
+        results = read_results(wait_for_batch(kind, batch_dir, poll_interval, timeout))
+        job = load_jobs(batch_dir)[kind]
+        if job.get("retries"):
+            with open(collected_path, "r") as f:
+                collected = json.load(f)
+            collected.update({cid: text for cid, text in results.items() if text is not None})
+            results = collected
+
+        failed = sorted(cid for cid, text in results.items() if text is None)
+        if not failed:
+            return results, True
+        if job.get("retries", 0) >= max_retries:
+            print(f"Warning: {len(failed)} {kind} request(s) still failed after {max_retries} retries")
+            return results, True
+
+        with open(collected_path, "w") as f:
+            json.dump(results, f, ensure_ascii=False)
+        resubmit_failed(kind, failed, batch_dir)
+        if timeout is not None:
+            print(f"Collect the {kind} batch again once the retry completes")
+            return results, False
+
+
+def ingest_summaries(df, results):
+    """
+    Add batch summaries to the articles by Id.
+
+    Args:
+        df (DataFrame): Cleaned articles with an 'Id' column
+        results (dict): custom_id → reply text
+
+    Returns:
+        DataFrame: DataFrame with a 'Summary' column
+    """
+    missing = 0
+    summaries = []
+    for article_id in df["Id"]:
+        summary = results.get(f"summarize-{article_id}")
+        if summary is None:
+            missing += 1
+            summary = "Error summarizing content: missing from batch results"
+        summaries.append(summary)
+    if missing:
+        print(f"Warning: {missing} articles have no summary in the batch results")
+    df["Summary"] = summaries
+    return df
+
+
+def ingest_keywords(df, results):
+    """
+    Build the link → keywords mapping from batch results by Id.
+
+    Args:
+        df (DataFrame): Cleaned articles with 'Id' and 'Link' columns
+        results (dict): custom_id → reply text
+
+    Returns:
+        dict: Mapping of article links to their keywords, in row order
+    """
+    from tagger import parse_keywords
+
+    document_to_tags = {}
+    for _, row in df.iterrows():
+        text = results.get(f"tag-{row['Id']}")
+        document_to_tags[row["Link"]] = parse_keywords(text) if text else ["Error extracting keywords"]
+    return document_to_tags
+
+
+def merge_similar_themes(article_to_theme, threshold=0.75):
+    """
+    Merge near-duplicate theme names. The batches of a theme job cannot see
+    each other's output, so they coin variants of the same theme ("Vaccine
+    Safety", "Vaccines and Safety"). Names are compared by their stemmed
+    terms, and each group of similar names takes the name with the most
+    articles.
+
+    Args:
+        article_to_theme (dict): Article ID → theme name
+        threshold (float): Minimum Jaccard similarity of two names' terms to merge them
+
+    Returns:
+        dict: Article ID → merged theme name
+    """
+    from pregroup import UnionFind, jaccard
+    from textutils import normalize_terms
+
+    sizes = {}
+    for theme in article_to_theme.values():
+        sizes[theme] = sizes.get(theme, 0) + 1
+    terms = {theme: set(normalize_terms(theme)) for theme in sizes}
+
+    # Only names sharing a term can be similar
+    by_term = {}
+    for theme, theme_terms in terms.items():
+        for term in theme_terms:
+            by_term.setdefault(term, []).append(theme)
+    union_find = UnionFind(sorted(sizes))
+    for names in by_term.values():
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                if jaccard(terms[a], terms[b]) >= threshold:
+                    union_find.union(a, b)
+
+    renamed = {}
+    for group in union_find.groups():
+        name = min(group, key=lambda theme: (-sizes[theme], len(theme), theme))
+        for theme in group:
+            renamed[theme] = name
+    merged = len(sizes) - len(set(renamed.values()))
+    if merged:
+        print(f"Merged {merged} near-duplicate theme name(s)")
+    return {article_id: renamed[theme] for article_id, theme in article_to_theme.items()}
+
+
+def ingest_themes(results):
+    """
+    Merge batch theme-mapping replies into theme groups, folding together
+    near-duplicate theme names coined by different batches.
+
+    Args:
+        results (dict): custom_id → reply text
+
+    Returns:
+        dict: Theme groups mapping themes to lists of article IDs
+    """
+    from cluster import parse_theme_map, reformat_results
+
+    article_to_theme = {}
+    for custom_id in sorted(results, key=lambda cid: int(cid.rsplit("-", 1)[1])):
+        text = results[custom_id]
+        if text is None:
+            print(f"Warning: theme batch {custom_id} failed; its articles are unassigned")
+            continue
+        try:
+            parsed = parse_theme_map(text)
+        except Exception as e:
+            print(f"Warning: could not parse theme batch {custom_id}: {e}")
+            continue
+        article_to_theme.update(parsed.doc_to_theme)
+    return reformat_results(merge_similar_themes(article_to_theme))
@@ -1,19 +1,19 @@
 import os
 import json
+import time
 import pandas as pd
-from typing import List, Dict, Optional, Set, Tuple
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from pydantic import BaseModel, Field
-from langchain.schema import HumanMessage
-from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
-from langchain_community.chat_models import ChatOpenAI
 from collections import defaultdict
+from llm_router import SUMMARY_MODEL, get_router
+from structured_output import parse_json_object
 from utils import load_env_variables
 
 
 class ThemeMap(BaseModel):
     """Model for theme mapping output."""
     doc_to_theme: Dict[str, str] = Field(..., description="id→theme")
-    new_theme_names: List[str]
+    new_theme_names: List[str] = []
 
 
 class Article(BaseModel):
@@ -23,6 +23,25 @@ class Article(BaseModel):
     url: Optional[str] = None
 
 
+class ArticleRecord:
+    """
+    Compact article record for very large archives. Uses __slots__ instead of
+    a pydantic model and offers the same model_dump() used to build prompts.
+    """
+    __slots__ = ("article_id", "summary", "url")
+
+    def __init__(self, article_id: str, summary: str, url: Optional[str] = None):
+        self.article_id = article_id
+        self.summary = summary
+        self.url = url
+
+    def model_dump(self, exclude_none: bool = False) -> Dict[str, str]:
+        data = {"article_id": self.article_id, "summary": self.summary, "url": self.url}
+        if exclude_none:
+            data = {k: v for k, v in data.items() if v is not None}
+        return data
+
+
 def set_api_key(api_key: str) -> None:
     """
     Set the OpenAI API key.
@@ -48,72 +67,101 @@ def batch_articles(articles: List[Article], batch_size: int = 5) -> List[List[Ar
     return [articles[i : i + batch_size] for i in range(0, len(articles), batch_size)]
 
 
+def parse_theme_map(text: str) -> ThemeMap:
+    """
+    Parse a theme-mapping reply, repairing malformed JSON locally.
+    
+    Args:
+        text (str): Raw reply text
+        
+    Returns:
+        ThemeMap: Parsed mapping with string ids and non-empty theme names
+        
+    Raises:
+        ValueError: If the reply has no usable doc_to_theme object
+    """
+    data = parse_json_object(text)
+    doc_to_theme = data.get("doc_to_theme")
+    if not isinstance(doc_to_theme, dict):
+        raise ValueError("Reply has no doc_to_theme object")
+    return ThemeMap(
+        doc_to_theme={str(k): str(v).strip() for k, v in doc_to_theme.items() if v and str(v).strip()},
+        new_theme_names=[str(name) for name in data.get("new_theme_names") or []],
+    )
+
+
 def process_batches(
     batches: List[List[Article]], 
     theme_names_set: Set[str],
     article_to_theme: Dict[str, str],
     llm,
-    base_parser,
-    fixing_parser,
-    prompt_template: str
+    prompt_template: str,
+    max_attempts: int = 3
 ) -> Tuple[Set[str], Dict[str, str]]:
-    
-
     """
     Process batches of articles to map them to themes.
+
+    Replies are requested in JSON mode and repaired locally when malformed.
+    Articles of a batch that the reply left unassigned are re-requested on
+    their own, up to `max_attempts` requests per batch. A batch that still
+    fails is reported and skipped, so one bad batch does not abort the run.
     
     Args:
         batches: List of article batches
         theme_names_set: Set of existing theme names
         article_to_theme: Dictionary mapping article IDs to themes
-        llm: Language model instance
-        base_parser: Pydantic output parser
-        fixing_parser: Output fixing parser for error correction
+        llm: Router used to send the prompts (see llm_router.py)
         prompt_template: Template string for the prompt
+        max_attempts: Requests per batch, including re-requests for missing ids
         
     Returns:
         Tuple containing updated theme names set and article-to-theme mapping
     """
-
-
     print("Processing batches...")
+    unassigned = []
     for batch_idx, batch in enumerate(batches):
-        try:
-                # Create JSON strings for existing themes and new articles
+        pending = list(batch)
+        for attempt in range(max_attempts):
+            # Create JSON strings for existing themes and the articles still to assign
             existing_json = json.dumps(sorted(theme_names_set), indent=2)
-            new_json = json.dumps([a.dict(exclude_none=True) for a in batch],
-                                indent=2, ensure_ascii=False)
-            
-            # Format the prompt with the existing themes and new articles
+            new_json = json.dumps([a.model_dump(exclude_none=True) for a in pending],
+                                  indent=2, ensure_ascii=False)
             prompt = prompt_template.format(
                 existing_themes_json=existing_json,
                 new_articles_json=new_json
             )
 
-            
-            response = llm.invoke([HumanMessage(content=prompt)])
-            raw_output = response.content
-
-            # Parse the output using the base parser
             try:
-                parsed = base_parser.parse(raw_output)
-            except:
-                parsed = fixing_parser.parse(raw_output)
-
-            # Update the theme names set and article-to-theme mapping
+                response = llm.complete([{"role": "user", "content": prompt}], temperature=0.1, json_mode=True)
+                parsed = parse_theme_map(response.content)
+            except Exception as e:
+                print(f"Batch {batch_idx + 1}, attempt {attempt + 1}/{max_attempts} failed: {e}")
+                if attempt + 1 < max_attempts:
+                    time.sleep(min(2 ** attempt, 10))
+                continue
+
+            # Keep only assignments for articles of this request
+            pending_ids = {a.article_id for a in pending}
+            assigned = {k: v for k, v in parsed.doc_to_theme.items() if k in pending_ids}
+            article_to_theme.update(assigned)
             theme_names_set.update(parsed.new_theme_names)
-            article_to_theme.update(parsed.doc_to_theme)
+            theme_names_set.update(assigned.values())
 
-            # Add a progress indicator
-            # Add progress indicator
-            print(f"Processed batch {batch_idx + 1}/{len(batches)}, " 
-                    f"themes so far: {len(theme_names_set)}")
-                
+            pending = [a for a in pending if a.article_id not in assigned]
+            if not pending:
+                break
+            if attempt + 1 < max_attempts:
+                print(f"Batch {batch_idx + 1}: re-requesting {len(pending)} unassigned article(s)")
 
-        except Exception as e:
-            raise Exception(f"Error processing batch {batch_idx + 1}: {e}")
+        if pending:
+            unassigned.extend(a.article_id for a in pending)
+            print(f"Warning: batch {batch_idx + 1} left {len(pending)} article(s) unassigned")
 
+        print(f"Processed batch {batch_idx + 1}/{len(batches)}, " 
+              f"themes so far: {len(theme_names_set)}")
 
+    if unassigned:
+        print(f"Warning: {len(unassigned)} article(s) could not be assigned a theme: {', '.join(unassigned)}")
     return theme_names_set, article_to_theme
 
 
@@ -162,6 +210,24 @@ def prepare_articles_from_df(df: pd.DataFrame) -> Tuple[List[Article], Dict[str,
 
 
 
+def iter_article_records(csv_path: str, chunk_size: int = 1000):
+    """
+    Stream ArticleRecords from a summarized-articles CSV, reading only the
+    Id, Link and Summary columns in fixed-size chunks.
+    
+    Args:
+        csv_path (str): Path to summarized_articles.csv
+        chunk_size (int): Rows read per chunk
+        
+    Yields:
+        ArticleRecord: One record per article
+    """
+    for chunk in pd.read_csv(csv_path, usecols=["Id", "Link", "Summary"], chunksize=chunk_size):
+        for article_id, link, summary in zip(chunk["Id"], chunk["Link"], chunk["Summary"]):
+            yield ArticleRecord(str(article_id), summary if isinstance(summary, str) else "",
+                                link if isinstance(link, str) else None)
+
+
 def get_theme_mapping_prompt() -> str:
 
     """
@@ -271,7 +337,39 @@ def get_theme_mapping_prompt() -> str:
     """
 
 
-def cluster(df: pd.DataFrame, api_key: str = None, batch_size: int = 5, model_name: str = "gpt-4") -> Tuple[Set[str], Dict[str, str]]:
+def cluster_endpoints(model_name: str) -> List[Tuple[str, str]]:
+    """
+    Endpoints used for theme mapping, in preference order.
+    
+    Args:
+        model_name (str): Preferred OpenAI model
+        
+    Returns:
+        List of (provider, model) pairs
+    """
+    endpoints = [("openai", model_name), ("openai", "gpt-4o"), ("groq", SUMMARY_MODEL)]
+    return [endpoint for i, endpoint in enumerate(endpoints) if endpoint not in endpoints[:i]]
+
+
+def theme_mapping_router(model_name: str):
+    """
+    Router used for theme mapping.
+    
+    Args:
+        model_name (str): Preferred OpenAI model
+        
+    Returns:
+        Router: Shared router for the "cluster" route
+    """
+    # Route theme mapping to the requested model, failing over to gpt-4o and
+    # then Groq when it is throttled or erroring. Hedging is disabled here
+    # because duplicate GPT-4 calls are expensive.
+    return get_router("cluster", cluster_endpoints(model_name), hedge=False)
+
+
+def cluster(df: pd.DataFrame, api_key: str = None, batch_size: int = 5, model_name: str = "gpt-4",
+            articles: Optional[List[ArticleRecord]] = None,
+            existing_themes: Optional[Iterable[str]] = None) -> Tuple[Set[str], Dict[str, str]]:
     """
     Main function to cluster articles based on their summaries.
     
@@ -280,6 +378,10 @@ def cluster(df: pd.DataFrame, api_key: str = None, batch_size: int = 5, model_na
         api_key: OpenAI API key (optional if already set in environment)
         batch_size: Number of articles to process in each batch
         model_name: The OpenAI model to use for clustering
+        articles: Pre-built article records (e.g. from iter_article_records);
+            when given, df is not used
+        existing_themes: Theme names the prompts start from, so articles can
+            join themes found in an earlier pass
         
     Returns:
         Tuple containing:
@@ -298,40 +400,21 @@ def cluster(df: pd.DataFrame, api_key: str = None, batch_size: int = 5, model_na
             raise Exception("Warning: OpenAI API key not found. Check your environment variables.")
         
         # Prepare articles from DataFrame
-        articles, article_by_id = prepare_articles_from_df(df)
+        if articles is None:
+            articles, article_by_id = prepare_articles_from_df(df)
 
  
         # Split articles into batches
         batches = batch_articles(articles, batch_size=batch_size)
 
-        # Initialize parsers
-        base_parser = PydanticOutputParser(pydantic_object=ThemeMap)
-
-        
-        fixing_parser = OutputFixingParser.from_llm(
-            parser=base_parser,
-            llm=ChatOpenAI(model_name="gpt-4o", temperature=0),
-        )
-        
-        
-        #Set up the language model
-        # Setup LLM
-        try:
-            llm = ChatOpenAI(model_name=model_name, temperature=0.1)
-        except Exception as e:
-            print(f"Error initializing ChatOpenAI with model {model_name}: {e}")
-            print("Trying with gpt-4o as fallback")
-            try:
-                llm = ChatOpenAI(model_name="gpt-4o", temperature=0.1)
-            except Exception as e2:
-                print(f"Error initializing fallback model: {e2}")
-                raise Exception(f"Error initializing the language model for clustering")
+        # Initialize the router
+        llm = theme_mapping_router(model_name)
         
         # Set up the prompt template
         prompt_template = get_theme_mapping_prompt()
 
         # Initialize theme names set and article-to-theme mapping
-        theme_names_set: Set[str] = set()
+        theme_names_set: Set[str] = set(existing_themes or ())
         article_to_theme: Dict[str, str] = {}
 
         # Process batches
@@ -340,8 +423,6 @@ def cluster(df: pd.DataFrame, api_key: str = None, batch_size: int = 5, model_na
             theme_names_set,
             article_to_theme,
             llm,
-            base_parser,
-            fixing_parser,
             prompt_template
         )
 
@@ -373,24 +454,29 @@ def reformat_results(article_to_theme):
 
 
 
-def cluster_articles(df):
+def cluster_articles(df, batch_size: int = 5, model_name: str = "gpt-4", articles=None, existing_themes=None):
     """
     Main wrapper function for clustering articles.
     
     Args:
         df (DataFrame): DataFrame containing article data
+        batch_size (int): Number of articles to process in each batch
+        model_name (str): The OpenAI model to use for clustering
+        articles (list): Pre-built article records; when given, df is not used
+        existing_themes (iterable): Theme names the prompts start from
         
     Returns:
         dict: Theme groups mapping themes to lists of article IDs
     """
 
     try:
-        env_vars = load_env_variables()
+        env_vars = load_env_variables(validate=False)
         api_key = env_vars.get("openai_api_key")
           
       
         # Run clustering
-        themes, article_mapping = cluster(df, api_key)
+        themes, article_mapping = cluster(df, api_key, batch_size=batch_size, model_name=model_name, articles=articles,
+                                          existing_themes=existing_themes)
         
         # Reformat results
         theme_groups = reformat_results(article_mapping)
@@ -402,5 +488,54 @@ def cluster_articles(df):
         raise Exception("Error")
 
 
-
-
+def cluster_article_records(articles, batch_size: int = 5, model_name: str = "gpt-4", hierarchical: bool = False,
+                            document_keywords: Optional[Dict[str, List[str]]] = None):
+    """
+    Cluster prepared article records with the selected clustering options.
+    
+    Args:
+        articles (list): Article objects or records
+        batch_size (int): Number of articles to process in each batch
+        model_name (str): The OpenAI model to use for clustering
+        hierarchical (bool): Group into coarse domains first (see hierarchy.py)
+        document_keywords (dict): Link → keywords from the tagger; when given,
+            articles are pre-grouped by keyword overlap and only group
+            representatives are sent to the LLM (see pregroup.py)
+        
+    Returns:
+        Tuple containing:
+        - Theme groups mapping themes to lists of article IDs
+        - Hierarchy mapping domain → theme → article IDs, or None when not hierarchical
+    """
+    def map_themes(articles, theme_groups=None, hierarchy=None):
+        if hierarchical:
+            from hierarchy import cluster_hierarchical
+            return cluster_hierarchical(None, batch_size=batch_size, model_name=model_name, articles=articles,
+                                        existing_themes={domain: list(themes) for domain, themes in (hierarchy or {}).items()})
+        return cluster_articles(None, batch_size=batch_size, model_name=model_name, articles=articles,
+                                existing_themes=list(theme_groups or ())), None
+
+    if document_keywords is None:
+        return map_themes(articles)
+
+    from pregroup import expand_theme_groups, merge_theme_groups, orphaned_members, pregroup_articles
+
+    llm_articles, members_by_rep = pregroup_articles(articles, document_keywords)
+    theme_groups, hierarchy = map_themes(llm_articles)
+    orphans = set(orphaned_members(theme_groups, members_by_rep))
+    theme_groups = expand_theme_groups(theme_groups, members_by_rep)
+    if hierarchy is not None:
+        hierarchy = {domain: expand_theme_groups(themes, members_by_rep) for domain, themes in hierarchy.items()}
+
+    # A representative left unassigned (e.g. its batch failed) would silently
+    # drop its whole group, so the members are mapped on their own, starting
+    # from the themes already found so they can join them
+    if orphans:
+        print(f"Re-sending {len(orphans)} article(s) whose group representative was left unassigned")
+        retry_groups, retry_hierarchy = map_themes([a for a in articles if a.article_id in orphans],
+                                                   theme_groups, hierarchy)
+        theme_groups = merge_theme_groups(theme_groups, retry_groups)
+        if hierarchy is not None:
+            for domain, themes in retry_hierarchy.items():
+                hierarchy[domain] = merge_theme_groups(hierarchy.get(domain, {}), themes)
+    return theme_groups, hierarchy
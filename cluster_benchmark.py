@@ -0,0 +1,331 @@
+import json
+import math
+import os
+import random
+import shutil
+import time
+from collections import Counter
+from itertools import combinations
+
+# Quality benchmark for the clustering stage. A theme mapping is scored
+# against a reference labeling with ARI and NMI, the share of single-article
+# themes, and run-to-run stability, next to its latency, LLM calls and tokens.
+# The reference starts as a frozen copy of results/article_to_theme.json,
+# taken the first time the benchmark runs, so later pipeline runs do not move
+# it. That copy is only a placeholder: until it is corrected by hand, scores
+# measure agreement with one earlier run rather than clustering quality.
+
+REFERENCE_SOURCE = "results/article_to_theme.json"
+DEFAULT_REFERENCE = "results/benchmarks/reference_themes.json"
+DEFAULT_OUTPUT = "results/benchmarks/cluster_benchmark.json"
+MODES = ("flat", "hierarchical", "pregroup", "hierarchical+pregroup")
+
+
+def load_theme_groups(path):
+    """
+    Load a theme → article IDs mapping such as article_to_theme.json.
+
+    Args:
+        path (str): JSON file
+
+    Returns:
+        dict: Theme → list of article IDs (as strings)
+    """
+    with open(path, "r") as f:
+        return {theme: [str(i) for i in ids] for theme, ids in json.load(f).items()}
+
+
+def freeze_reference(reference_json=DEFAULT_REFERENCE, source_json=REFERENCE_SOURCE):
+    """
+    Create the reference labeling from the current theme mapping if it does
+    not exist yet.
+
+    Args:
+        reference_json (str): Path of the frozen reference
+        source_json (str): Theme mapping to copy when the reference is missing
+
+    Returns:
+        str: Path of the reference
+    """
+    if not os.path.exists(reference_json):
+        if not os.path.exists(source_json):
+            raise Exception(f"No reference labeling: neither {reference_json} nor {source_json} exists")
+        os.makedirs(os.path.dirname(reference_json) or ".", exist_ok=True)
+        shutil.copyfile(source_json, reference_json)
+        print(f"Froze {source_json} as the benchmark reference {reference_json}; "
+              "correct its labels by hand before trusting the ARI/NMI scores")
+    return reference_json
+
+
+def to_labels(theme_groups):
+    """
+    Invert a theme → article IDs mapping.
+
+    Args:
+        theme_groups (dict): Theme → article IDs
+
+    Returns:
+        dict: Article ID → theme
+    """
+    return {str(article_id): theme for theme, ids in theme_groups.items() for article_id in ids}
+
+
+def _comb2(n):
+    return n * (n - 1) / 2
+
+
+def adjusted_rand_index(reference, predicted):
+    """
+    Adjusted Rand index between two labelings over their common articles.
+
+    Args:
+        reference (dict): Article ID → reference label
+        predicted (dict): Article ID → predicted label
+
+    Returns:
+        float: ARI, 1.0 for identical partitions and about 0.0 for random ones
+    """
+    ids = [i for i in reference if i in predicted]
+    if len(ids) < 2:
+        return 0.0
+    contingency = Counter((reference[i], predicted[i]) for i in ids)
+    ref_sizes = Counter(reference[i] for i in ids)
+    pred_sizes = Counter(predicted[i] for i in ids)
+
+    index = sum(_comb2(n) for n in contingency.values())
+    ref_pairs = sum(_comb2(n) for n in ref_sizes.values())
+    pred_pairs = sum(_comb2(n) for n in pred_sizes.values())
+    expected = ref_pairs * pred_pairs / _comb2(len(ids))
+    maximum = (ref_pairs + pred_pairs) / 2
+    if maximum == expected:
+        return 1.0
+    return (index - expected) / (maximum - expected)
+
+
+def normalized_mutual_info(reference, predicted):
+    """
+    Normalized mutual information (arithmetic-mean normalization) between two
+    labelings over their common articles.
+
+    Args:
+        reference (dict): Article ID → reference label
+        predicted (dict): Article ID → predicted label
+
+    Returns:
+        float: NMI between 0 and 1
+    """
+    ids = [i for i in reference if i in predicted]
+    n = len(ids)
+    if n == 0:
+        return 0.0
+    contingency = Counter((reference[i], predicted[i]) for i in ids)
+    ref_sizes = Counter(reference[i] for i in ids)
+    pred_sizes = Counter(predicted[i] for i in ids)
+
+    mutual_info = sum(
+        count / n * math.log(count * n / (ref_sizes[r] * pred_sizes[p]))
+        for (r, p), count in contingency.items()
+    )
+    ref_entropy = -sum(c / n * math.log(c / n) for c in ref_sizes.values())
+    pred_entropy = -sum(c / n * math.log(c / n) for c in pred_sizes.values())
+    if ref_entropy == 0 and pred_entropy == 0:
+        return 1.0
+    return mutual_info / ((ref_entropy + pred_entropy) / 2)
+
+
+def singleton_ratio(theme_groups):
+    """
+    Share of themes that contain a single article.
+
+    Args:
+        theme_groups (dict): Theme → article IDs
+
+    Returns:
+        float: Ratio between 0 and 1
+    """
+    if not theme_groups:
+        return 0.0
+    return sum(1 for ids in theme_groups.values() if len(ids) == 1) / len(theme_groups)
+
+
+def stability(runs):
+    """
+    Mean pairwise ARI between repeated runs of the same configuration.
+
+    Args:
+        runs (list): Theme → article IDs mappings from repeated runs
+
+    Returns:
+        float: Mean ARI, or None with fewer than two runs
+    """
+    if len(runs) < 2:
+        return None
+    scores = [adjusted_rand_index(to_labels(a), to_labels(b)) for a, b in combinations(runs, 2)]
+    return sum(scores) / len(scores)
+
+
+def score_mapping(theme_groups, reference_groups):
+    """
+    Score one theme mapping against the reference.
+
+    Args:
+        theme_groups (dict): Theme → article IDs to score
+        reference_groups (dict): Reference theme → article IDs
+
+    Returns:
+        dict: ari, nmi, coverage (share of reference articles assigned), themes
+            and singleton_ratio
+    """
+    reference, predicted = to_labels(reference_groups), to_labels(theme_groups)
+    return {
+        "ari": adjusted_rand_index(reference, predicted),
+        "nmi": normalized_mutual_info(reference, predicted),
+        "coverage": sum(1 for i in reference if i in predicted) / len(reference) if reference else 0.0,
+        "themes": len(theme_groups),
+        "singleton_ratio": singleton_ratio(theme_groups),
+    }
+
+
+def run_configuration(articles, mode, batch_size, model_name, document_keywords):
+    """
+    Cluster the articles once and measure latency and LLM usage.
+
+    Args:
+        articles (list): Article objects or records
+        mode (str): One of MODES
+        batch_size (int): Articles per theme-mapping prompt
+        model_name (str): The OpenAI model to use for clustering
+        document_keywords (dict): Link → keywords, used by the pregroup modes
+
+    Returns:
+        Tuple of (theme groups, usage dict with seconds, calls and tokens)
+    """
+    from cluster import cluster_article_records
+    from llm_router import usage_totals
+
+    before = usage_totals()
+    start = time.perf_counter()
+    theme_groups, _ = cluster_article_records(
+        articles, batch_size=batch_size, model_name=model_name,
+        hierarchical="hierarchical" in mode,
+        document_keywords=document_keywords if "pregroup" in mode else None,
+    )
+    seconds = time.perf_counter() - start
+    after = usage_totals()
+    return theme_groups, {
+        "seconds": seconds,
+        "calls": after["calls"] - before["calls"],
+        "tokens": (after["prompt_tokens"] + after["completion_tokens"])
+                  - (before["prompt_tokens"] + before["completion_tokens"]),
+    }
+
+
+def run_benchmark(summarized_csv, reference_json=DEFAULT_REFERENCE, keywords_json=None, modes=("flat",),
+                  batch_sizes=(5,), repeats=2, sample=None, model_name="gpt-4", seed=0,
+                  output_file=DEFAULT_OUTPUT):
+    """
+    Cluster the articles under every mode × batch size combination and score
+    each against the reference.
+
+    Args:
+        summarized_csv (str): Path to summarized_articles.csv
+        reference_json (str): Reference theme → article IDs mapping
+        keywords_json (str): document_keywords.json, needed by the pregroup modes
+        modes (iterable): Clustering modes from MODES
+        batch_sizes (iterable): Articles per theme-mapping prompt
+        repeats (int): Runs per configuration, used for the stability score
+        sample (int): Only cluster this many randomly chosen reference articles
+        model_name (str): The OpenAI model to use for clustering
+        seed (int): Seed for the article sample, so runs are comparable
+        output_file (str): JSON file the result rows are written to
+
+    Returns:
+        list: One result row per configuration
+    """
+    from cluster import iter_article_records
+    from pregroup import load_keywords
+
+    reference_groups = load_theme_groups(freeze_reference(reference_json))
+    reference_ids = set(to_labels(reference_groups))
+    articles = [a for a in iter_article_records(summarized_csv) if a.article_id in reference_ids]
+    if sample and sample < len(articles):
+        articles = random.Random(seed).sample(articles, sample)
+        articles.sort(key=lambda a: int(a.article_id))
+        kept = {a.article_id for a in articles}
+        reference_groups = {theme: [i for i in ids if i in kept] for theme, ids in reference_groups.items()}
+        reference_groups = {theme: ids for theme, ids in reference_groups.items() if ids}
+
+    document_keywords = None
+    if any("pregroup" in mode for mode in modes):
+        document_keywords = load_keywords(keywords_json) if keywords_json else {}
+
+    rows = []
+    for mode in modes:
+        for batch_size in batch_sizes:
+            runs, usages = [], []
+            for repeat in range(repeats):
+                print(f"Benchmark: mode={mode} batch_size={batch_size} run {repeat + 1}/{repeats}")
+                theme_groups, usage = run_configuration(articles, mode, batch_size, model_name, document_keywords)
+                runs.append(theme_groups)
+                usages.append(usage)
+            scores = [score_mapping(theme_groups, reference_groups) for theme_groups in runs]
+            row = {"mode": mode, "batch_size": batch_size, "articles": len(articles), "runs": repeats}
+            for key in ("ari", "nmi", "coverage", "themes", "singleton_ratio"):
+                row[key] = sum(score[key] for score in scores) / len(scores)
+            row["stability"] = stability(runs)
+            for key in ("seconds", "calls", "tokens"):
+                row[key] = sum(usage[key] for usage in usages) / len(usages)
+            rows.append(row)
+
+    print_table(rows)
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w") as f:
+        json.dump({"reference": reference_json, "model_name": model_name, "seed": seed, "rows": rows}, f, indent=2)
+    print(f"Benchmark results saved to {output_file}")
+    return rows
+
+
+def print_table(rows):
+    """
+    Print benchmark rows as a fixed-width table.
+
+    Args:
+        rows (list): Result rows from run_benchmark or score_files
+    """
+    # (key, header, width, number format)
+    columns = [("batch_size", "batch", 6, "{:.0f}"), ("ari", "ARI", 6, "{:.3f}"), ("nmi", "NMI", 6, "{:.3f}"),
+               ("coverage", "cover", 6, "{:.2f}"), ("themes", "themes", 7, "{:.1f}"),
+               ("singleton_ratio", "single", 7, "{:.2f}"), ("stability", "stable", 7, "{:.3f}"),
+               ("seconds", "secs", 8, "{:.1f}"), ("calls", "calls", 7, "{:.1f}"), ("tokens", "tokens", 9, "{:.0f}")]
+    print(f"{'mode':<22}" + "".join(f"{header:>{width}}" for _, header, width, _ in columns))
+    for row in rows:
+        cells = [f"{row['mode']:<22}"]
+        for key, _, width, fmt in columns:
+            value = row.get(key)
+            cells.append(f"{'-' if value is None else fmt.format(value):>{width}}")
+        print("".join(cells))
+
+
+def score_files(mapping_files, reference_json=DEFAULT_REFERENCE):
+    """
+    Score existing theme mappings (e.g. from earlier runs) without calling an
+    LLM. With several files, their stability is reported as well.
+
+    Args:
+        mapping_files (list): Theme → article IDs JSON files
+        reference_json (str): Reference theme → article IDs mapping
+
+    Returns:
+        list: One score row per file
+    """
+    reference_groups = load_theme_groups(freeze_reference(reference_json))
+    runs = [load_theme_groups(path) for path in mapping_files]
+    rows = []
+    for path, theme_groups in zip(mapping_files, runs):
+        row = {"mode": os.path.basename(path)[:22]}
+        row.update(score_mapping(theme_groups, reference_groups))
+        rows.append(row)
+    print_table(rows)
+    if len(runs) > 1:
+        print(f"Stability across files (mean pairwise ARI): {stability(runs):.3f}")
+    return rows
@@ -0,0 +1,281 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from http_cache import fetch
+from utils import canonicalize_url
+
+# Adaptive crawler for nightly runs. Instead of recursing through every
+# /health/ link, pages are fetched from a priority frontier. Unseen URLs come
+# first, article-like ones before hubs. Known pages are ranked by how likely
+# they are to have changed since the last visit, estimated from their change
+# history (a Poisson change model), plus a bonus for hubs that recently
+# linked to new pages; hubs also keep a floor score so they are revisited
+# while stable articles are not. Only downloads and 304s count as visits in
+# that history; a page served from the HTTP cache without asking the server
+# tells nothing about whether it changed. The crawl stops when the fetch or
+# time budget runs out, or when no remaining page is worth fetching.
+
+CRAWL_STATE_FILE = "results/crawl_state.json"
+
+NEW_ARTICLE_SCORE = 2.0
+NEW_PAGE_SCORE = 1.5
+HUB_BONUS = 0.5
+# Hubs are where new articles appear, so they stay above the default stop score
+HUB_SCORE = 0.25
+DEPTH_PENALTY = 0.02
+DAY = 86400
+
+_budget = {"max_fetches": 500, "time_budget": 600.0, "min_score": 0.1}
+
+
+def configure_budget(max_fetches=None, time_budget=None, min_score=None):
+    """
+    Set the per-run budgets used by `adaptive_crawl`.
+
+    Args:
+        max_fetches (int): Maximum number of pages downloaded per run
+        time_budget (float): Maximum crawl time in seconds
+        min_score (float): Stop when the best page left in the frontier scores lower
+    """
+    for key, value in (("max_fetches", max_fetches), ("time_budget", time_budget), ("min_score", min_score)):
+        if value is not None:
+            _budget[key] = value
+
+
+def looks_like_article(url):
+    """
+    Guess from the URL alone whether a page is an article rather than a hub:
+    article slugs are long hyphenated names (or legacy .html pages), hubs are
+    short section names.
+
+    Args:
+        url (str): Canonical URL
+
+    Returns:
+        bool: True for article-like URLs
+    """
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if not segments:
+        return False
+    last = segments[-1]
+    return last.endswith(".html") or (len(segments) >= 3 and last.count("-") >= 2)
+
+
+def load_crawl_state(state_file=CRAWL_STATE_FILE):
+    """
+    Load the per-URL visit history of earlier crawls.
+
+    Args:
+        state_file (str): JSON file written by `save_crawl_state`
+
+    Returns:
+        dict: URL → {"first_seen", "last_visit", "visits", "changes", "digest", "yield", "article"}
+    """
+    if not os.path.exists(state_file):
+        return {}
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read {state_file}: {e}")
+        return {}
+
+
+def save_crawl_state(state, state_file=CRAWL_STATE_FILE):
+    """
+    Save the per-URL visit history for the next crawl.
+
+    Args:
+        state (dict): URL → history entry
+        state_file (str): JSON file to write
+    """
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    with open(state_file + ".tmp", "w") as f:
+        json.dump(state, f, sort_keys=True)
+    os.replace(state_file + ".tmp", state_file)
+
+
+def change_probability(entry, now):
+    """
+    Probability that a known page changed since it was last looked at, assuming
+    changes arrive as a Poisson process whose rate is estimated from the
+    page's history (smoothed, so a page never seen changing keeps a small rate).
+
+    Args:
+        entry (dict): History entry of the page
+        now (float): Current time
+
+    Returns:
+        float: Probability between 0 and 1
+    """
+    last = entry.get("last_visit") or entry["first_seen"]
+    observed_days = max(0.0, (last - entry["first_seen"]) / DAY)
+    rate = (entry.get("changes", 0) + 0.5) / (observed_days + 1)
+    age_days = max(0.0, (now - last) / DAY)
+    return 1 - math.exp(-rate * age_days)
+
+
+def score_url(url, depth, entry, now):
+    """
+    Crawl priority of a URL; higher is fetched first.
+
+    Args:
+        url (str): Canonical URL
+        depth (int): Link distance from the start page
+        entry (dict): History entry, or None for a URL never seen before
+        now (float): Current time
+
+    Returns:
+        float: Priority score
+    """
+    if entry is None:
+        score = NEW_ARTICLE_SCORE if looks_like_article(url) else NEW_PAGE_SCORE
+    else:
+        # Hubs that recently linked to new pages are likely to do so again
+        score = change_probability(entry, now) + HUB_BONUS * min(1.0, entry.get("yield", 0.0) / 3)
+        if not entry.get("article", looks_like_article(url)):
+            score += HUB_SCORE
+    return score - DEPTH_PENALTY * depth
+
+
+def page_digest(soup, links):
+    """
+    Fingerprint the part of a page that matters for change detection: the
+    article text when there is one, otherwise its set of health links. Ads,
+    timestamps and other page chrome are left out.
+
+    Returns:
+        Tuple of (hex digest, True if the page is an article)
+    """
+    contents = soup.find_all('div', class_="articlecontentfragment")
+    if contents:
+        text = re.sub(r'\s+', ' ', "".join(c.get_text() for c in contents)).strip()
+        return hashlib.sha1(text.encode()).hexdigest(), True
+    return hashlib.sha1("\n".join(sorted(links)).encode()).hexdigest(), False
+
+
+def adaptive_crawl(base_url, output_file="links.txt", state_file=CRAWL_STATE_FILE, max_depth=3,
+                   max_fetches=None, time_budget=None, min_score=None):
+    """
+    Crawl the site from base_url in priority order within the run's budgets,
+    and work out which articles are new or changed.
+
+    The returned link set holds every health link known from this and earlier
+    crawls, so the scraper can reuse the stored content of pages that were
+    not fetched this time.
+
+    Args:
+        base_url (str): The starting URL for crawling
+        output_file (str): File to save the links
+        state_file (str): JSON file recording each URL's visit history
+        max_depth (int): Maximum link distance from base_url
+        max_fetches (int): Page budget (default: the configured budget)
+        time_budget (float): Time budget in seconds (default: the configured budget)
+        min_score (float): Stop below this priority (default: the configured value)
+
+    Returns:
+        Tuple of (set of all known health links, set of new or changed links)
+    """
+    max_fetches = _budget["max_fetches"] if max_fetches is None else max_fetches
+    time_budget = _budget["time_budget"] if time_budget is None else time_budget
+    min_score = _budget["min_score"] if min_score is None else min_score
+
+    section = urlsplit(base_url).path.rstrip("/") or "/health"
+    prefix = section + "/"
+    state = load_crawl_state(state_file)
+    now = time.time()
+    start = time.perf_counter()
+
+    start_url = canonicalize_url(base_url)
+    frontier = [(-math.inf, 0, start_url, 0)]
+    queued = {start_url}
+    counter = 1
+    for url, entry in state.items():
+        # Known pages re-enter at the depth they were found at
+        depth = entry.get("depth", max_depth)
+        if url != start_url and depth <= max_depth:
+            heapq.heappush(frontier, (-score_url(url, depth, entry, now), counter, url, depth))
+            queued.add(url)
+            counter += 1
+
+    changed = set()
+    fetched = 0
+    stop_reason = "frontier exhausted"
+    while frontier:
+        neg_score, _, url, depth = heapq.heappop(frontier)
+        if fetched >= max_fetches:
+            stop_reason = f"fetch budget of {max_fetches} pages used"
+            break
+        if time.perf_counter() - start >= time_budget:
+            stop_reason = f"time budget of {time_budget:.0f}s used"
+            break
+        if -neg_score < min_score:
+            stop_reason = f"no page left scoring above {min_score}"
+            break
+
+        try:
+            response = fetch(url)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Error visiting {url} : {e}")
+            continue
+        cache_status = getattr(response, "cache_status", "miss")
+        if cache_status != "hit":
+            fetched += 1
+
+        soup = BeautifulSoup(response.content, "html.parser")
+        links = set()
+        for a in soup.find_all("a", href=True):
+            link = canonicalize_url(urljoin(base_url, a["href"]))
+            if urlsplit(link).path.startswith(prefix):
+                links.add(link)
+
+        new_links = 0
+        for link in links:
+            if link not in state:
+                state[link] = {"first_seen": now, "visits": 0, "changes": 0, "depth": depth + 1}
+                new_links += 1
+                if looks_like_article(link):
+                    changed.add(link)
+            else:
+                state[link]["depth"] = min(state[link].get("depth", depth + 1), depth + 1)
+            if link not in queued and depth + 1 <= max_depth:
+                queued.add(link)
+                heapq.heappush(frontier, (-score_url(link, depth + 1, None, now), counter, link, depth + 1))
+                counter += 1
+
+        entry = state.setdefault(url, {"first_seen": now, "visits": 0, "changes": 0, "depth": depth})
+        digest, is_article = page_digest(soup, links)
+        if cache_status == "hit":
+            # Not checked with the server, so not an observation for the change
+            # rate; only fill in what a page seen for the first time lacks
+            entry.setdefault("digest", digest)
+            entry.setdefault("article", is_article)
+            continue
+        # A 304 means the server reported the page unchanged
+        if cache_status == "miss" and entry.get("digest") not in (None, digest):
+            entry["changes"] += 1
+            if is_article:
+                changed.add(url)
+        entry.update(digest=digest, article=is_article, last_visit=now, visits=entry["visits"] + 1)
+        entry["yield"] = 0.5 * entry.get("yield", 0.0) + 0.5 * new_links
+
+    save_crawl_state(state, state_file)
+    links = {url for url in state if url != start_url and state[url].get("article", looks_like_article(url))}
+
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, "w") as f:
+        for link in sorted(links):
+            f.write(link + "\n")
+    print(f"Adaptive crawl fetched {fetched} pages in {time.perf_counter() - start:.0f}s ({stop_reason}); "
+          f"{len(links)} Links ({len(changed)} new or changed) saved to {output_file}")
+    return links, changed
@@ -0,0 +1,260 @@
+import csv
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+from textutils import STOPWORDS
+
+# Local extractive pre-summaries. Before an article goes to the summarization
+# LLM, it can be cut down to its most salient sentences: each sentence is
+# scored by the cosine similarity of its TF-IDF vector to the article's
+# centroid, weighted towards the start of the article, and the best sentences
+# are kept, in their original order, until the requested share of the
+# article's characters is reached. All articles are scored together with flat
+# NumPy arrays (one entry per sentence-term pair), so the cost is linear in
+# the corpus size.
+
+MIN_SENTENCES = 3
+MIN_SENTENCE_TERMS = 3
+LEAD_WEIGHT = 1.5
+
+
+def split_sentences(text):
+    """
+    Split article text into sentences at ., ! or ? followed by whitespace and
+    an upper-case letter, digit or quote.
+
+    Args:
+        text (str): Article text
+
+    Returns:
+        list: Sentences
+    """
+    parts = re.split(r'(?<=[.!?])\s+(?=[A-Z0-9"“])', text.strip())
+    return [part.strip() for part in parts if part.strip()]
+
+
+def tokenize(sentence):
+    """
+    Lower-cased words of a sentence without stopwords and single letters.
+    """
+    return [word for word in re.findall(r"[a-z0-9]+", sentence.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def score_sentences(articles):
+    """
+    Score every sentence of every article against its article's TF-IDF centroid.
+
+    Args:
+        articles (list): Lists of sentences, one list per article
+
+    Returns:
+        Tuple of (article index per sentence, scores), NumPy arrays over all
+        sentences in article order
+    """
+    vocabulary = {}
+    sentence_ids, term_ids = [], []
+    sentence_article = []
+    for article_index, sentences in enumerate(articles):
+        for sentence in sentences:
+            sentence_id = len(sentence_article)
+            sentence_article.append(article_index)
+            for word in tokenize(sentence):
+                sentence_ids.append(sentence_id)
+                term_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    sentence_article = np.asarray(sentence_article, dtype=np.int64)
+    n_sentences, n_terms = len(sentence_article), max(1, len(vocabulary))
+    if not sentence_ids:
+        return sentence_article, np.zeros(n_sentences)
+
+    # Term counts per sentence as unique (sentence, term) pairs
+    pair_keys, counts = np.unique(np.asarray(sentence_ids, dtype=np.int64) * n_terms + term_ids, return_counts=True)
+    pair_sentence, pair_term = pair_keys // n_terms, pair_keys % n_terms
+    pair_article = sentence_article[pair_sentence]
+
+    # Document frequency counts articles, not sentences
+    article_term_keys = np.unique(pair_article * n_terms + pair_term)
+    df = np.bincount(article_term_keys % n_terms, minlength=n_terms)
+    idf = np.log((1 + len(articles)) / (1 + df)) + 1
+    weights = (1 + np.log(counts)) * idf[pair_term]
+
+    # Article centroids: summed sentence vectors, looked up per pair
+    centroid_keys, inverse = np.unique(pair_article * n_terms + pair_term, return_inverse=True)
+    centroid = np.bincount(inverse, weights=weights, minlength=len(centroid_keys))
+    centroid_norm = np.sqrt(np.bincount(centroid_keys // n_terms, weights=centroid ** 2, minlength=len(articles)))
+
+    dot = np.bincount(pair_sentence, weights=weights * centroid[inverse], minlength=n_sentences)
+    sentence_norm = np.sqrt(np.bincount(pair_sentence, weights=weights ** 2, minlength=n_sentences))
+    denominator = sentence_norm * centroid_norm[sentence_article]
+    scores = np.divide(dot, denominator, out=np.zeros(n_sentences), where=denominator > 0)
+
+    # News articles lead with their key facts: weight sentences linearly from
+    # 1.5 at the start of an article down to 0.5 at its end
+    position = np.arange(n_sentences) - np.searchsorted(sentence_article, sentence_article)
+    scores *= LEAD_WEIGHT - position / np.bincount(sentence_article)[sentence_article]
+
+    # Fragments such as bylines and captions carry too few terms to be informative
+    terms_per_sentence = np.bincount(pair_sentence, minlength=n_sentences)
+    scores[terms_per_sentence < MIN_SENTENCE_TERMS] = 0.0
+    return sentence_article, scores
+
+
+def compress_articles(texts, ratio=0.3, min_sentences=MIN_SENTENCES):
+    """
+    Reduce each article to its most salient sentences.
+
+    Args:
+        texts (list): Article texts
+        ratio (float): Share of each article's characters to keep (0-1)
+        min_sentences (int): Always keep at least this many sentences
+
+    Returns:
+        list: Compressed texts, in the order of `texts`
+    """
+    articles = [split_sentences(text) if isinstance(text, str) else [] for text in texts]
+    sentence_article, scores = score_sentences(articles)
+    sentences = [sentence for article in articles for sentence in article]
+    if not sentences:
+        return [text if isinstance(text, str) else "" for text in texts]
+    lengths = np.fromiter((len(sentence) + 1 for sentence in sentences), dtype=np.float64, count=len(sentences))
+
+    # Rank sentences by score within each article
+    order = np.lexsort((-scores, sentence_article))
+    ranked_article = sentence_article[order]
+    group_start = np.searchsorted(ranked_article, ranked_article, side="left")
+    rank = np.arange(len(order)) - group_start
+
+    # Keep the best sentences until the article's character budget is reached,
+    # including the one that crosses it
+    cumulative = np.cumsum(lengths[order])
+    before_group = np.concatenate(([0.0], cumulative))[group_start]
+    kept_before = cumulative - lengths[order] - before_group
+    budget = ratio * np.bincount(sentence_article, weights=lengths, minlength=len(articles))
+    keep = np.zeros(len(sentences), dtype=bool)
+    keep[order] = (kept_before < budget[ranked_article]) | (rank < min_sentences)
+
+    compressed = []
+    position = 0
+    for text, article in zip(texts, articles):
+        selected = [sentence for offset, sentence in enumerate(article) if keep[position + offset]]
+        position += len(article)
+        compressed.append(" ".join(selected) if selected else (text if isinstance(text, str) else ""))
+    return compressed
+
+
+def rouge_n(reference, candidate, n=1):
+    """
+    ROUGE-N precision, recall and F1 of a candidate text against a reference.
+
+    Args:
+        reference (str): Reference text
+        candidate (str): Candidate text
+        n (int): N-gram length
+
+    Returns:
+        dict: precision, recall and f1
+    """
+    def ngrams(text):
+        words = tokenize(text)
+        counts = {}
+        for i in range(len(words) - n + 1):
+            gram = tuple(words[i:i + n])
+            counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    ref, cand = ngrams(reference), ngrams(candidate)
+    overlap = sum(min(count, cand.get(gram, 0)) for gram, count in ref.items())
+    precision = overlap / sum(cand.values()) if cand else 0.0
+    recall = overlap / sum(ref.values()) if ref else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def evaluate_compression(summarized_csv, ratios=(0.2, 0.3, 0.5), sample=None, seed=0, llm=False):
+    """
+    Measure compression against the existing summaries in summarized_articles.csv.
+
+    Without `llm`, no model is called: for each ratio the report gives the
+    share of characters kept and the ROUGE-1 recall of the existing summary
+    in the compressed text (how much of what the summary says survives the
+    cut). With `llm`, the articles are also summarized from the full and the
+    compressed text, and the new summaries are scored against the existing
+    ones, next to time and tokens per article.
+
+    Args:
+        summarized_csv (str): Path to summarized_articles.csv
+        ratios (iterable): Compression ratios to compare
+        sample (int): Only use this many randomly chosen articles
+        seed (int): Seed for the sample
+        llm (bool): Also summarize with the LLM and score the summaries
+
+    Returns:
+        list: One result row per ratio (ratio 1.0 is the uncompressed baseline)
+    """
+    # Article bodies can exceed the csv module's default field limit
+    csv.field_size_limit(sys.maxsize)
+    with open(summarized_csv, "r", newline="", encoding="utf-8") as f:
+        pairs = [(row["Content"], row["Summary"]) for row in csv.DictReader(f)
+                 if row["Content"] and row["Summary"] and not row["Summary"].startswith("Error summarizing")]
+    if sample and sample < len(pairs):
+        pairs = random.Random(seed).sample(pairs, sample)
+    contents, references = [content for content, _ in pairs], [summary for _, summary in pairs]
+    total_chars = sum(len(text) for text in contents)
+
+    rows = []
+    for ratio in [1.0] + [r for r in ratios if r < 1.0]:
+        start = time.perf_counter()
+        compressed = contents if ratio == 1.0 else compress_articles(contents, ratio)
+        row = {
+            "ratio": ratio,
+            "articles": len(contents),
+            "kept_chars": sum(len(text) for text in compressed) / total_chars,
+            "extract_ms_per_article": 1000 * (time.perf_counter() - start) / len(contents),
+            "summary_recall": sum(rouge_n(ref, text)["recall"] for ref, text in zip(references, compressed))
+                              / len(contents),
+        }
+        if llm:
+            row.update(_summarize_and_score(compressed, references))
+        rows.append(row)
+
+    header = f"{'ratio':>6}{'kept':>7}{'extract ms':>12}{'recall':>8}"
+    if llm:
+        header += f"{'ROUGE-1':>9}{'ROUGE-2':>9}{'s/art':>7}{'tok/art':>9}"
+    print(header)
+    for row in rows:
+        line = (f"{row['ratio']:>6.2f}{row['kept_chars']:>7.2f}{row['extract_ms_per_article']:>12.2f}"
+                f"{row['summary_recall']:>8.3f}")
+        if llm:
+            line += (f"{row['rouge1_f1']:>9.3f}{row['rouge2_f1']:>9.3f}{row['seconds_per_article']:>7.2f}"
+                     f"{row['tokens_per_article']:>9.0f}")
+        print(line)
+    return rows
+
+
+def _summarize_and_score(contents, references):
+    """
+    Summarize texts with the pipeline's summarizer and score them against reference summaries.
+    """
+    import pandas as pd
+    from llm_router import usage_totals
+    from summarizer import summarize_article_with_rate_limits
+
+    before = usage_totals()
+    start = time.perf_counter()
+    summaries = summarize_article_with_rate_limits(pd.DataFrame({"Content": contents}))["Summary"].tolist()
+    seconds = time.perf_counter() - start
+    after = usage_totals()
+    prompt_tokens = after["prompt_tokens"] - before["prompt_tokens"]
+    tokens = prompt_tokens + after["completion_tokens"] - before["completion_tokens"]
+    n = len(contents)
+    return {
+        "rouge1_f1": sum(rouge_n(ref, s, 1)["f1"] for ref, s in zip(references, summaries)) / n,
+        "rouge2_f1": sum(rouge_n(ref, s, 2)["f1"] for ref, s in zip(references, summaries)) / n,
+        "seconds_per_article": seconds / n,
+        "tokens_per_article": tokens / n,
+        "prompt_tokens_per_article": prompt_tokens / n,
+    }
@@ -0,0 +1,226 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from cluster import (
+    batch_articles,
+    get_theme_mapping_prompt,
+    prepare_articles_from_df,
+    process_batches,
+    reformat_results,
+    theme_mapping_router,
+)
+from llm_router import TAG_MODEL, get_router
+from structured_output import parse_json_object
+
+# Level 1 of the hierarchy: a fixed list of coarse health domains. Every
+# article is assigned to exactly one of them by a fast model, and themes are
+# then discovered separately inside each domain.
+DOMAINS = [
+    "Nutrition & Diet",
+    "Fitness & Exercise",
+    "Heart & Circulation",
+    "Brain Health & Dementia",
+    "Mental Health & Wellbeing",
+    "Cancer",
+    "Diabetes & Metabolic Health",
+    "Infectious Disease & Vaccines",
+    "Eyes, Ears & Teeth",
+    "Bones, Joints & Pain",
+    "Sleep",
+    "Medications & Treatments",
+    "Healthcare Access & Insurance",
+    "Caregiving & Family",
+    "Sexual & Reproductive Health",
+    "Healthy Aging & Longevity",
+]
+OTHER_DOMAIN = "Other Health Topics"
+
+DOMAIN_ENDPOINTS = [("groq", TAG_MODEL), ("openai", "gpt-4o-mini")]
+
+
+def get_domain_prompt() -> str:
+    """
+    Return the prompt template for level-1 domain assignment.
+
+    Returns:
+        str: The prompt template string
+    """
+    return """
+    You are a **Health Domain Classifier**.
+
+    Assign every article to exactly ONE domain from this fixed list, using the
+    domain names verbatim:
+    {domains_json}
+
+    Return **only** JSON:
+
+    {{
+    "doc_to_domain": {{"<article_id>":"<domain>" }}
+    }}
+
+    articles:
+    {articles_json}
+    """
+
+
+def assign_domains(articles: List, batch_size: int = 25, summary_chars: int = 400) -> Dict[str, str]:
+    """
+    Assign each article to one coarse domain. Batches are independent of each
+    other because the domain list is fixed, so they run concurrently.
+
+    Args:
+        articles (List): Article objects or records
+        batch_size (int): Articles per classification prompt
+        summary_chars (int): Summary characters sent per article
+
+    Returns:
+        Dict[str, str]: Article ID → domain
+    """
+    router = get_router("domains", DOMAIN_ENDPOINTS)
+    prompt_template = get_domain_prompt()
+    domains_json = json.dumps(DOMAINS + [OTHER_DOMAIN], indent=2)
+    batches = batch_articles(articles, batch_size=batch_size)
+
+    def classify(batch):
+        articles_json = json.dumps(
+            [{"article_id": a.article_id, "summary": a.summary[:summary_chars]} for a in batch],
+            indent=2, ensure_ascii=False,
+        )
+        prompt = prompt_template.format(domains_json=domains_json, articles_json=articles_json)
+        try:
+            response = router.complete([{"role": "user", "content": prompt}], temperature=0, json_mode=True)
+            doc_to_domain = parse_json_object(response.content).get("doc_to_domain") or {}
+            doc_to_domain = {str(k): v for k, v in doc_to_domain.items()}
+        except Exception as e:
+            print(f"Error assigning domains, using '{OTHER_DOMAIN}' for this batch: {e}")
+            doc_to_domain = {}
+        # Unknown domain names and missing articles fall back to the catch-all domain
+        return {
+            a.article_id: doc_to_domain.get(a.article_id) if doc_to_domain.get(a.article_id) in DOMAINS
+            else OTHER_DOMAIN
+            for a in batch
+        }
+
+    article_to_domain = {}
+    with ThreadPoolExecutor(max_workers=max(1, router.max_concurrency)) as executor:
+        for assigned in executor.map(classify, batches):
+            article_to_domain.update(assigned)
+    print(f"Assigned {len(article_to_domain)} articles to "
+          f"{len(set(article_to_domain.values()))} domains")
+    return article_to_domain
+
+
+def cluster_domain(domain: str, articles: List, batch_size: int, model_name: str,
+                   existing_themes: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Run level-2 theme mapping over the articles of one domain. Prompts only
+    carry the themes found in this domain.
+
+    Args:
+        domain (str): Domain name
+        articles (List): Articles assigned to the domain
+        batch_size (int): Articles per theme-mapping prompt
+        model_name (str): The OpenAI model to use for clustering
+        existing_themes (Iterable[str]): Themes already found in this domain
+
+    Returns:
+        Dict[str, str]: Article ID → theme
+    """
+    print(f"Clustering {len(articles)} articles in domain '{domain}'...")
+    _, article_to_theme = process_batches(
+        batch_articles(articles, batch_size=batch_size),
+        set(existing_themes),
+        {},
+        theme_mapping_router(model_name),
+        get_theme_mapping_prompt(),
+    )
+    return article_to_theme
+
+
+def cluster_hierarchical(df, batch_size: int = 5, model_name: str = "gpt-4",
+                         articles=None, max_workers: int = None,
+                         existing_themes: Dict[str, List[str]] = None) -> Tuple[Dict[str, List[str]], Dict]:
+    """
+    Two-level clustering: assign articles to coarse domains, then discover
+    themes within each domain, with the domains processed in parallel.
+
+    Args:
+        df (DataFrame): DataFrame containing article data
+        batch_size (int): Articles per theme-mapping prompt
+        model_name (str): The OpenAI model to use for clustering
+        articles (list): Pre-built article records; when given, df is not used
+        max_workers (int): Domains clustered at once; defaults to the
+            concurrency budget of the clustering models
+        existing_themes (dict): Domain → theme names the domain's prompts
+            start from
+
+    Returns:
+        Tuple containing:
+        - Flat theme groups mapping themes to lists of article IDs
+        - Hierarchy mapping domain → theme → list of article IDs
+    """
+    try:
+        if articles is None:
+            articles, _ = prepare_articles_from_df(df)
+
+        article_to_domain = assign_domains(articles)
+        by_domain = {}
+        for article in articles:
+            by_domain.setdefault(article_to_domain[article.article_id], []).append(article)
+
+        if max_workers is None:
+            max_workers = theme_mapping_router(model_name).max_concurrency
+        hierarchy = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(by_domain)))) as executor:
+            futures = {
+                domain: executor.submit(cluster_domain, domain, domain_articles, batch_size, model_name,
+                                        (existing_themes or {}).get(domain, ()))
+                for domain, domain_articles in by_domain.items()
+            }
+            for domain, future in futures.items():
+                hierarchy[domain] = reformat_results(future.result())
+
+        # The same theme name may come up in several domains; the flat view merges them
+        theme_groups = {}
+        for themes in hierarchy.values():
+            for theme, ids in themes.items():
+                theme_groups.setdefault(theme, []).extend(ids)
+        return theme_groups, hierarchy
+
+    except Exception as e:
+        raise Exception(f"Error in hierarchical clustering: {e}")
+
+
+def create_hierarchy_mapping_json(df, hierarchy_json_path, output_file="results/cluster_hierarchy.json"):
+    """
+    Create the nested domain → theme → links/count mapping.
+
+    Args:
+        df (DataFrame): DataFrame with 'Id' and 'Link' columns
+        hierarchy_json_path (str): Path to theme_hierarchy.json
+        output_file (str): Path of the nested mapping JSON to write
+    """
+    try:
+        with open(hierarchy_json_path, "r") as f:
+            hierarchy = json.load(f)
+
+        link_by_id = dict(zip(df["Id"].astype(int), df["Link"]))
+        nested = {}
+        # Largest domains first, like the themes in the report
+        for domain, themes in sorted(hierarchy.items(), key=lambda item: -sum(len(ids) for ids in item[1].values())):
+            domain_themes = {}
+            for theme, ids in themes.items():
+                links = [link_by_id[int(i)] for i in ids if int(i) in link_by_id]
+                domain_themes[theme] = {"links": links, "count": len(links)}
+            nested[domain] = {
+                "count": sum(entry["count"] for entry in domain_themes.values()),
+                "themes": domain_themes,
+            }
+
+        with open(output_file, "w") as f:
+            json.dump(nested, f, indent=2)
+        print(f"Hierarchy saved to {output_file}")
+
+    except Exception as e:
+        raise Exception(f"Error creating hierarchy mapping: {e}")
@@ -0,0 +1,330 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from utils import canonicalize_url
+
+DEFAULT_CACHE_DIR = "results/http_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CachedResponse:
+    """
+    Minimal response object returned by the cache, exposing the parts of
+    `requests.Response` the scraper uses.
+
+    Args:
+        url (str): Requested URL
+        status_code (int): HTTP status
+        content (bytes): Response body
+        headers (dict): Response headers
+        cache_status (str): "hit" (served fresh from disk), "revalidated"
+            (server answered 304) or "miss" (downloaded)
+    """
+
+    def __init__(self, url, status_code, content, headers, cache_status):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.cache_status = cache_status
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    @property
+    def from_cache(self):
+        return self.cache_status in ("hit", "revalidated")
+
+    def raise_for_status(self):
+        """
+        Raise requests.HTTPError for 4xx/5xx responses, like requests does.
+        """
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def freshness_lifetime(headers):
+    """
+    Work out how long a response may be served without revalidation.
+
+    Responses that vary on request headers other than Accept-Encoding are
+    not stored, since the cache is keyed by URL alone. Every request sends
+    the same Accept-Encoding, and bodies are stored decoded. The Age header
+    counts against max-age, so a response that already sat in a CDN is not
+    kept fresh longer than its origin allows.
+
+    Args:
+        headers (dict): Response headers
+
+    Returns:
+        Tuple of (seconds the response stays fresh, whether it may be stored)
+    """
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cache_control:
+        return 0, False
+    vary = {field.strip().lower() for field in (headers.get("Vary") or "").split(",") if field.strip()}
+    if vary - {"accept-encoding"}:
+        return 0, False
+    if "no-cache" in cache_control:
+        return 0, True
+    match = re.search(r"s-maxage=(\d+)", cache_control) or re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        try:
+            age = int(headers.get("Age") or 0)
+        except ValueError:
+            age = 0
+        return max(0, int(match.group(1)) - age), True
+    if headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+            return max(0, expires - time.time()), True
+        except (TypeError, ValueError):
+            return 0, True
+    return 0, True
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache keyed by canonical URL. Bodies are stored
+    zlib-compressed; metadata (validators, expiry, size, last access) lives in
+    an SQLite index so several processes can share the cache.
+
+    Fresh entries are served from disk. Stale entries are revalidated with
+    If-None-Match / If-Modified-Since, and a 304 reuses the stored body. Once
+    a URL has been fetched or revalidated, later requests in the same process
+    are served from disk, so pages reached through several links (e.g. with
+    different #fragments) usually cost one request per run. A 304 also
+    refreshes the stored validators and expiry. When the cache exceeds
+    `max_bytes`, the least recently used entries are evicted.
+
+    The scraper shares one instance between its threads. A single lock
+    serializes access to the SQLite index and updates of the hit/revalidated/
+    miss counters in `stats`. Fetches themselves are not coordinated, so
+    threads requesting the same uncached URL at once each go to the network.
+
+    Args:
+        directory (str): Cache directory
+        max_bytes (int): Maximum total size of the compressed bodies
+        timeout (float): Request timeout in seconds
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, timeout=30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, url TEXT, status INTEGER, etag TEXT, last_modified TEXT, "
+            "content_type TEXT, expires REAL, size INTEGER, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._db.commit()
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0}
+        # Keys already fetched or revalidated by this process
+        self._checked = set()
+
+    def _key(self, url):
+        return hashlib.sha256(canonicalize_url(url).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, "objects", key[:2], key)
+
+    def _lookup(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, etag, last_modified, content_type, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, status, etag, last_modified, content_type, expires = row
+        return {"url": url, "status": status, "etag": etag, "last_modified": last_modified,
+                "content_type": content_type, "expires": expires}
+
+    def _read_body(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+    def _touch(self, key):
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def _refresh(self, key, entry, response, lifetime):
+        """
+        Update a stored entry from a 304 response: new validators replace the
+        stored ones, and the expiry restarts from the 304's freshness lifetime.
+        """
+        entry["etag"] = response.headers.get("ETag") or entry["etag"]
+        entry["last_modified"] = response.headers.get("Last-Modified") or entry["last_modified"]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET etag = ?, last_modified = ?, expires = ?, last_access = ? WHERE key = ?",
+                (entry["etag"], entry["last_modified"], now + lifetime, now, key),
+            )
+            self._db.commit()
+
+    def _count(self, cache_status):
+        # The scraper fetches from several threads
+        with self._lock:
+            self.stats[cache_status] += 1
+
+    def _store(self, key, url, response, lifetime):
+        compressed = zlib.compress(response.content, 6)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, canonicalize_url(url), response.status_code, response.headers.get("ETag"),
+                 response.headers.get("Last-Modified"), response.headers.get("Content-Type"),
+                 now + lifetime, len(compressed), now),
+            )
+            self._db.commit()
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        """
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            removed = []
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                removed.append(key)
+                total -= size
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in removed])
+            self._db.commit()
+        for key in removed:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, url):
+        """
+        Fetch a URL through the cache.
+
+        Args:
+            url (str): URL to fetch
+
+        Returns:
+            CachedResponse: Response, served from disk when possible
+
+        Raises:
+            requests.RequestException: On network errors
+        """
+        key = self._key(url)
+        entry = self._lookup(key)
+        body = self._read_body(key) if entry else None
+        if entry and body is None:
+            entry = None
+
+        if entry and (entry["expires"] > time.time() or key in self._checked):
+            self._touch(key)
+            return self._cached(url, entry, body, "hit")
+
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = requests.get(url, headers=headers, timeout=self.timeout)
+        lifetime, storable = freshness_lifetime(response.headers)
+
+        self._checked.add(key)
+        if response.status_code == 304 and entry:
+            self._refresh(key, entry, response, lifetime)
+            return self._cached(url, entry, body, "revalidated")
+
+        if response.status_code == 200 and storable:
+            self._store(key, url, response, lifetime)
+        self._count("miss")
+        return CachedResponse(url, response.status_code, response.content, dict(response.headers), "miss")
+
+    def _cached(self, url, entry, body, cache_status):
+        self._count(cache_status)
+        headers = {"Content-Type": entry["content_type"] or ""}
+        return CachedResponse(url, entry["status"], body, headers, cache_status)
+
+
+_cache = None
+_cache_settings = {"enabled": True, "directory": DEFAULT_CACHE_DIR, "max_bytes": DEFAULT_MAX_BYTES}
+_cache_lock = threading.Lock()
+
+
+def configure_cache(enabled=True, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Configure the process-wide cache used by `fetch`.
+
+    Args:
+        enabled (bool): Whether to use the cache at all
+        directory (str): Cache directory
+        max_bytes (int): Maximum total size of the compressed bodies
+    """
+    global _cache
+    with _cache_lock:
+        _cache_settings.update(enabled=enabled, directory=directory, max_bytes=max_bytes)
+        _cache = None
+
+
+def get_cache():
+    """
+    Return the process-wide cache, creating it on first use.
+
+    Returns:
+        HttpCache: The cache, or None when caching is disabled
+    """
+    global _cache
+    with _cache_lock:
+        if not _cache_settings["enabled"]:
+            return None
+        if _cache is None:
+            _cache = HttpCache(_cache_settings["directory"], _cache_settings["max_bytes"])
+        return _cache
+
+
+def fetch(url):
+    """
+    GET a URL, through the on-disk cache unless caching is disabled.
+
+    Args:
+        url (str): URL to fetch
+
+    Returns:
+        CachedResponse or requests.Response
+    """
+    cache = get_cache()
+    if cache is None:
+        return requests.get(url, timeout=30)
+    return cache.get(url)
@@ -0,0 +1,548 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ratelimit import get_limiter
+from utils import load_env_variables
+
+# Models that reject response_format={"type": "json_object"}
+NO_JSON_MODE_MODELS = ("gpt-4", "gpt-4-0314", "gpt-4-0613", "gpt-4-32k")
+
+# Models and endpoints (in preference order) of the tag and summarize routes.
+# They live here rather than in tagger/summarizer so the pipeline can read
+# them without importing those modules.
+TAG_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+TAG_ENDPOINTS = [("groq", TAG_MODEL), ("openai", "gpt-4o-mini")]
+SUMMARY_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+SUMMARY_ENDPOINTS = [("groq", SUMMARY_MODEL), ("openai", "gpt-4o-mini")]
+
+
+class Completion:
+    """
+    Text returned by a backend together with its token usage.
+
+    Args:
+        content (str): Generated text
+        backend (str): Name of the backend that produced it
+        prompt_tokens (int): Input tokens reported by the provider
+        completion_tokens (int): Output tokens reported by the provider
+    """
+
+    def __init__(self, content, backend, prompt_tokens=0, completion_tokens=0):
+        self.content = content
+        self.backend = backend
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class EndpointStats:
+    """
+    Rolling health statistics for one backend: latency, error rate, remaining
+    provider quota and a cooldown after rate-limit errors.
+
+    Args:
+        window (int): Number of recent calls kept for latency and error rate
+    """
+
+    def __init__(self, window=50):
+        self.samples = deque(maxlen=window)
+        self.remaining_requests = None
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok, completion=None):
+        """
+        Record the outcome of one call.
+
+        Args:
+            latency (float): Seconds the call took
+            ok (bool): Whether the call succeeded
+            completion (Completion): Result of a successful call
+        """
+        with self._lock:
+            self.samples.append((latency, ok))
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            if completion is not None:
+                self.prompt_tokens += completion.prompt_tokens
+                self.completion_tokens += completion.completion_tokens
+
+    def latency_quantile(self, quantile):
+        """
+        Latency quantile over recent successful calls.
+
+        Args:
+            quantile (float): Quantile between 0 and 1
+
+        Returns:
+            float: Latency in seconds, or None without samples
+        """
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(int(quantile * len(latencies)), len(latencies) - 1)]
+
+    def error_rate(self):
+        """
+        Fraction of recent calls that failed.
+
+        Returns:
+            float: Error rate between 0 and 1
+        """
+        with self._lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def snapshot(self):
+        """
+        Summarize the statistics for reporting.
+
+        Returns:
+            dict: Calls, errors, tokens, median latency and remaining quota
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "p50_latency": self.latency_quantile(0.5),
+            "remaining_requests": self.remaining_requests,
+        }
+
+
+def parse_reset_seconds(value):
+    """
+    Parse a provider reset/retry header such as "12", "1.5s" or "2m59.56s".
+
+    Args:
+        value (str): Header value
+
+    Returns:
+        float: Seconds, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m(?!s))?(?:([\d.]+)s)?(?:([\d.]+)ms)?", value.strip())
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds, millis = match.groups()
+    return (int(hours or 0) * 3600 + int(minutes or 0) * 60
+            + float(seconds or 0) + float(millis or 0) / 1000)
+
+
+class Backend:
+    """
+    A model endpoint the router can send chat requests to.
+
+    Calls go through the model's shared rate limiter, and their latency,
+    errors and quota headers are recorded in `stats`.
+
+    Args:
+        provider (str): Provider name ("groq", "openai" or "stub")
+        model (str): Model name
+    """
+
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        self.name = f"{provider}:{model}"
+        self.limiter = get_limiter(model)
+        self.stats = EndpointStats()
+
+    @property
+    def supports_json_mode(self):
+        return self.provider != "stub" and self.model not in NO_JSON_MODE_MODELS
+
+    def _create(self, messages, **options):
+        """
+        Send the request to the provider. Implemented by subclasses.
+
+        Returns:
+            Tuple of (Completion, response headers dict)
+        """
+        raise NotImplementedError
+
+    def complete(self, messages, started=None, **options):
+        """
+        Run one chat completion and record its outcome.
+
+        Args:
+            messages (list): Chat messages as {"role", "content"} dicts
+            started (threading.Event): Set once the call leaves the rate-limit queue
+            **options: Provider options such as temperature. json_mode=True
+                requests a JSON object reply from models that support it and
+                is ignored by the others.
+
+        Returns:
+            Completion: Generated text and token usage
+        """
+        if options.pop("json_mode", False) and self.supports_json_mode:
+            options["response_format"] = {"type": "json_object"}
+        with self.limiter:
+            if started is not None:
+                started.set()
+            start = time.monotonic()
+            try:
+                completion, headers = self._create(messages, **options)
+            except Exception as e:
+                self.stats.record(time.monotonic() - start, False)
+                self._apply_error(e)
+                raise
+        self.stats.record(time.monotonic() - start, True, completion)
+        self._apply_headers(headers or {})
+        return completion
+
+    def _apply_headers(self, headers):
+        """
+        Update remaining quota from rate-limit response headers.
+
+        Args:
+            headers (dict): Response headers
+        """
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None:
+            try:
+                self.stats.remaining_requests = int(remaining)
+            except ValueError:
+                pass
+            if self.stats.remaining_requests == 0:
+                reset = parse_reset_seconds(headers.get("x-ratelimit-reset-requests")) or 60.0
+                self.stats.cooldown_until = time.monotonic() + reset
+
+    def _apply_error(self, error):
+        """
+        Put the backend in cooldown after a rate-limit error.
+
+        Args:
+            error (Exception): Error raised by the provider client
+        """
+        if getattr(error, "status_code", None) != 429:
+            return
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = parse_reset_seconds(headers.get("retry-after")) or 30.0
+        self.stats.cooldown_until = time.monotonic() + retry_after
+
+    def is_healthy(self, max_error_rate=0.5, min_samples=5):
+        """
+        Check whether the backend should receive new requests.
+
+        Args:
+            max_error_rate (float): Error rate above which the backend is avoided
+            min_samples (int): Calls needed before the error rate is trusted
+
+        Returns:
+            bool: True if the backend is usable
+        """
+        if time.monotonic() < self.stats.cooldown_until:
+            return False
+        if len(self.stats.samples) >= min_samples and self.stats.error_rate() > max_error_rate:
+            return False
+        return True
+
+
+class OpenAICompatibleBackend(Backend):
+    """
+    Backend for providers exposing the OpenAI chat-completions API (Groq and
+    OpenAI). The client is created lazily from the keys in .env.
+    """
+
+    def __init__(self, provider, model):
+        super().__init__(provider, model)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def client(self):
+        """
+        Create the provider client on first use.
+
+        Returns:
+            Client object for the provider
+        """
+        with self._client_lock:
+            if self._client is None:
+                env_vars = load_env_variables(validate=False)
+                if self.provider == "groq":
+                    from groq import Groq
+                    self._client = Groq(api_key=env_vars["groq_api_key"])
+                else:
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=env_vars["openai_api_key"])
+            return self._client
+
+    def _create(self, messages, **options):
+        raw = self.client().chat.completions.with_raw_response.create(
+            model=self.model, messages=messages, **options
+        )
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        completion = Completion(
+            response.choices[0].message.content.strip(),
+            self.name,
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0,
+        )
+        return completion, dict(raw.headers)
+
+
+class StubError(Exception):
+    """
+    Error injected by StubBackend. Like the provider clients' errors, it
+    carries the HTTP status in `status_code`.
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StubBackend(Backend):
+    """
+    Local backend for tests and offline runs. It never touches the network.
+
+    Args:
+        model (str): Model name to report
+        responder (callable): Function of the messages returning the reply text;
+            defaults to echoing the start of the last message
+        latency (float or callable): Seconds to sleep per call, or a function of
+            the call number (starting at 1) returning them
+        fail_first (int): Number of initial calls that raise an error
+        fail_status (int): HTTP status of the injected errors, e.g. 429 to
+            simulate rate limiting
+    """
+
+    def __init__(self, model="stub", responder=None, latency=0.0, fail_first=0, fail_status=None):
+        super().__init__("stub", model)
+        self.responder = responder or (lambda messages: messages[-1]["content"][:300])
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self._count_lock = threading.Lock()
+        self._count = 0
+
+    @property
+    def calls(self):
+        return self._count
+
+    def _create(self, messages, **options):
+        with self._count_lock:
+            self._count += 1
+            count = self._count
+        latency = self.latency(count) if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+        if count <= self.fail_first:
+            raise StubError(f"Stub backend {self.name} failure {count}", self.fail_status)
+        text = self.responder(messages)
+        prompt_tokens = sum(len(message["content"].split()) for message in messages)
+        return Completion(text, self.name, prompt_tokens, len(text.split())), {}
+
+
+class Router:
+    """
+    Send each request to the fastest healthy backend, fail over to the next
+    one on errors, and hedge slow requests by racing a second backend once the
+    primary exceeds its recent tail latency.
+
+    Args:
+        backends (list): Backend objects in preference order
+        hedge (bool): Whether to hedge slow requests
+        hedge_quantile (float): Latency quantile of the primary that triggers a hedge
+        hedge_after (float): Hedge delay in seconds before latency samples exist
+        default_latency (float): Assumed latency of backends without samples
+    """
+
+    def __init__(self, backends, hedge=True, hedge_quantile=0.9, hedge_after=20.0, default_latency=5.0):
+        if not backends:
+            raise Exception("Router needs at least one backend")
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after = hedge_after
+        self.default_latency = default_latency
+        self._executor = ThreadPoolExecutor(max_workers=max(16, 2 * self.max_concurrency))
+
+    @property
+    def max_concurrency(self):
+        """
+        Total number of in-flight requests the backends allow.
+
+        Returns:
+            int: Sum of the backends' concurrency budgets
+        """
+        return sum(backend.limiter.max_concurrency for backend in self.backends)
+
+    def ranked_backends(self):
+        """
+        Order backends by health, then expected latency, then preference.
+
+        Returns:
+            list: Backends, best first
+        """
+        def score(item):
+            position, backend = item
+            latency = backend.stats.latency_quantile(0.5)
+            return (not backend.is_healthy(), latency if latency is not None else self.default_latency, position)
+
+        return [backend for _, backend in sorted(enumerate(self.backends), key=score)]
+
+    def _hedge_delay(self, backend):
+        latency = backend.stats.latency_quantile(self.hedge_quantile)
+        return latency if latency is not None else self.hedge_after
+
+    def complete(self, messages, **options):
+        """
+        Run a chat completion on the best available backend.
+
+        Args:
+            messages (list): Chat messages as {"role", "content"} dicts
+            **options: Provider options such as temperature
+
+        Returns:
+            Completion: First successful result
+
+        Raises:
+            Exception: If every backend failed
+        """
+        candidates = self.ranked_backends()
+        futures = {}
+        errors = []
+
+        def launch():
+            backend = candidates.pop(0)
+            started = threading.Event()
+            futures[self._executor.submit(backend.complete, messages, started, **options)] = backend
+            return backend, started
+
+        primary, started = launch()
+        hedged = False
+        while futures:
+            timeout = None
+            if self.hedge and not hedged and candidates:
+                # Time the hedge from when the call leaves the rate-limit queue,
+                # so waiting for our own budget does not trigger duplicates
+                started.wait()
+                timeout = self._hedge_delay(primary)
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slower than its usual tail: race the next backend
+                hedged = True
+                print(f"Hedging slow request on {primary.name} with {candidates[0].name}")
+                launch()
+                continue
+
+            for future in done:
+                backend = futures.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{backend.name}: {e}")
+                    if candidates and not futures:
+                        print(f"Backend {backend.name} failed ({e}); failing over to {candidates[0].name}")
+                        primary, started = launch()
+                        hedged = False
+
+        raise Exception(f"All backends failed: {'; '.join(errors)}")
+
+    def stats(self):
+        """
+        Health and usage statistics per backend.
+
+        Returns:
+            dict: Backend name → statistics snapshot
+        """
+        return {backend.name: backend.stats.snapshot() for backend in self.backends}
+
+
+_routers = {}
+_overrides = {}
+_routers_lock = threading.Lock()
+
+
+def make_backend(provider, model):
+    """
+    Create a backend for an endpoint. When the LLM_BACKEND environment
+    variable is "stub", every endpoint is replaced by a local StubBackend.
+
+    Args:
+        provider (str): "groq", "openai" or "stub"
+        model (str): Model name
+
+    Returns:
+        Backend: Backend for the endpoint
+    """
+    if provider == "stub" or os.environ.get("LLM_BACKEND") == "stub":
+        return StubBackend(model)
+    if provider in ("groq", "openai"):
+        return OpenAICompatibleBackend(provider, model)
+    raise Exception(f"Unknown LLM provider '{provider}'")
+
+
+def get_router(route, endpoints, **router_options):
+    """
+    Return the shared router for a route, creating it on first use. Callers
+    passing different endpoints or router options get separate routers.
+
+    Args:
+        route (str): Route name, e.g. "summarize"
+        endpoints (list): (provider, model) pairs in preference order
+        **router_options: Extra Router arguments such as hedge=False
+
+    Returns:
+        Router: Router shared by every caller of this route with these settings
+    """
+    key = (route, tuple(endpoints), tuple(sorted(router_options.items())))
+    with _routers_lock:
+        if route in _overrides:
+            return _overrides[route]
+        if key not in _routers:
+            _routers[key] = Router([make_backend(p, m) for p, m in endpoints], **router_options)
+        return _routers[key]
+
+
+def set_router(route, router):
+    """
+    Install a router for a route regardless of the endpoints callers request,
+    e.g. one built from StubBackends in tests. Pass None to remove it.
+
+    Args:
+        route (str): Route name
+        router (Router): Router to return for this route
+    """
+    with _routers_lock:
+        if router is None:
+            _overrides.pop(route, None)
+        else:
+            _overrides[route] = router
+
+
+def usage_totals():
+    """
+    Sum calls, errors and tokens over every router created in this process.
+
+    Returns:
+        dict: calls, errors, prompt_tokens and completion_tokens
+    """
+    with _routers_lock:
+        routers = {id(router): router for router in list(_routers.values()) + list(_overrides.values())}
+    totals = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for router in routers.values():
+        for snapshot in router.stats().values():
+            for key in totals:
+                totals[key] += snapshot[key]
+    return totals
@@ -1,99 +1,1104 @@
-from scraper import extract_article_content
-from cleaner import clean_articles
-from summarizer import summarize_article
-from cluster import cluster_articles
-from utils import create_document_to_theme_count_mapping_json, dump_json, load_env_variables
-from tagger import article_tagger
+import argparse
+import json
 import os
 import sys
+import time
 
+# Heavy modules (pandas, bs4, groq, langchain, pydantic) are imported inside the
+# stage functions below so that `python main.py <command>` only loads what that
+# command actually needs.
 
+DEFAULT_LINK = "https://www.aarp.org/health"
+RESULTS_DIR = "results"
 
-def main(link):
+STAGES = ("scrape", "clean", "tag", "summarize", "cluster", "aggregate", "index", "history")
+LLM_STAGES = ("tag", "summarize", "cluster")
+SHARD_STAGES = ("scrape", "clean", "tag", "summarize")
+COMMANDS = ("run",) + STAGES + ("batch", "shard", "bench-memory", "bench-cluster", "bench-summary", "search",
+                                "trends")
+
+
+def results_path(name, results_dir=RESULTS_DIR):
+    """
+    Build the path of a pipeline artifact inside the results directory.
+
+    Args:
+        name (str): File name of the artifact
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        str: Path to the artifact
+    """
+    return os.path.join(results_dir, name)
+
+
+def read_csv(path):
+    """
+    Load an intermediate CSV written by an earlier stage.
+
+    Args:
+        path (str): Path to the CSV file
+
+    Returns:
+        DataFrame: Loaded DataFrame
+    """
+    import pandas as pd
+
+    if not os.path.exists(path):
+        raise Exception(f"{path} not found. Run the earlier pipeline stages first.")
+    return pd.read_csv(path)
+
+
+def scrape_stage(link=DEFAULT_LINK, discovery="sitemap", results_dir=RESULTS_DIR):
+    """
+    Scrape articles from the provided link into results/health_articles.csv.
+
+    Args:
+        link (str): Base URL to scrape health articles from
+        discovery (str): "sitemap" (sitemaps/RSS, crawler as fallback), "adaptive" or "crawl"
+        results_dir (str): Directory holding the pipeline outputs and the discovery state
+
+    Returns:
+        DataFrame: DataFrame containing article links and content
+    """
+    from scraper import extract_article_content
+
+    print("Scraping articles...")
+    df = extract_article_content(link, discovery=discovery, results_dir=results_dir)
+    if df.empty:
+        print("Error: No articles found. Check the URL and network connection.")
+        raise Exception("No articles found")
+    return df
+
+
+def clean_stage(df=None, results_dir=RESULTS_DIR):
+    """
+    Clean scraped articles and save results/cleaned_articles.csv.
+
+    Args:
+        df (DataFrame): Scraped articles; read from disk when not provided
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        DataFrame: Cleaned DataFrame with an 'Id' column
+    """
+    from cleaner import clean_articles
+
+    if df is None:
+        df = read_csv(results_path("health_articles.csv", results_dir))
+
+    print("Cleaning articles...")
+    cleaned_df = clean_articles(df)
+    if cleaned_df.empty:
+        print("Error: No valid articles after cleaning. Check content quality.")
+        raise Exception("No valid articles after cleaning")
+
+    # Save intermediate result
+    try:
+        cleaned_df.to_csv(results_path("cleaned_articles.csv", results_dir), index=False)
+        print(f"Saved {len(cleaned_df)} cleaned articles to {results_path('cleaned_articles.csv', results_dir)}")
+    except Exception as e:
+        print(f"Warning: Could not save intermediate CSV: {e}")
+        # Continue pipeline despite CSV save error
+    return cleaned_df
+
+
+def tag_stage(cleaned_df=None, results_dir=RESULTS_DIR):
+    """
+    Tag cleaned articles with keywords and save results/document_keywords.json.
+
+    Args:
+        cleaned_df (DataFrame): Cleaned articles; read from disk when not provided
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        dict: Mapping of article links to their extracted keywords
+    """
+    from tagger import article_tagger
+    from utils import dump_json
+
+    if cleaned_df is None:
+        cleaned_df = read_csv(results_path("cleaned_articles.csv", results_dir))
+
+    print("Tagging articles...")
+    document_keywords = article_tagger(cleaned_df)
+    try:
+        dump_json(document_keywords, results_path("document_keywords.json", results_dir))
+    except Exception as json_e:
+        print(f"Warning: Could not save tagging results: {json_e}")
+    return document_keywords
+
+
+def summarize_stage(cleaned_df=None, results_dir=RESULTS_DIR, compression=None):
+    """
+    Summarize cleaned articles and save results/summarized_articles.csv.
+
+    Args:
+        cleaned_df (DataFrame): Cleaned articles; read from disk when not provided
+        results_dir (str): Directory holding the pipeline outputs
+        compression (float): Send only an extractive pre-summary of this share
+            of each article to the LLM; None sends the full text
+
+    Returns:
+        DataFrame: DataFrame with added 'Summary' column
+    """
+    from summarizer import summarize_article
+
+    if cleaned_df is None:
+        cleaned_df = read_csv(results_path("cleaned_articles.csv", results_dir))
+
+    print("Summarizing articles...")
+    summarized_df = summarize_article(cleaned_df, compression=compression)
+
+    # Save intermediate summarized results
+    try:
+        summarized_df.to_csv(results_path("summarized_articles.csv", results_dir), index=False)
+    except Exception as e:
+        print(f"Warning: Could not save summarized CSV: {e}")
+        # Continue pipeline despite CSV save error
+    return summarized_df
+
+
+def cluster_stage(summarized_df=None, results_dir=RESULTS_DIR, batch_size=5, model_name="gpt-4", hierarchical=False,
+                  pregroup=False):
+    """
+    Cluster summarized articles into themes and save results/article_to_theme.json.
+
+    Args:
+        summarized_df (DataFrame): Summarized articles; read from disk when not provided
+        results_dir (str): Directory holding the pipeline outputs
+        batch_size (int): Number of articles sent to the LLM per batch
+        model_name (str): The OpenAI model to use for clustering
+        hierarchical (bool): Group articles into coarse domains first and
+            discover themes within each domain (also saves results/theme_hierarchy.json)
+        pregroup (bool): Group articles by overlap of their results/document_keywords.json
+            keywords and only send one representative per group to the LLM
+
+    Returns:
+        dict: Theme groups mapping themes to lists of article IDs
+    """
+    from utils import dump_json
+
+    if summarized_df is None:
+        summarized_df = read_csv(results_path("summarized_articles.csv", results_dir))
+
+    print("Clustering articles...")
+    if hierarchical or pregroup:
+        from cluster import cluster_article_records, prepare_articles_from_df
+        from pregroup import load_keywords
+
+        articles, _ = prepare_articles_from_df(summarized_df)
+        document_keywords = load_keywords(results_path("document_keywords.json", results_dir)) if pregroup else None
+        article_to_theme, hierarchy = cluster_article_records(
+            articles, batch_size=batch_size, model_name=model_name,
+            hierarchical=hierarchical, document_keywords=document_keywords,
+        )
+        if hierarchy is not None:
+            dump_json(hierarchy, results_path("theme_hierarchy.json", results_dir))
+    else:
+        from cluster import cluster_articles
+
+        article_to_theme = cluster_articles(summarized_df, batch_size=batch_size, model_name=model_name)
+    dump_json(article_to_theme, results_path("article_to_theme.json", results_dir))
+    return article_to_theme
+
+
+def aggregate_stage(summarized_df=None, results_dir=RESULTS_DIR, hierarchical=False):
+    """
+    Re-aggregate clustering output into results/cluster_results.json.
+
+    Args:
+        summarized_df (DataFrame): Summarized articles; read from disk when not provided
+        results_dir (str): Directory holding the pipeline outputs
+        hierarchical (bool): Also write the nested results/cluster_hierarchy.json
+    """
+    from utils import create_document_to_theme_count_mapping_json
+
+    if summarized_df is None:
+        summarized_df = read_csv(results_path("summarized_articles.csv", results_dir))
+
+    themes_path = results_path("article_to_theme.json", results_dir)
+    if not os.path.exists(themes_path):
+        raise Exception(f"{themes_path} not found. Run the cluster stage first.")
+
+    create_document_to_theme_count_mapping_json(
+        summarized_df, themes_path, results_path("cluster_results.json", results_dir)
+    )
+    if hierarchical:
+        from hierarchy import create_hierarchy_mapping_json
+
+        create_hierarchy_mapping_json(
+            summarized_df, results_path("theme_hierarchy.json", results_dir),
+            results_path("cluster_hierarchy.json", results_dir),
+        )
+
+
+def index_stage(results_dir=RESULTS_DIR):
+    """
+    Build the keyword/theme inverted index into results/search_index.sqlite.
+
+    Args:
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        dict: Number of articles, themes and postings indexed
+    """
+    from search_index import build_index
+
+    print("Indexing keywords and themes...")
+    return build_index(
+        results_path("summarized_articles.csv", results_dir),
+        results_path("document_keywords.json", results_dir),
+        results_path("article_to_theme.json", results_dir),
+        results_path("search_index.sqlite", results_dir),
+    )
+
+
+def history_stage(results_dir=RESULTS_DIR):
+    """
+    Append this run's themes to the time-partitioned store in results/history.
+
+    Args:
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        dict: The recorded run entry
+    """
+    from trends import record_run
+
+    return record_run(results_path("cluster_results.json", results_dir), os.path.join(results_dir, "history"))
+
+
+def build_pipeline(link=DEFAULT_LINK, results_dir=RESULTS_DIR, batch_size=5, model_name="gpt-4", discovery="sitemap",
+                   chunk_size=None, hierarchical=False, pregroup=False, profiler=None, links_file=None,
+                   compression=None):
+    """
+    Describe the pipeline as a DAG of stages and the artifacts they exchange.
+
+    Args:
+        link (str): Base URL to scrape health articles from
+        results_dir (str): Directory holding the pipeline outputs
+        batch_size (int): Number of articles sent to the clustering LLM per batch
+        model_name (str): The OpenAI model to use for clustering
+        discovery (str): How the scraper finds articles ("sitemap", "adaptive" or "crawl")
+        chunk_size (int): Process articles from disk in windows of this many rows
+            (bounded-memory mode, see streaming.py); None keeps them in memory
+        hierarchical (bool): Cluster into domains first, then themes within each domain
+        pregroup (bool): Pre-group articles by keyword overlap before clustering
+        profiler (StageProfiler): When given, every stage is profiled (see profiling.py)
+        links_file (str): Scrape exactly the URLs listed in this file instead of
+            discovering them (used by shard workers, see sharding.py)
+        compression (float): Share of each article kept by the extractive
+            pre-summary sent to the summarizer; None sends the full text
+
+    Returns:
+        Pipeline: Pipeline over the scrape → clean → tag/summarize → cluster → aggregate/index stages
+    """
+    from pipeline import Pipeline, Stage
+    from llm_router import SUMMARY_ENDPOINTS, TAG_ENDPOINTS
+
+    raw_csv = results_path("health_articles.csv", results_dir)
+    cleaned_csv = results_path("cleaned_articles.csv", results_dir)
+    keywords_json = results_path("document_keywords.json", results_dir)
+    summarized_csv = results_path("summarized_articles.csv", results_dir)
+    themes_json = results_path("article_to_theme.json", results_dir)
+    clusters_json = results_path("cluster_results.json", results_dir)
+    hierarchy_json = results_path("theme_hierarchy.json", results_dir)
+    nested_clusters_json = results_path("cluster_hierarchy.json", results_dir)
+    index_file = results_path("search_index.sqlite", results_dir)
+
+    if chunk_size:
+        import streaming
+
+        clean = lambda: streaming.stream_clean(raw_csv, cleaned_csv, chunk_size)
+        tag = lambda: streaming.stream_tag(cleaned_csv, keywords_json, chunk_size)
+        summarize = lambda: streaming.stream_summarize(cleaned_csv, summarized_csv, chunk_size, compression)
+        cluster = lambda: streaming.stream_cluster(summarized_csv, themes_json, chunk_size, batch_size, model_name,
+                                                   hierarchy_json if hierarchical else None,
+                                                   keywords_json if pregroup else None)
+        aggregate = lambda: streaming.stream_aggregate(summarized_csv, themes_json, clusters_json,
+                                                       hierarchy_json if hierarchical else None, nested_clusters_json)
+    else:
+        clean = lambda: clean_stage(results_dir=results_dir)
+        tag = lambda: tag_stage(results_dir=results_dir)
+        summarize = lambda: summarize_stage(results_dir=results_dir, compression=compression)
+        cluster = lambda: cluster_stage(results_dir=results_dir, batch_size=batch_size, model_name=model_name,
+                                        hierarchical=hierarchical, pregroup=pregroup)
+        aggregate = lambda: aggregate_stage(results_dir=results_dir, hierarchical=hierarchical)
+
+    if links_file:
+        from sharding import scrape_shard
+
+        scrape = Stage("scrape", lambda: scrape_shard(results_dir), inputs=[links_file], outputs=[raw_csv])
+    else:
+        scrape = Stage("scrape", lambda: scrape_stage(link, discovery, results_dir),
+                       outputs=[raw_csv], config={"link": link, "discovery": discovery})
+
+    stages = [
+        scrape,
+        Stage("clean", clean,
+              inputs=[raw_csv], outputs=[cleaned_csv], deps=["scrape"]),
+        # Tagging is the only step that continues on failure
+        Stage("tag", tag,
+              inputs=[cleaned_csv], outputs=[keywords_json], deps=["clean"],
+              config={"endpoints": TAG_ENDPOINTS}, optional=True),
+        Stage("summarize", summarize,
+              inputs=[cleaned_csv], outputs=[summarized_csv], deps=["clean"],
+              config={"endpoints": SUMMARY_ENDPOINTS, "compression": compression}),
+        # Pre-grouping uses the tagger's keywords, but still runs if tagging failed
+        Stage("cluster", cluster,
+              inputs=[summarized_csv] + ([keywords_json] if pregroup else []),
+              outputs=[themes_json] + ([hierarchy_json] if hierarchical else []),
+              deps=["summarize"] + (["tag"] if pregroup else []),
+              config={"model_name": model_name, "batch_size": batch_size, "hierarchical": hierarchical,
+                      "pregroup": pregroup}),
+        Stage("aggregate", aggregate,
+              inputs=[summarized_csv, themes_json] + ([hierarchy_json] if hierarchical else []),
+              outputs=[clusters_json] + ([nested_clusters_json] if hierarchical else []), deps=["cluster"]),
+        # Indexes whatever keywords exist, so it also runs when tagging failed
+        Stage("index", lambda: index_stage(results_dir),
+              inputs=[summarized_csv, keywords_json, themes_json], outputs=[index_file], deps=["tag", "cluster"]),
+        # Appends to the history, so it has no output of its own to check; it
+        # records each distinct cluster_results.json once
+        Stage("history", lambda: history_stage(results_dir), inputs=[clusters_json], deps=["aggregate"]),
+    ]
+    if profiler is not None:
+        for stage in stages:
+            stage.func = profiler.wrap(stage.name, stage.func)
+    return Pipeline(stages, state_file=results_path("pipeline_state.json", results_dir))
+
+
+def main(link=DEFAULT_LINK, validate=True, only=None, force=(), batch_size=5, model_name="gpt-4", discovery="sitemap",
+         chunk_size=None, hierarchical=False, pregroup=False, profiler=None, compression=None):
     """
     Main pipeline function that orchestrates the entire workflow:
     1. Scrape articles from the provided link
     2. Clean and preprocess the articles
-    3. Tag articles with keywords
-    4. Summarize articles
-    5. Cluster articles into themes
-    6. Generate output files
-    
+    3. Tag articles with keywords and summarize them (concurrently)
+    4. Cluster articles into themes
+    5. Generate output files
+
+    Stages whose inputs and settings have not changed since their last run
+    are skipped and their saved artifacts reused.
+
     Args:
         link (str): Base URL to scrape health articles from
+        validate (bool): Validate the API keys with a live call before starting
+        only (list): Stage names to run; None runs the whole pipeline
+        force (iterable): Stage names to re-run even if up to date ("all" for every stage)
+        batch_size (int): Number of articles sent to the clustering LLM per batch
+        model_name (str): The OpenAI model to use for clustering
+        discovery (str): How the scraper finds articles ("sitemap", "adaptive" or "crawl")
+        chunk_size (int): Process articles from disk in windows of this many rows
+            (bounded-memory mode); None keeps them in memory
+        hierarchical (bool): Cluster into domains first, then themes within each domain
+        pregroup (bool): Pre-group articles by keyword overlap before clustering
+        profiler (StageProfiler): Profile every stage and print the hotspots at the end
+        compression (float): Summarize extractive pre-summaries of this share of
+            each article instead of the full text
+
+    Returns:
+        bool: True if every required stage succeeded or was up to date
     """
     try:
-        # Load environment variables - will raise exception if keys missing
-        env_vars = load_env_variables()
-        
         # Create results directory
-        os.makedirs("results", exist_ok=True)
-
-        # Scraping - raises exception if fails
-        print("Scraping articles...")
-        df = extract_article_content(link)
-        if df.empty:
-            print("Error: No articles found. Check the URL and network connection.")
-            raise Exception("No articles found")
-        
- 
-        # Cleaning - raises exception if fails
-        print("Cleaning articles...")
-        cleaned_df = clean_articles(df)
-        if cleaned_df.empty:
-            print("Error: No valid articles after cleaning. Check content quality.")
-            raise Exception("No valid articles after cleaning")
-        
-        # Save intermediate result
-        try:
-            cleaned_df.to_csv("results/cleaned_articles.csv", index=False)
-            print(f"Saved {len(cleaned_df)} cleaned articles to results/cleaned_articles.csv")
-        except Exception as e:
-            print(f"Warning: Could not save intermediate CSV: {e}")
-            # Continue pipeline despite CSV save error
+        os.makedirs(RESULTS_DIR, exist_ok=True)
 
-        # Tagging - only step that continues on failure
-        print("Tagging articles...")
-        try:
-            document_keywords = article_tagger(cleaned_df)
-            try:
-                dump_json(document_keywords, 'results/document_keywords.json')
-            except Exception as json_e:
-                print(f"Warning: Could not save tagging results: {json_e}")
-        except Exception as e:
-            print(f"Error during article tagging: {e}")
-            print("Continuing with next steps...")
-
-        # Summarizing - raises exception if fails
-        print("Summarizing articles...")
-        summarized_df = summarize_article(cleaned_df)
-        
-        # Save intermediate summarized results
-        try:
-            summarized_df.to_csv("results/summarized_articles.csv", index=False)
-        except Exception as e:
-            print(f"Warning: Could not save summarized CSV: {e}")
-            # Continue pipeline despite CSV save error
-
-        # Clustering - raises exception if fails
-        print("Clustering articles...")
-        article_to_theme = cluster_articles(summarized_df)
-        
-        # Save final results
-        try:
-            dump_json(article_to_theme, 'results/article_to_theme.json')
-            create_document_to_theme_count_mapping_json(summarized_df, 'results/article_to_theme.json')
-            print("Pipeline completed successfully!")
-        except Exception as e:
-            print(f"Error saving final results: {e}")
-            raise Exception("Failed to save clustering results")
+        pipeline = build_pipeline(link, RESULTS_DIR, batch_size=batch_size, model_name=model_name, discovery=discovery,
+                                  chunk_size=chunk_size, hierarchical=hierarchical, pregroup=pregroup,
+                                  profiler=profiler, compression=compression)
+        to_run = pipeline.plan(only, force)
+
+        # Load environment variables only if an LLM stage will actually run
+        if any(name in LLM_STAGES for name in to_run):
+            from utils import load_env_variables
+            load_env_variables(validate=validate)
+
+        pipeline.run(only, force)
+        print("Pipeline completed successfully!")
+        return True
 
     except Exception as e:
         print(f"Critical error in main pipeline: {e}")
         print("Pipeline terminated due to an error.")
+        return False
+
+    finally:
+        if profiler is not None:
+            profiler.report()
+
+
+def build_parser():
+    """
+    Build the command-line parser with one subcommand per pipeline stage.
+
+    Returns:
+        ArgumentParser: Configured parser
+    """
+    parser = argparse.ArgumentParser(
+        description="Scrape, summarize and cluster AARP health articles into themes."
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--no-validate",
+        dest="validate",
+        action="store_false",
+        help="Only check that API keys are present instead of making live test calls",
+    )
+    rate_options = argparse.ArgumentParser(add_help=False)
+    rate_options.add_argument("--tag-rpm", type=int, help="Requests per minute budget for the tagging model")
+    rate_options.add_argument("--tag-concurrency", type=int, help="Concurrent requests to the tagging model")
+    rate_options.add_argument("--summarize-rpm", type=int, help="Requests per minute budget for the summarization model")
+    rate_options.add_argument("--summarize-concurrency", type=int, help="Concurrent requests to the summarization model")
+
+    cluster_options = argparse.ArgumentParser(add_help=False)
+    cluster_options.add_argument("--batch-size", type=int, help="Articles per clustering prompt (default: 5, or 20 in batch mode)")
+    cluster_options.add_argument("--model-name", default="gpt-4", help="OpenAI model used for clustering")
+    cluster_options.add_argument(
+        "--hierarchical", action="store_true",
+        help="Group articles into coarse domains first, then cluster themes within each domain in parallel",
+    )
+    cluster_options.add_argument(
+        "--pregroup", action="store_true",
+        help="Group articles by keyword overlap first and only send one article per group to the LLM",
+    )
+
+    summary_options = argparse.ArgumentParser(add_help=False)
+    summary_options.add_argument(
+        "--compress", type=float, metavar="RATIO",
+        help="Summarize an extractive pre-summary keeping this share of each article (e.g. 0.3) "
+             "instead of the full text",
+    )
+
+    scrape_options = argparse.ArgumentParser(add_help=False)
+    scrape_options.add_argument(
+        "--discovery", choices=("sitemap", "adaptive", "crawl"), default="sitemap",
+        help="Find articles from sitemaps/RSS feeds (default, crawler as fallback), by a budgeted "
+             "priority crawl that looks for new articles first, or by full recursive crawling",
+    )
+    scrape_options.add_argument("--crawl-pages", type=int, default=None,
+                                help="Adaptive discovery: maximum pages downloaded per run (default: 500)")
+    scrape_options.add_argument("--crawl-seconds", type=float, default=None,
+                                help="Adaptive discovery: maximum crawl time in seconds (default: 600)")
+    scrape_options.add_argument("--crawl-min-score", type=float, default=None,
+                                help="Adaptive discovery: stop when no page left scores above this (default: 0.1)")
+    scrape_options.add_argument("--no-http-cache", dest="http_cache", action="store_false",
+                                help="Download every page instead of using the on-disk HTTP cache")
+    scrape_options.add_argument("--http-cache-dir", default=None, help="HTTP cache directory (default: results/http_cache)")
+    scrape_options.add_argument("--http-cache-mb", type=int, default=None, help="Maximum HTTP cache size in MB (default: 512)")
+
+    chunk_options = argparse.ArgumentParser(add_help=False)
+    chunk_options.add_argument(
+        "--chunk-size", type=int, default=None,
+        help="Bounded-memory mode: process articles from disk in windows of this many rows",
+    )
+
+    profile_options = argparse.ArgumentParser(add_help=False)
+    profile_options.add_argument(
+        "--profile", action="store_true",
+        help="Profile each stage (cProfile + wall/CPU timers) into results/profiles/<timestamp>/",
+    )
+    profile_options.add_argument(
+        "--profile-sample-ms", type=float, default=None,
+        help="With --profile, also sample all threads' stacks every N ms into collapsed-stack files",
+    )
+    profile_options.add_argument("--profile-top", type=int, default=20, help="Hotspots printed after a profiled run")
+
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser(
+        "run", parents=[common, scrape_options, rate_options, cluster_options, summary_options, chunk_options,
+                        profile_options],
+        help="Run the full pipeline, skipping up-to-date stages (default)",
+    )
+    run_parser.add_argument("link", nargs="?", default=DEFAULT_LINK, help="Base URL to scrape")
+    run_parser.add_argument(
+        "--only", nargs="+", choices=STAGES, metavar="STAGE",
+        help="Only consider these stages (their inputs must already exist)",
+    )
+    run_parser.add_argument(
+        "--force", nargs="+", default=[], choices=STAGES + ("all",), metavar="STAGE",
+        help="Re-run these stages even if their artifacts are up to date ('all' for every stage)",
+    )
+
+    scrape_parser = subparsers.add_parser("scrape", parents=[scrape_options, profile_options],
+                                          help="Only scrape articles")
+    scrape_parser.add_argument("link", nargs="?", default=DEFAULT_LINK, help="Base URL to scrape")
+
+    subparsers.add_parser("clean", parents=[chunk_options, profile_options], help="Clean results/health_articles.csv")
+    subparsers.add_parser("tag", parents=[common, rate_options, chunk_options, profile_options],
+                          help="Tag results/cleaned_articles.csv")
+    subparsers.add_parser("summarize", parents=[common, rate_options, summary_options, chunk_options, profile_options],
+                          help="Summarize results/cleaned_articles.csv")
+    subparsers.add_parser("cluster", parents=[common, cluster_options, chunk_options, profile_options],
+                          help="Cluster results/summarized_articles.csv")
+    aggregate_options = argparse.ArgumentParser(add_help=False)
+    aggregate_options.add_argument("--hierarchical", action="store_true",
+                                   help="Also rebuild results/cluster_hierarchy.json")
+    subparsers.add_parser("aggregate", parents=[chunk_options, aggregate_options, profile_options],
+                          help="Rebuild results/cluster_results.json from existing outputs")
+    subparsers.add_parser("index", parents=[profile_options],
+                          help="Build the keyword/theme search index from existing outputs")
+    subparsers.add_parser("history", parents=[profile_options],
+                          help="Append results/cluster_results.json to the theme history")
+
+    batch_parser = subparsers.add_parser(
+        "batch", parents=[cluster_options],
+        help="Run summarize/tag/theme prompts through a provider batch API",
+    )
+    batch_parser.add_argument("action", choices=("submit", "status", "collect"))
+    batch_parser.add_argument("--kind", required=True, choices=("summarize", "tag", "themes"))
+    batch_parser.add_argument("--backend", choices=("openai", "groq", "local"),
+                              help="Batch backend (default: groq for summarize/tag, openai for themes)")
+    batch_parser.add_argument("--wait", action="store_true", help="With collect: poll until the job completes")
+    batch_parser.add_argument("--poll-interval", type=float, default=60, help="Seconds between status checks")
+
+    shard_parser = subparsers.add_parser(
+        "shard", parents=[common, scrape_options, rate_options, cluster_options, summary_options, chunk_options,
+                          profile_options],
+        help="Sharded backfill: plan shards, run workers over a shared directory, merge and cluster once",
+    )
+    shard_parser.add_argument("action", choices=("plan", "work", "status", "coordinate", "local"),
+                              help="local = plan, run --workers worker processes here, then coordinate")
+    shard_parser.add_argument("link", nargs="?", default=DEFAULT_LINK, help="Base URL to scrape (plan/local)")
+    shard_parser.add_argument("--shared-dir", required=True, help="Directory shared by the planner, workers and coordinator")
+    shard_parser.add_argument("--shards", type=int, default=8, help="Number of shards (plan/local)")
+    shard_parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                              help="Worker processes started by local")
+    shard_parser.add_argument("--worker-id", help="Name recorded in shard claims (default: host-pid)")
+    shard_parser.add_argument("--max-shards", type=int, help="Stop a worker after this many shards")
+    shard_parser.add_argument("--wait", action="store_true", help="coordinate: wait for unfinished shards")
+    shard_parser.add_argument("--poll-interval", type=float, default=30, help="Seconds between shard status checks")
+
+    bench_parser = subparsers.add_parser(
+        "bench-memory", help="Compare peak RSS of the in-memory and chunked modes on a synthetic archive",
+    )
+    bench_parser.add_argument("--articles", type=int, default=20000, help="Number of synthetic articles")
+    bench_parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per chunk in chunked mode")
+
+    bench_cluster_parser = subparsers.add_parser(
+        "bench-cluster", parents=[common],
+        help="Score clustering modes and batch sizes against a reference labeling",
+    )
+    bench_cluster_parser.add_argument("--modes", nargs="+", default=["flat"],
+                                      choices=("flat", "hierarchical", "pregroup", "hierarchical+pregroup"))
+    bench_cluster_parser.add_argument("--batch-sizes", nargs="+", type=int, default=[5], help="Articles per prompt")
+    bench_cluster_parser.add_argument("--repeats", type=int, default=2, help="Runs per configuration (for stability)")
+    bench_cluster_parser.add_argument("--sample", type=int, help="Only cluster this many reference articles")
+    bench_cluster_parser.add_argument("--seed", type=int, default=0, help="Seed for --sample")
+    bench_cluster_parser.add_argument("--model-name", default="gpt-4", help="OpenAI model used for clustering")
+    bench_cluster_parser.add_argument(
+        "--reference", default=None,
+        help="Reference theme mapping (default: results/benchmarks/reference_themes.json)",
+    )
+    bench_cluster_parser.add_argument("--score", nargs="+", metavar="FILE",
+                                      help="Only score existing theme mappings; no LLM calls")
+
+    bench_summary_parser = subparsers.add_parser(
+        "bench-summary", help="Measure extractive compression against the existing summaries",
+    )
+    bench_summary_parser.add_argument("--ratios", nargs="+", type=float, default=[0.2, 0.3, 0.5],
+                                      help="Compression ratios to compare")
+    bench_summary_parser.add_argument("--sample", type=int, help="Only use this many articles")
+    bench_summary_parser.add_argument("--seed", type=int, default=0, help="Seed for --sample")
+    bench_summary_parser.add_argument("--llm", action="store_true",
+                                      help="Also re-summarize with the LLM and score against the existing summaries")
+    bench_summary_parser.add_argument("--no-validate", dest="validate", action="store_false",
+                                      help="With --llm: only check that API keys are present")
+
+    search_parser = subparsers.add_parser(
+        "search", help="Query results/search_index.sqlite (built by the index stage)",
+    )
+    search_parser.add_argument("query", nargs="?", help="Find articles about this topic")
+    search_parser.add_argument("--keyword", help="Instead, list the themes co-occurring with this keyword")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results")
+
+    trends_parser = subparsers.add_parser(
+        "trends", help="Compare theme volumes across runs recorded in results/history",
+    )
+    trends_parser.add_argument("action", choices=("runs", "diff", "series"))
+    trends_parser.add_argument("themes", nargs="*", help="series: theme ids or name fragments")
+    trends_parser.add_argument("--from", dest="old", default="-2",
+                               help="diff: earlier run (id, id prefix such as a date, or position; default -2)")
+    trends_parser.add_argument("--to", dest="new", default="-1", help="diff: later run (default: the latest)")
+    trends_parser.add_argument("--min-change", type=int, default=1,
+                               help="diff: smallest count change reported as growing/shrinking")
+    trends_parser.add_argument("--by", choices=("run", "day", "month"), default="run",
+                               help="series: one point per run, or the mean per day/month")
+    return parser
+
+
+def normalize_argv(argv):
+    """
+    Keep the historical `python main.py [URL]` invocation working by treating
+    a call without a subcommand as `run`.
+
+    Args:
+        argv (list): Command-line arguments without the program name
+
+    Returns:
+        list: Arguments with an explicit subcommand
+    """
+    if any(arg in COMMANDS for arg in argv) or any(arg in ("-h", "--help") for arg in argv):
+        return list(argv)
+    return ["run"] + list(argv)
+
+
+def batch_command(args, results_dir=RESULTS_DIR):
+    """
+    Submit, check or collect an offline batch job and ingest its results into
+    the same artifacts the interactive stages write.
+
+    Args:
+        args (Namespace): Parsed `batch` command-line arguments
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        bool: True on success
+    """
+    import batch_mode
+    from utils import dump_json
+
+    batch_dir = results_path("batch", results_dir)
+    batch_size = args.batch_size or 20
+    source = "summarized_articles.csv" if args.kind == "themes" else "cleaned_articles.csv"
+    try:
+        if args.action == "submit":
+            df = read_csv(results_path(source, results_dir))
+            options = {}
+            if args.kind == "themes":
+                themes_path = results_path("article_to_theme.json", results_dir)
+                existing = []
+                if os.path.exists(themes_path):
+                    with open(themes_path, "r") as f:
+                        existing = list(json.load(f))
+                options = {"batch_size": batch_size, "existing_themes": existing, "model_name": args.model_name}
+            batch_mode.submit_batch(args.kind, df, args.backend, batch_dir, **options)
+            return True
+
+        if args.action == "status":
+            jobs = batch_mode.load_jobs(batch_dir)
+            if args.kind not in jobs:
+                raise Exception(f"No {args.kind} batch has been submitted")
+            job = jobs[args.kind]
+            status = batch_mode.get_batch_backend(job["backend"], batch_dir).status(job["job_id"])
+            print(f"{args.kind} batch {job['job_id']} ({job['backend']}): {status}")
+            return True
+
+        timeout = None if args.wait else 0
+        results, final = batch_mode.collect_batch(args.kind, batch_dir, args.poll_interval, timeout)
+        if not final:
+            return True
+        df = read_csv(results_path(source, results_dir))
+
+        # Record ingested artifacts in the pipeline state so `run` reuses them.
+        # Themes are recorded under the batch size `run` uses (its default
+        # unless --batch-size was given), not the larger prompt size of the
+        # batch job, so the cluster stage's fingerprint matches the next run
+        pipeline = build_pipeline(results_dir=results_dir, batch_size=args.batch_size or 5, model_name=args.model_name)
+        if args.kind == "summarize":
+            summarized_df = batch_mode.ingest_summaries(df, results)
+            summarized_df.to_csv(results_path("summarized_articles.csv", results_dir), index=False)
+            pipeline.record("summarize")
+        elif args.kind == "tag":
+            dump_json(batch_mode.ingest_keywords(df, results), results_path("document_keywords.json", results_dir))
+            pipeline.record("tag")
+        else:
+            dump_json(batch_mode.ingest_themes(results), results_path("article_to_theme.json", results_dir))
+            pipeline.record("cluster")
+            aggregate_stage(df, results_dir)
+            pipeline.record("aggregate")
+        print(f"Ingested {args.kind} batch results")
+        return True
+
+    except Exception as e:
+        print(f"Error in batch {args.action}: {e}")
+        return False
+
+
+def bench_cluster_command(args, results_dir=RESULTS_DIR):
+    """
+    Run the clustering benchmark, or score existing theme mappings.
+
+    Args:
+        args (Namespace): Parsed `bench-cluster` command-line arguments
+        results_dir (str): Directory holding the pipeline outputs
+
+    Returns:
+        bool: True on success
+    """
+    import cluster_benchmark
+
+    reference = args.reference or cluster_benchmark.DEFAULT_REFERENCE
+    try:
+        if args.score:
+            cluster_benchmark.score_files(args.score, reference)
+            return True
+
+        from utils import load_env_variables
+        load_env_variables(validate=args.validate)
+        cluster_benchmark.run_benchmark(
+            results_path("summarized_articles.csv", results_dir),
+            reference_json=reference,
+            keywords_json=results_path("document_keywords.json", results_dir),
+            modes=args.modes, batch_sizes=args.batch_sizes, repeats=args.repeats,
+            sample=args.sample, model_name=args.model_name, seed=args.seed,
+        )
+        return True
+
+    except Exception as e:
+        print(f"Error in clustering benchmark: {e}")
+        return False
+
+
+def shard_worker(args, shared_dir):
+    """
+    Claim shards one after another and run scrape → clean → tag → summarize
+    on each, until no shard is left.
+
+    Args:
+        args (Namespace): Parsed `shard` command-line arguments
+        shared_dir (str): Shared coordination directory
+
+    Returns:
+        bool: True if every claimed shard finished
+    """
+    import sharding
+
+    worker_id = args.worker_id or sharding.default_worker_id()
+    failed = set()
+    finished = 0
+    env_loaded = False
+    # Every shard runs the same stages, so each gets its own profile directory,
+    # kept in the shared shard directory next to the shard's other artifacts
+    profile_name = time.strftime("%Y%m%d-%H%M%S") + f"-{worker_id}"
+    while args.max_shards is None or finished + len(failed) < args.max_shards:
+        shard = sharding.claim_shard(shared_dir, worker_id, skip=failed)
+        if shard is None:
+            break
+        directory = sharding.shard_dir(shared_dir, shard)
+        with open(os.path.join(directory, "links.txt"), "r") as f:
+            if not any(line.strip() for line in f):
+                print(f"Shard {shard} has no articles")
+                sharding.mark_done(shared_dir, shard, {"worker": worker_id, "articles": 0})
+                continue
+        print(f"Worker {worker_id} processing shard {shard}")
+        profiler = make_profiler(args, os.path.join(directory, "profiles", profile_name))
+        try:
+            pipeline = build_pipeline(
+                results_dir=directory, chunk_size=args.chunk_size, profiler=profiler, compression=args.compress,
+                links_file=os.path.join(directory, "links.txt"),
+            )
+            to_run = pipeline.plan(SHARD_STAGES)
+            if not env_loaded and any(name in LLM_STAGES for name in to_run):
+                from utils import load_env_variables
+                load_env_variables(validate=args.validate)
+                env_loaded = True
+            # Keep the claim fresh for as long as the shard's stages run
+            with sharding.ClaimHeartbeat(shared_dir, shard):
+                status = pipeline.run(("scrape",))
+                articles = sharding.count_articles(directory)
+                if articles:
+                    status.update({name: result for name, result in pipeline.run(SHARD_STAGES).items() if name != "scrape"})
+            if not articles:
+                # Nothing downloaded: cleaning would fail on every worker in turn
+                print(f"Shard {shard} has no articles")
+            sharding.mark_done(shared_dir, shard, {"worker": worker_id, "articles": articles, "stages": status})
+            finished += 1
+        except Exception as e:
+            print(f"Error in shard {shard}: {e}")
+            sharding.record_failure(shared_dir, shard, e)
+            failed.add(shard)
+        if profiler is not None:
+            profiler.report()
+    print(f"Worker {worker_id} finished {finished} shard(s), {len(failed)} failed")
+    return not failed
+
+
+def shard_command(args):
+    """
+    Plan, work on, inspect or merge a sharded backfill.
+
+    Args:
+        args (Namespace): Parsed `shard` command-line arguments
+
+    Returns:
+        bool: True on success
+    """
+    import sharding
+
+    shared_dir = args.shared_dir
+    try:
+        if args.action == "plan":
+            os.makedirs(shared_dir, exist_ok=True)
+            sharding.plan_shards(args.link, shared_dir, args.shards, args.discovery)
+            return True
+
+        if args.action == "work":
+            return shard_worker(args, shared_dir)
+
+        if args.action == "status":
+            status = sharding.shard_status(shared_dir)
+            print(f"done: {len(status['done'])}, failed: {len(status['failed'])}, "
+                  f"claimed: {len(status['claimed'])}, pending: {len(status['pending'])}")
+            return True
+
+        if args.action == "local":
+            import subprocess
+
+            if not os.path.exists(os.path.join(shared_dir, sharding.PLAN_FILE)):
+                os.makedirs(shared_dir, exist_ok=True)
+                sharding.plan_shards(args.link, shared_dir, args.shards, args.discovery)
+            from ratelimit import DEFAULT_LIMITS, FALLBACK_LIMIT
+            from llm_router import SUMMARY_MODEL, TAG_MODEL
+
+            def worker_rpm(rpm, model):
+                # The workers share one API key, so each gets its share of the
+                # given or default requests-per-minute budget
+                rpm = rpm or DEFAULT_LIMITS.get(model, FALLBACK_LIMIT)["requests_per_minute"]
+                return max(1, rpm // args.workers)
+
+            worker_argv = [sys.executable, os.path.abspath(__file__), "shard", "work", "--shared-dir", shared_dir]
+            for flag, value in (("--chunk-size", args.chunk_size), ("--compress", args.compress),
+                                ("--tag-rpm", worker_rpm(args.tag_rpm, TAG_MODEL)),
+                                ("--tag-concurrency", args.tag_concurrency),
+                                ("--summarize-rpm", worker_rpm(args.summarize_rpm, SUMMARY_MODEL)),
+                                ("--summarize-concurrency", args.summarize_concurrency)):
+                if value:
+                    worker_argv += [flag, str(value)]
+            if not args.validate:
+                worker_argv.append("--no-validate")
+            workers = [subprocess.Popen(worker_argv) for _ in range(args.workers)]
+            failed_workers = sum(1 for worker in workers if worker.wait() != 0)
+            if failed_workers:
+                print(f"Warning: {failed_workers} worker(s) exited with errors")
+
+        # coordinate (also the last step of local): merge shards, cluster once
+        plan = sharding.load_plan(shared_dir)
+        sharding.wait_for_shards(shared_dir, args.poll_interval, timeout=None if args.wait else 0)
+        sharding.merge_shards(shared_dir, RESULTS_DIR)
+
+        # The merged artifacts count as the output of the per-article stages,
+        # so the run below only clusters, aggregates and indexes
+        batch_size = args.batch_size or 5
+        pipeline = build_pipeline(plan["link"], RESULTS_DIR, batch_size=batch_size, model_name=args.model_name,
+                                  discovery=plan["discovery"], hierarchical=args.hierarchical,
+                                  pregroup=args.pregroup, compression=args.compress)
+        for name in SHARD_STAGES:
+            pipeline.record(name)
+        return main(
+            plan["link"], validate=args.validate, batch_size=batch_size, model_name=args.model_name,
+            discovery=plan["discovery"], chunk_size=args.chunk_size, hierarchical=args.hierarchical,
+            pregroup=args.pregroup, profiler=make_profiler(args), compression=args.compress,
+        )
+
+    except Exception as e:
+        print(f"Error in shard {args.action}: {e}")
+        return False
+
+
+def trends_command(args):
+    """
+    List recorded runs, diff two of them, or print theme series.
+
+    Args:
+        args (Namespace): Parsed `trends` command-line arguments
+
+    Returns:
+        bool: True on success
+    """
+    import trends
+
+    history_dir = results_path("history")
+    try:
+        index = trends.load_index(history_dir)
+        if not index:
+            raise Exception(f"No runs recorded in {history_dir}. Run the pipeline or `python main.py history` first.")
+        registry = trends.load_registry(history_dir)
+
+        if args.action == "runs":
+            for entry in index:
+                print(f"{entry['run']}  {len(entry['counts']):>4} themes  {sum(entry['counts'].values()):>6} articles")
+        elif args.action == "diff":
+            old, new = trends.resolve_run(index, args.old), trends.resolve_run(index, args.new)
+            trends.print_diff(trends.diff_runs(old, new, args.min_change), registry, old, new)
+        else:
+            theme_ids = [theme_id for query in args.themes for theme_id in trends.find_themes(registry, query)]
+            if not theme_ids:
+                raise Exception("No matching themes; give theme ids or name fragments")
+            theme_ids = list(dict.fromkeys(theme_ids))
+            period = None if args.by == "run" else args.by
+            trends.print_series(trends.theme_series(index, theme_ids, period), theme_ids, registry)
+        return True
+
+    except Exception as e:
+        print(f"Error in trends: {e}")
+        return False
+
+
+def bench_summary_command(args):
+    """
+    Compare extractive compression ratios on results/summarized_articles.csv.
+
+    Args:
+        args (Namespace): Parsed `bench-summary` command-line arguments
+
+    Returns:
+        bool: True on success
+    """
+    try:
+        from extractive import evaluate_compression
+
+        if args.llm:
+            from utils import load_env_variables
+            load_env_variables(validate=args.validate)
+        evaluate_compression(results_path("summarized_articles.csv"), args.ratios, args.sample, args.seed, args.llm)
+        return True
+
+    except Exception as e:
+        print(f"Error in bench-summary: {e}")
+        return False
+
+
+def configure_http_cache(args):
+    """
+    Apply HTTP cache settings given on the command line.
+
+    Args:
+        args (Namespace): Parsed command-line arguments
+    """
+    if getattr(args, "http_cache", True) and not getattr(args, "http_cache_dir", None) \
+            and not getattr(args, "http_cache_mb", None):
+        return
+
+    from http_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, configure_cache
+
+    configure_cache(
+        enabled=args.http_cache,
+        directory=args.http_cache_dir or DEFAULT_CACHE_DIR,
+        max_bytes=args.http_cache_mb * 1024 * 1024 if args.http_cache_mb else DEFAULT_MAX_BYTES,
+    )
+
+
+def configure_crawl_budget(args):
+    """
+    Apply adaptive crawl budgets given on the command line.
+
+    Args:
+        args (Namespace): Parsed command-line arguments
+    """
+    budgets = [getattr(args, name, None) for name in ("crawl_pages", "crawl_seconds", "crawl_min_score")]
+    if all(value is None for value in budgets):
+        return
+
+    from crawl_scheduler import configure_budget
+
+    configure_budget(*budgets)
+
+
+def configure_rate_limits(args):
+    """
+    Apply per-model request budgets given on the command line.
+
+    Args:
+        args (Namespace): Parsed command-line arguments
+    """
+    if not any(getattr(args, name, None) for name in
+               ("tag_rpm", "tag_concurrency", "summarize_rpm", "summarize_concurrency")):
+        return
+
+    from ratelimit import configure_limit
+    from llm_router import SUMMARY_MODEL, TAG_MODEL
+
+    configure_limit(TAG_MODEL, args.tag_rpm, args.tag_concurrency)
+    configure_limit(SUMMARY_MODEL, args.summarize_rpm, args.summarize_concurrency)
+
+
+def make_profiler(args, output_dir=None):
+    """
+    Create the stage profiler requested on the command line.
+
+    Args:
+        args (Namespace): Parsed command-line arguments
+        output_dir (str): Directory for the profiles; defaults to a new timestamped one
+
+    Returns:
+        StageProfiler: Profiler, or None without --profile
+    """
+    if not getattr(args, "profile", False):
+        return None
+
+    from profiling import StageProfiler
+
+    sample_interval = args.profile_sample_ms / 1000 if args.profile_sample_ms else None
+    return StageProfiler(output_dir=output_dir, sample_interval=sample_interval, top=args.profile_top)
+
+
+def cli(argv=None):
+    """
+    Command-line entry point.
+
+    Stage subcommands always re-run their stage and record it in the pipeline
+    state, so a following `run` can reuse the result.
+
+    Args:
+        argv (list): Command-line arguments; defaults to sys.argv[1:]
+    """
+    args = build_parser().parse_args(normalize_argv(sys.argv[1:] if argv is None else argv))
+    configure_rate_limits(args)
+    configure_http_cache(args)
+    configure_crawl_budget(args)
+
+    if args.command == "run":
+        ok = main(
+            args.link, validate=args.validate, only=args.only, force=args.force,
+            batch_size=args.batch_size or 5, model_name=args.model_name, discovery=args.discovery,
+            chunk_size=args.chunk_size, hierarchical=args.hierarchical, pregroup=args.pregroup,
+            profiler=make_profiler(args), compression=args.compress,
+        )
+    elif args.command == "batch":
+        ok = batch_command(args)
+    elif args.command == "search":
+        from search_index import search
+
+        if not args.query and not args.keyword:
+            print("Error: give a query or --keyword")
+            sys.exit(2)
+        try:
+            search(args.query, args.keyword, results_path("search_index.sqlite"), args.limit)
+            ok = True
+        except Exception as e:
+            print(f"Error in search: {e}")
+            ok = False
+    elif args.command == "trends":
+        ok = trends_command(args)
+    elif args.command == "shard":
+        ok = shard_command(args)
+    elif args.command == "bench-cluster":
+        ok = bench_cluster_command(args)
+    elif args.command == "bench-summary":
+        ok = bench_summary_command(args)
+    elif args.command == "bench-memory":
+        from streaming import benchmark_peak_rss
+        ok = benchmark_peak_rss(args.articles, args.chunk_size)[-1]["ok"]
+    else:
+        ok = main(
+            getattr(args, "link", DEFAULT_LINK),
+            validate=getattr(args, "validate", True),
+            only=[args.command],
+            force=[args.command],
+            batch_size=getattr(args, "batch_size", None) or 5,
+            model_name=getattr(args, "model_name", "gpt-4"),
+            discovery=getattr(args, "discovery", "sitemap"),
+            chunk_size=getattr(args, "chunk_size", None),
+            hierarchical=getattr(args, "hierarchical", False),
+            pregroup=getattr(args, "pregroup", False),
+            profiler=make_profiler(args),
+            compression=getattr(args, "compress", None),
+        )
+    if not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    # Allow command-line argument for URL or use default
-    link = sys.argv[1] if len(sys.argv) > 1 else "https://www.aarp.org/health"
-    main(link)
+    cli()
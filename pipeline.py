@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Stage:
+    """
+    A single pipeline step with the artifacts it reads and writes.
+
+    Args:
+        name (str): Unique stage name
+        func (callable): Zero-argument function that runs the stage
+        inputs (list): Files the stage reads
+        outputs (list): Files the stage writes
+        deps (list): Names of stages that must finish first
+        config (dict): JSON-serializable settings that affect the outputs
+        optional (bool): A failure is reported but does not stop the run
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), deps=(), config=None, optional=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.config = config or {}
+        self.optional = optional
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        path (str): File to hash
+        chunk_size (int): Bytes read per iteration
+
+    Returns:
+        str: Hex digest, or None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """
+    Run a DAG of stages, skipping stages whose artifacts are up to date and
+    running stages without a dependency between them concurrently.
+
+    A stage is up to date when its outputs exist, are unchanged since it last
+    ran, and the fingerprint of its config and input file contents matches the
+    one recorded in the state file.
+
+    Args:
+        stages (list): Stage objects in any order
+        state_file (str): JSON file recording fingerprints between runs
+        max_workers (int): Maximum number of stages running at once
+    """
+
+    def __init__(self, stages, state_file="results/pipeline_state.json", max_workers=2):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise Exception(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        """
+        Order stages so every stage comes after its dependencies.
+
+        Returns:
+            list: Stage names in dependency order
+        """
+        order = []
+        state = {}
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise Exception(f"Dependency cycle detected at stage '{name}'")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def load_state(self):
+        """
+        Load recorded stage fingerprints.
+
+        Returns:
+            dict: Stage name → recorded fingerprint and output digests
+        """
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not read pipeline state {self.state_file}: {e}")
+            return {}
+
+    def save_state(self, state):
+        """
+        Persist stage fingerprints.
+
+        Args:
+            state (dict): Stage name → recorded fingerprint and output digests
+        """
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_file)
+
+    def fingerprint(self, stage):
+        """
+        Fingerprint a stage from its name, config and input file contents.
+
+        Args:
+            stage (Stage): Stage to fingerprint
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(stage.name.encode())
+        digest.update(json.dumps(stage.config, sort_keys=True, default=str).encode())
+        for path in stage.inputs:
+            digest.update(path.encode())
+            digest.update((file_digest(path) or "missing").encode())
+        return digest.hexdigest()
+
+    def is_up_to_date(self, stage, state):
+        """
+        Check whether a stage's recorded run still matches its inputs and outputs.
+
+        Args:
+            stage (Stage): Stage to check
+            state (dict): Recorded pipeline state
+
+        Returns:
+            bool: True if the stage can be skipped
+        """
+        record = state.get(stage.name)
+        if not record or record.get("fingerprint") != self.fingerprint(stage):
+            return False
+        recorded_outputs = record.get("outputs", {})
+        for path in stage.outputs:
+            if not os.path.exists(path) or recorded_outputs.get(path) != file_digest(path):
+                return False
+        return True
+
+    def select(self, only=None):
+        """
+        Expand a stage selection to the stages that must be considered.
+
+        Args:
+            only (list): Stage names to run; None selects every stage
+
+        Returns:
+            list: Selected stage names in dependency order
+        """
+        if not only:
+            return list(self.order)
+        unknown = [name for name in only if name not in self.stages]
+        if unknown:
+            raise Exception(f"Unknown stage(s): {', '.join(unknown)}")
+        return [name for name in self.order if name in only]
+
+    def plan(self, only=None, force=()):
+        """
+        Decide which of the selected stages need to run.
+
+        A stage runs when it is forced, out of date, or downstream of a stage
+        that runs.
+
+        Args:
+            only (list): Stage names to consider; None considers every stage
+            force (iterable): Stage names to run even if up to date ("all" forces every stage)
+
+        Returns:
+            list: Stage names to run, in dependency order
+        """
+        state = self.load_state()
+        selected = self.select(only)
+        force = set(force)
+        to_run = []
+        for name in selected:
+            stage = self.stages[name]
+            upstream_runs = any(dep in to_run for dep in stage.deps)
+            if "all" in force or name in force or upstream_runs or not self.is_up_to_date(stage, state):
+                to_run.append(name)
+        return to_run
+
+    def record(self, name):
+        """
+        Record a stage as up to date with its current inputs and outputs, e.g.
+        after its artifacts were produced outside the runner.
+
+        Args:
+            name (str): Stage name
+        """
+        self._record(self.stages[name])
+
+    def _record(self, stage):
+        """
+        Record a successful stage run in the state file.
+
+        Args:
+            stage (Stage): Stage that finished
+        """
+        with self._lock:
+            state = self.load_state()
+            state[stage.name] = {
+                "fingerprint": self.fingerprint(stage),
+                "outputs": {path: file_digest(path) for path in stage.outputs},
+            }
+            self.save_state(state)
+
+    def run(self, only=None, force=()):
+        """
+        Run every stage that is out of date, in parallel where the DAG allows.
+
+        Args:
+            only (list): Stage names to consider; None considers every stage
+            force (iterable): Stage names to run even if up to date ("all" forces every stage)
+
+        Returns:
+            dict: Stage name → "ran", "skipped", "failed" or "blocked"
+        """
+        to_run = self.plan(only, force)
+        status = {name: "skipped" for name in self.select(only) if name not in to_run}
+        for name in status:
+            print(f"Skipping stage '{name}': artifacts are up to date")
+
+        pending = list(to_run)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = [dep for dep in self.stages[name].deps if dep in to_run]
+                    if any(status.get(dep) in ("failed", "blocked") and not self.stages[dep].optional for dep in deps):
+                        status[name] = "blocked"
+                        pending.remove(name)
+                        print(f"Stage '{name}' not run because a dependency failed")
+                    elif all(status.get(dep) in ("ran", "failed", "blocked") for dep in deps):
+                        # Only optional deps can still be failed or blocked here
+                        pending.remove(name)
+                        print(f"Running stage '{name}'...")
+                        running[executor.submit(self.stages[name].func)] = name
+
+                if not running:
+                    if pending:
+                        raise Exception(f"Pipeline made no progress; stuck stage(s): {', '.join(pending)}")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        future.result()
+                        self._record(stage)
+                        status[name] = "ran"
+                    except Exception as e:
+                        status[name] = "failed"
+                        print(f"Error in stage '{name}': {e}")
+                        if stage.optional:
+                            print("Continuing with next steps...")
+
+        failed = [name for name in to_run if status.get(name) in ("failed", "blocked") and not self.stages[name].optional]
+        if failed:
+            raise Exception(f"Pipeline stopped; failed stage(s): {', '.join(failed)}")
+        return status
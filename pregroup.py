@@ -0,0 +1,273 @@
+import json
+import math
+import os
+from typing import Dict, List, Set, Tuple
+
+from textutils import normalize_terms
+
+# Keyword-driven pre-grouping for the clustering stage. Articles whose tagger
+# keywords overlap strongly are grouped before any LLM call; only one
+# representative per group, plus articles that do not fit a group cleanly,
+# are sent to the theme mapper, and each representative's theme is then
+# propagated to the rest of its group.
+
+# Terms shared by more articles than this are too common to find pairs on
+# their own, and would make the candidate pairs grow quadratically
+MAX_POSTING = 500
+
+
+class UnionFind:
+    """
+    Disjoint-set forest with path compression and union by size.
+
+    Args:
+        items (iterable): Initial singleton elements
+    """
+
+    def __init__(self, items):
+        self.parent = {item: item for item in items}
+        self.size = {item: 1 for item in self.parent}
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+    def groups(self):
+        """
+        Returns:
+            list: Lists of elements sharing a root, in insertion order
+        """
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """
+    Jaccard similarity of two sets (0.0 when both are empty).
+    """
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def load_keywords(keywords_json: str) -> Dict[str, List[str]]:
+    """
+    Load document_keywords.json, or an empty mapping if tagging has not run.
+
+    Args:
+        keywords_json (str): Path to document_keywords.json
+
+    Returns:
+        dict: Link → keywords
+    """
+    if not os.path.exists(keywords_json):
+        print(f"Warning: {keywords_json} not found; every article will go to the LLM")
+        return {}
+    with open(keywords_json, "r") as f:
+        return json.load(f)
+
+
+def keyword_sets(articles: List, document_keywords: Dict[str, List[str]]) -> Dict[str, Set[str]]:
+    """
+    Build the normalized, stemmed keyword term set of each article.
+
+    Args:
+        articles (List): Article objects or records with article_id and url
+        document_keywords (dict): Link → keywords, as written by the tagger
+
+    Returns:
+        dict: Article ID → set of terms (empty when the article has no usable keywords)
+    """
+    sets = {}
+    for article in articles:
+        keywords = document_keywords.get(article.url) or []
+        if keywords == ["Error extracting keywords"]:
+            keywords = []
+        sets[article.article_id] = {term for keyword in keywords for term in normalize_terms(keyword)}
+    return sets
+
+
+def build_groups(term_sets: Dict[str, Set[str]], threshold: float = 0.5, max_df: float = 0.2,
+                 max_posting: int = MAX_POSTING) -> List[List[str]]:
+    """
+    Group articles whose keyword sets have a Jaccard similarity of at least
+    `threshold`, joining overlapping pairs with union-find.
+
+    Candidate pairs come from an inverted index over the terms, so only
+    articles sharing a term are compared. Each article is only indexed under
+    its rarest terms (prefix filtering): two sets of Jaccard similarity of at
+    least `threshold` always share one of their first n - ceil(threshold * n)
+    + 1 terms in order of increasing document frequency, so no qualifying
+    pair is missed. Terms found in more than `max_df` of the articles (e.g.
+    "health"), or in more than `max_posting` articles, do not generate
+    candidates on their own, which bounds the pairs compared per term.
+
+    Args:
+        term_sets (dict): Article ID → set of terms
+        threshold (float): Minimum Jaccard similarity for two articles to be joined
+        max_df (float): Maximum document frequency of a term used to find candidates
+        max_posting (int): Maximum number of articles of a term used to find candidates
+
+    Returns:
+        list: Groups as lists of article IDs
+    """
+    df = {}
+    for terms in term_sets.values():
+        for term in terms:
+            df[term] = df.get(term, 0) + 1
+    max_count = min(max_posting, max(2, int(max_df * len(term_sets))))
+
+    postings = {}
+    for article_id, terms in term_sets.items():
+        ordered = sorted(terms, key=lambda term: (df[term], term))
+        prefix = len(ordered) - math.ceil(threshold * len(ordered)) + 1
+        for term in ordered[:prefix]:
+            postings.setdefault(term, []).append(article_id)
+
+    union_find = UnionFind(term_sets)
+    compared = set()
+    for term, article_ids in postings.items():
+        if df[term] > max_count:
+            continue
+        for i, a in enumerate(article_ids):
+            for b in article_ids[i + 1:]:
+                if (a, b) in compared:
+                    continue
+                compared.add((a, b))
+                if jaccard(term_sets[a], term_sets[b]) >= threshold:
+                    union_find.union(a, b)
+    return union_find.groups()
+
+
+def select_representatives(groups: List[List[str]], term_sets: Dict[str, Set[str]],
+                           threshold: float = 0.5) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    Pick one representative per group and find the members that only joined
+    through a chain of overlaps.
+
+    The representative is the member most similar to the rest of its group.
+    Members less than `threshold / 2` similar to it are ambiguous: union-find
+    can chain loosely related articles together, so these are sent to the LLM
+    on their own instead of inheriting the representative's theme.
+
+    Args:
+        groups (list): Groups as lists of article IDs
+        term_sets (dict): Article ID → set of terms
+        threshold (float): Similarity threshold used to build the groups
+
+    Returns:
+        Tuple containing:
+        - Representative ID → IDs of the other members that inherit its theme
+        - Ambiguous article IDs
+    """
+    members_by_rep = {}
+    ambiguous = []
+    for group in groups:
+        if len(group) == 1:
+            members_by_rep[group[0]] = []
+            continue
+        rep = max(group, key=lambda a: sum(jaccard(term_sets[a], term_sets[b]) for b in group if b != a))
+        members_by_rep[rep] = []
+        for member in group:
+            if member == rep:
+                continue
+            if jaccard(term_sets[rep], term_sets[member]) >= threshold / 2:
+                members_by_rep[rep].append(member)
+            else:
+                ambiguous.append(member)
+    return members_by_rep, ambiguous
+
+
+def pregroup_articles(articles: List, document_keywords: Dict[str, List[str]],
+                      threshold: float = 0.5) -> Tuple[List, Dict[str, List[str]]]:
+    """
+    Reduce the articles sent to the theme mapper to group representatives and
+    ambiguous articles.
+
+    Args:
+        articles (List): Article objects or records
+        document_keywords (dict): Link → keywords, as written by the tagger
+        threshold (float): Minimum keyword Jaccard similarity for grouping
+
+    Returns:
+        Tuple containing:
+        - Articles to send to the LLM, in their original order
+        - Representative ID → IDs of members that inherit its theme
+    """
+    term_sets = keyword_sets(articles, document_keywords)
+    # Articles without keywords cannot be grouped and always go to the LLM
+    groupable = {article_id: terms for article_id, terms in term_sets.items() if terms}
+    members_by_rep, ambiguous = select_representatives(build_groups(groupable, threshold), groupable, threshold)
+
+    selected = set(members_by_rep) | set(ambiguous) | {a for a, terms in term_sets.items() if not terms}
+    llm_articles = [article for article in articles if article.article_id in selected]
+    grouped = sum(len(members) for members in members_by_rep.values())
+    print(f"Pre-grouping: {len(llm_articles)} of {len(articles)} articles go to the LLM, "
+          f"{grouped} inherit their group's theme ({len(ambiguous)} ambiguous)")
+    return llm_articles, {rep: members for rep, members in members_by_rep.items() if members}
+
+
+def expand_theme_groups(theme_groups: Dict[str, List[str]], members_by_rep: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Propagate each representative's theme to the members of its group.
+
+    Args:
+        theme_groups (dict): Theme → article IDs returned by the theme mapper
+        members_by_rep (dict): Representative ID → member IDs
+
+    Returns:
+        dict: Theme → article IDs including the group members
+    """
+    return {
+        theme: [i for article_id in ids for i in [article_id] + members_by_rep.get(article_id, [])]
+        for theme, ids in theme_groups.items()
+    }
+
+
+def orphaned_members(theme_groups: Dict[str, List[str]], members_by_rep: Dict[str, List[str]]) -> List[str]:
+    """
+    Find the members of groups whose representative the theme mapper left
+    unassigned, e.g. because its batch failed. They would otherwise lose
+    their theme along with it.
+
+    Args:
+        theme_groups (dict): Theme → article IDs returned by the theme mapper
+        members_by_rep (dict): Representative ID → member IDs
+
+    Returns:
+        list: Member IDs without a theme
+    """
+    assigned = {article_id for ids in theme_groups.values() for article_id in ids}
+    return [member for rep, members in members_by_rep.items() if rep not in assigned for member in members]
+
+
+def merge_theme_groups(theme_groups: Dict[str, List[str]], extra: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Add the article IDs of a second theme mapping to the first, by theme name.
+
+    Args:
+        theme_groups (dict): Theme → article IDs
+        extra (dict): Theme → article IDs to add
+
+    Returns:
+        dict: Merged theme → article IDs
+    """
+    merged = {theme: list(ids) for theme, ids in theme_groups.items()}
+    for theme, ids in extra.items():
+        merged.setdefault(theme, []).extend(ids)
+    return merged
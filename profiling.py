@@ -0,0 +1,191 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = "results/profiles"
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler. A background thread records the stack of
+    every other thread at a fixed interval, so time spent in worker threads
+    (e.g. the tagging and summarization pools waiting on sockets) shows up
+    too, unlike with cProfile, which only sees the thread it runs in.
+
+    Stacks are kept in collapsed form ("thread;outer;...;inner" → count),
+    the input format of flamegraph.pl and speedscope.
+
+    Args:
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or names.get(ident, "").startswith("stack-sampler"):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        """
+        Write the samples in collapsed-stack format, one "stack count" per line.
+
+        Args:
+            path (str): Output file
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def leaf_counts(self):
+        """
+        Returns:
+            Counter: Innermost frame → number of samples
+        """
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves
+
+
+class StageProfiler:
+    """
+    Profile pipeline stages: wall and CPU time for every stage, a cProfile
+    of the stage's own thread saved as `<stage>.pstats`, and optionally a
+    sampled `<stage>.collapsed` stack file covering all threads.
+
+    Stages that run concurrently each get their own cProfile, but their
+    sampled stacks overlap, since the sampler sees every thread. On Python
+    versions where only one cProfile can be active at a time, a stage that
+    overlaps another is timed without cProfile.
+
+    Args:
+        output_dir (str): Directory for this run's profiles
+        sample_interval (float): Seconds between stack samples; None disables sampling
+        top (int): Number of hotspots printed by `report`
+    """
+
+    def __init__(self, output_dir=None, sample_interval=None, top=20):
+        self.output_dir = output_dir or os.path.join(DEFAULT_PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S"))
+        self.sample_interval = sample_interval
+        self.top = top
+        self.timings = {}
+        self.pstats_files = []
+        self.samplers = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, name, func):
+        """
+        Wrap a stage function so that running it is profiled.
+
+        Args:
+            name (str): Stage name, used for the output file names
+            func (callable): Zero-argument stage function
+
+        Returns:
+            callable: Profiled stage function
+        """
+        def profiled():
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                print(f"Profiling stage '{name}' without cProfile: {e}")
+                profile = None
+            sampler = None
+            if self.sample_interval:
+                sampler = StackSampler(self.sample_interval)
+                sampler.start()
+
+            wall_start, thread_start, process_start = time.perf_counter(), time.thread_time(), time.process_time()
+            try:
+                return func()
+            finally:
+                timing = {
+                    "wall": time.perf_counter() - wall_start,
+                    "cpu_thread": time.thread_time() - thread_start,
+                    "cpu_process": time.process_time() - process_start,
+                }
+                if profile is not None:
+                    profile.disable()
+                    path = os.path.join(self.output_dir, f"{name}.pstats")
+                    profile.dump_stats(path)
+                    with self._lock:
+                        # A stage run twice overwrites its file; list it once
+                        if path not in self.pstats_files:
+                            self.pstats_files.append(path)
+                if sampler is not None:
+                    sampler.stop()
+                    sampler.write_collapsed(os.path.join(self.output_dir, f"{name}.collapsed"))
+                    timing["samples"] = sampler.samples
+                with self._lock:
+                    self.timings[name] = timing
+                    if sampler is not None:
+                        self.samplers[name] = sampler
+
+        return profiled
+
+    def report(self):
+        """
+        Print per-stage timers and the top hotspots, and save the timers to
+        timings.json in the output directory.
+        """
+        if not self.timings:
+            return
+        print(f"\nStage timings (profiles in {self.output_dir}):")
+        print(f"{'stage':<12}{'wall s':>10}{'cpu s':>10}{'proc cpu s':>12}")
+        for name, timing in self.timings.items():
+            print(f"{name:<12}{timing['wall']:>10.2f}{timing['cpu_thread']:>10.2f}{timing['cpu_process']:>12.2f}")
+        with open(os.path.join(self.output_dir, "timings.json"), "w") as f:
+            json.dump(self.timings, f, indent=2)
+
+        if self.pstats_files:
+            stream = io.StringIO()
+            stats = pstats.Stats(*self.pstats_files, stream=stream)
+            stats.strip_dirs().sort_stats("tottime").print_stats(self.top)
+            print(f"\nTop {self.top} functions by own time (cProfile, stage threads):")
+            # Skip pstats' preamble up to the column header
+            lines = stream.getvalue().splitlines()
+            header = next((i for i, line in enumerate(lines) if "ncalls" in line), 0)
+            print("\n".join(line for line in lines[header:] if line.strip()))
+
+        if self.samplers:
+            leaves = Counter()
+            for sampler in self.samplers.values():
+                leaves.update(sampler.leaf_counts())
+            total = sum(leaves.values())
+            print(f"\nTop {self.top} sampled frames (all threads, {total} samples):")
+            for frame, count in leaves.most_common(self.top):
+                print(f"{100 * count / total:>6.1f}%  {frame}")
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+
+# Default request budgets per model. Each Groq model has its own rate-limit
+# bucket, so tagging (scout) and summarizing (maverick) can run side by side
+# at their full budgets.
+DEFAULT_LIMITS = {
+    "meta-llama/llama-4-scout-17b-16e-instruct": {"requests_per_minute": 30, "max_concurrency": 4},
+    "meta-llama/llama-4-maverick-17b-128e-instruct": {"requests_per_minute": 30, "max_concurrency": 4},
+}
+FALLBACK_LIMIT = {"requests_per_minute": 25, "max_concurrency": 2}
+
+
+class RateLimiter:
+    """
+    Thread-safe request budget for one model: at most `requests_per_minute`
+    calls start in any 60-second window and at most `max_concurrency` calls
+    are in flight at once.
+
+    Use as a context manager around each API call.
+
+    Args:
+        requests_per_minute (int): Maximum calls started per sliding minute
+        max_concurrency (int): Maximum calls in flight
+        window (float): Length of the rate window in seconds
+    """
+
+    def __init__(self, requests_per_minute=25, max_concurrency=2, window=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.window = window
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._starts = deque()
+
+    def acquire(self):
+        """
+        Block until a call may start within both budgets.
+        """
+        self._slots.acquire()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._starts and now - self._starts[0] >= self.window:
+                    self._starts.popleft()
+                if len(self._starts) < self.requests_per_minute:
+                    self._starts.append(now)
+                    return
+                wait_for = self.window - (now - self._starts[0])
+            time.sleep(max(wait_for, 0.01))
+
+    def release(self):
+        """
+        Mark an in-flight call as finished.
+        """
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+_limiters = {}
+_limits = {model: dict(limit) for model, limit in DEFAULT_LIMITS.items()}
+_registry_lock = threading.Lock()
+
+
+def configure_limit(model, requests_per_minute=None, max_concurrency=None):
+    """
+    Override the request budget of a model. Takes effect for limiters created
+    afterwards.
+
+    Args:
+        model (str): Model name
+        requests_per_minute (int): Maximum calls started per sliding minute
+        max_concurrency (int): Maximum calls in flight
+    """
+    with _registry_lock:
+        limit = _limits.setdefault(model, dict(FALLBACK_LIMIT))
+        if requests_per_minute:
+            limit["requests_per_minute"] = requests_per_minute
+        if max_concurrency:
+            limit["max_concurrency"] = max_concurrency
+        _limiters.pop(model, None)
+
+
+def get_limiter(model):
+    """
+    Return the shared rate limiter for a model, creating it on first use.
+
+    Args:
+        model (str): Model name
+
+    Returns:
+        RateLimiter: Limiter shared by every caller of this model in the process
+    """
+    with _registry_lock:
+        if model not in _limiters:
+            limit = _limits.get(model, FALLBACK_LIMIT)
+            _limiters[model] = RateLimiter(limit["requests_per_minute"], limit["max_concurrency"])
+        return _limiters[model]
@@ -1,10 +1,17 @@
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+import gzip
+import json
 import re
+import xml.etree.ElementTree as ET
 import pandas as pd 
 from tqdm import tqdm
 import os
+from http_cache import fetch
+from utils import canonicalize_url
+
+SITEMAP_STATE_FILE = "results/sitemap_state.json"
 
 def extract_article_Links(base_url , output_file = "links.txt" , max_depth = 3):
     """
@@ -28,7 +35,7 @@ def extract_article_Links(base_url , output_file = "links.txt" , max_depth = 3):
       visited.add(url)
 
       try:
-        response = requests.get(url)
+        response = fetch(url)
         response.raise_for_status()
 
       except requests.RequestException as e:
@@ -65,6 +72,260 @@ def extract_article_Links(base_url , output_file = "links.txt" , max_depth = 3):
         print(f"Error in extract_article_Links:")
         return set()
 
+def _local_name(tag):
+    """
+    Strip the XML namespace from an element tag.
+
+    Args:
+        tag (str): Tag such as '{http://www.sitemaps.org/schemas/sitemap/0.9}loc'
+
+    Returns:
+        str: Tag without namespace, e.g. 'loc'
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def _open_xml_stream(url):
+    """
+    Open a streaming HTTP response body for incremental XML parsing,
+    transparently decompressing .gz sitemaps.
+
+    Args:
+        url (str): URL of the XML document
+
+    Returns:
+        Tuple of (response, file-like body)
+    """
+    response = requests.get(url, stream=True, timeout=30)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    body = response.raw
+    if url.endswith(".gz"):
+        body = gzip.GzipFile(fileobj=body)
+    return response, body
+
+
+def parse_sitemap(sitemap_url, max_sitemaps=200):
+    """
+    Stream-parse a sitemap (or sitemap index) and yield every page it lists.
+
+    Child sitemaps of a sitemap index are followed. Each entry is removed from
+    the document tree as soon as it is read, so memory stays flat for very
+    large sitemaps.
+
+    Args:
+        sitemap_url (str): URL of the sitemap or sitemap index
+        max_sitemaps (int): Maximum number of sitemap documents to read
+
+    Yields:
+        Tuple of (page URL, lastmod string or None)
+    """
+    pending = [sitemap_url]
+    seen = set()
+    while pending and len(seen) < max_sitemaps:
+        url = pending.pop(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        try:
+            response, body = _open_xml_stream(url)
+        except requests.RequestException as e:
+            print(f"Error fetching sitemap {url} : {e}")
+            continue
+
+        try:
+            loc, lastmod = None, None
+            root = None
+            for event, element in ET.iterparse(body, events=("start", "end")):
+                if root is None:
+                    root = element
+                if event == "start":
+                    continue
+                name = _local_name(element.tag)
+                if name == "loc":
+                    loc = (element.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (element.text or "").strip() or None
+                elif name == "sitemap":
+                    if loc:
+                        pending.append(loc)
+                    loc, lastmod = None, None
+                    # Detach the finished entries, so the root does not
+                    # collect an empty element per entry
+                    root.clear()
+                elif name == "url":
+                    if loc:
+                        yield loc, lastmod
+                    loc, lastmod = None, None
+                    root.clear()
+        except ET.ParseError as e:
+            print(f"Error parsing sitemap {url} : {e}")
+        finally:
+            response.close()
+
+
+def parse_feed(feed_url):
+    """
+    Stream-parse an RSS or Atom feed and yield the article links it lists.
+
+    Args:
+        feed_url (str): URL of the feed
+
+    Yields:
+        Tuple of (article URL, publication/update date string or None)
+    """
+    try:
+        response, body = _open_xml_stream(feed_url)
+    except requests.RequestException as e:
+        print(f"Error fetching feed {feed_url} : {e}")
+        return
+
+    try:
+        link, updated = None, None
+        for event, element in ET.iterparse(body, events=("start", "end")):
+            name = _local_name(element.tag)
+            if event == "start":
+                # Ignore channel-level links that precede the first item
+                if name in ("item", "entry"):
+                    link, updated = None, None
+                continue
+            if name == "link":
+                # RSS puts the URL in the text, Atom in the href attribute
+                link = (element.text or element.get("href") or "").strip() or link
+            elif name in ("pubDate", "updated", "published"):
+                updated = (element.text or "").strip() or updated
+            elif name in ("item", "entry"):
+                if link:
+                    yield link, updated
+                link, updated = None, None
+                element.clear()
+    except ET.ParseError as e:
+        print(f"Error parsing feed {feed_url} : {e}")
+    finally:
+        response.close()
+
+
+def find_sitemaps_and_feeds(base_url):
+    """
+    Locate the site's sitemaps (from robots.txt, falling back to /sitemap.xml)
+    and the RSS/Atom feeds advertised on the base page.
+
+    Args:
+        base_url (str): The site's health channel URL
+
+    Returns:
+        Tuple of (list of sitemap URLs, list of feed URLs)
+    """
+    sitemaps = []
+    try:
+        response = fetch(urljoin(base_url, "/robots.txt"))
+        if response.ok:
+            for line in response.text.splitlines():
+                if line.lower().startswith("sitemap:"):
+                    sitemaps.append(line.split(":", 1)[1].strip())
+    except requests.RequestException as e:
+        print(f"Error fetching robots.txt : {e}")
+    if not sitemaps:
+        sitemaps.append(urljoin(base_url, "/sitemap.xml"))
+
+    feeds = []
+    try:
+        response = fetch(base_url)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.content, "html.parser")
+        for tag in soup.find_all("link", rel="alternate", href=True):
+            if tag.get("type") in ("application/rss+xml", "application/atom+xml"):
+                feeds.append(urljoin(base_url, tag["href"]))
+    except requests.RequestException as e:
+        print(f"Error fetching {base_url} : {e}")
+    return sitemaps, feeds
+
+
+def load_sitemap_state(state_file=SITEMAP_STATE_FILE):
+    """
+    Load the lastmod recorded for each article on the previous discovery run.
+
+    Args:
+        state_file (str): JSON file mapping article URLs to lastmod strings
+
+    Returns:
+        dict: Article URL → lastmod string (or None)
+    """
+    if not os.path.exists(state_file):
+        return {}
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read {state_file}: {e}")
+        return {}
+
+
+def discover_article_links(base_url, output_file="links.txt", state_file=SITEMAP_STATE_FILE, feeds=None):
+    """
+    Discover health article links from the site's sitemaps and RSS feeds
+    instead of crawling, and work out which ones changed since the last run.
+
+    An article counts as changed when it is new or its lastmod differs from
+    the one recorded in `state_file`. Articles without a lastmod are only
+    treated as changed the first time they are seen.
+
+    Args:
+        base_url (str): The site's health channel URL
+        output_file (str): File to save the discovered links
+        state_file (str): JSON file recording each article's lastmod between runs
+        feeds (list): Extra RSS/Atom feed URLs to read
+
+    Returns:
+        Tuple of (set of all article links, set of changed article links,
+        dict of link → lastmod to save once the articles are fetched)
+    """
+    section = urlsplit(base_url).path.rstrip("/") or "/health"
+    prefix = section + "/"
+    previous = load_sitemap_state(state_file)
+
+    sitemaps, advertised_feeds = find_sitemaps_and_feeds(base_url)
+    lastmods = {}
+    for sitemap_url in sitemaps:
+        for loc, lastmod in parse_sitemap(sitemap_url):
+            link = canonicalize_url(loc)
+            if urlsplit(link).path.startswith(prefix):
+                lastmods[link] = lastmod
+    for feed_url in advertised_feeds + list(feeds or []):
+        for loc, updated in parse_feed(feed_url):
+            link = canonicalize_url(urljoin(base_url, loc))
+            if urlsplit(link).path.startswith(prefix):
+                # Sitemap lastmod wins; feeds mostly add very recent articles
+                lastmods.setdefault(link, updated)
+
+    links = set(lastmods)
+    changed = {
+        link for link, lastmod in lastmods.items()
+        if link not in previous or (lastmod is not None and previous[link] != lastmod)
+    }
+
+    if links:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, "w") as f:
+            for link in sorted(links):
+                f.write(link + "\n")
+        print(f"{len(links)} Links ({len(changed)} new or changed) saved to {output_file}")
+    return links, changed, lastmods
+
+
+def save_sitemap_state(lastmods, state_file=SITEMAP_STATE_FILE):
+    """
+    Record each article's lastmod for the next discovery run.
+
+    Args:
+        lastmods (dict): Article URL → lastmod string (or None)
+        state_file (str): JSON file to write
+    """
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    with open(state_file, "w") as f:
+        json.dump(lastmods, f, indent=2, sort_keys=True)
+
+
 def get_content_from_link(link , df):
     """
     Extract content from a single article link.
@@ -74,7 +335,7 @@ def get_content_from_link(link , df):
         df (DataFrame): DataFrame to store the results
     """
     try:
-        response = requests.get(link)
+        response = fetch(link)
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"Error visiting {link} : {e}")
@@ -91,27 +352,62 @@ def get_content_from_link(link , df):
     df.loc[len(df)] = [link, cleaned_content]
 
 
-def extract_article_content(link="https://www.aarp.org/health"):
+def extract_article_content(link="https://www.aarp.org/health", discovery="sitemap", results_dir="results"):
     """
     Main function to extract and process article content from links.
+
+    With discovery="sitemap" the article list comes from the site's sitemaps
+    and RSS feeds, only new or changed articles are downloaded, and the
+    content of unchanged ones is reused from the previous
+    health_articles.csv in `results_dir`. With discovery="adaptive" the links
+    come from the budgeted priority crawler in crawl_scheduler.py, and
+    unchanged articles are reused the same way. If sitemap discovery finds nothing, or
+    with discovery="crawl", the recursive crawler is used instead.
     
     Args:
         link (str): Base URL to scrape health articles from
+        discovery (str): "sitemap", "adaptive" or "crawl"
+        results_dir (str): Directory for health_articles.csv and the discovery state
         
     Returns:
         DataFrame: DataFrame containing article links and content
     """
+    articles_csv = os.path.join(results_dir, "health_articles.csv")
     try:
 
-      # First extract the links
-      links_set = extract_article_Links(link)
-
-      # If links.txt exists, read from it; otherwise, use the set
-      if os.path.exists("links.txt"):
-            with open("links.txt", "r") as file:
-                links = [line.strip() for line in file]
+      lastmods = None
+      previous_content = {}
+      if discovery == "sitemap":
+            state_file = os.path.join(results_dir, os.path.basename(SITEMAP_STATE_FILE))
+            links_set, changed, lastmods = discover_article_links(link, state_file=state_file)
+            if not links_set:
+                print("Sitemap/RSS discovery found no articles; falling back to crawling")
+                discovery = "crawl"
+                # Crawled links have no lastmod to remember
+                lastmods = None
+      elif discovery == "adaptive":
+            from crawl_scheduler import CRAWL_STATE_FILE, adaptive_crawl
+            links_set, changed = adaptive_crawl(
+                link, state_file=os.path.join(results_dir, os.path.basename(CRAWL_STATE_FILE)))
+
+      if discovery in ("sitemap", "adaptive"):
+            links = sorted(links_set)
+            if os.path.exists(articles_csv):
+                previous_df = pd.read_csv(articles_csv)
+                previous_content = dict(zip(previous_df["Link"], previous_df["Content"]))
+            to_fetch = [l for l in links if l in changed or l not in previous_content]
+            print(f"Reusing {len(links) - len(to_fetch)} unchanged articles from the previous run")
       else:
-            links = list(links_set)
+            # First extract the links
+            links_set = extract_article_Links(link)
+
+            # If links.txt exists, read from it; otherwise, use the set
+            if os.path.exists("links.txt"):
+                with open("links.txt", "r") as file:
+                    links = [line.strip() for line in file]
+            else:
+                links = list(links_set)
+            to_fetch = links
 
       if not links:
             print("No links found. Check the base URL and network connection.")
@@ -120,17 +416,25 @@ def extract_article_content(link="https://www.aarp.org/health"):
       print(f"Found {len(links)} links")
 
       # Create DataFrame to store results
-      df = pd.DataFrame(columns=["Link" , "Content"])
-      for link in tqdm(links, desc="Processing articles"):
-          get_content_from_link(link, df)
+      fetched_df = pd.DataFrame(columns=["Link" , "Content"])
+      for article_link in tqdm(to_fetch, desc="Processing articles"):
+          get_content_from_link(article_link, fetched_df)
+
+      contents = {l: previous_content[l] for l in links if l in previous_content and l not in to_fetch}
+      contents.update(zip(fetched_df["Link"], fetched_df["Content"]))
+      df = pd.DataFrame([[l, contents[l]] for l in links if l in contents], columns=["Link", "Content"])
 
       # Ensure results directory exists
-      os.makedirs("results", exist_ok=True)
+      os.makedirs(results_dir, exist_ok=True)
 
       # Save results to CSV
-      df.to_csv("results/health_articles.csv" , index=False)
-      print(f"Saved {len(df)} articles to results/health_articles_depth_3.csv")
+      df.to_csv(articles_csv , index=False)
+      print(f"Saved {len(df)} articles to {articles_csv}")
 
+      # Only remember lastmods of articles we actually have, so failed
+      # downloads are retried on the next run
+      if lastmods is not None:
+          save_sitemap_state({l: lastmods[l] for l in df["Link"]}, state_file)
 
       return df
     
@@ -0,0 +1,257 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from textutils import normalize_terms
+
+DEFAULT_INDEX_FILE = "results/search_index.sqlite"
+
+
+def read_article_links(csv_path):
+    """
+    Read the Id and Link columns of a pipeline CSV without loading the rest.
+
+    Args:
+        csv_path (str): Path to summarized_articles.csv or cleaned_articles.csv
+
+    Returns:
+        dict: Article ID → link
+    """
+    # Article bodies can exceed the csv module's default field limit
+    csv.field_size_limit(sys.maxsize)
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        return {int(row["Id"]): row["Link"] for row in csv.DictReader(f)}
+
+
+def build_index(articles_csv, keywords_json, themes_json, index_file=DEFAULT_INDEX_FILE):
+    """
+    Build the inverted index from the pipeline outputs.
+
+    The index is an SQLite file with one postings table per source
+    (keyword terms → articles, theme terms → themes) plus the article → theme
+    assignments, all indexed so queries touch only the matching rows. Missing
+    keyword or theme files are skipped, e.g. when tagging failed.
+
+    Args:
+        articles_csv (str): CSV with Id and Link columns
+        keywords_json (str): document_keywords.json (link → keywords)
+        themes_json (str): article_to_theme.json (theme → article IDs)
+        index_file (str): Path of the index to write
+
+    Returns:
+        dict: Number of articles, themes and postings indexed
+    """
+    try:
+        links = read_article_links(articles_csv)
+        id_by_link = {link: article_id for article_id, link in links.items()}
+
+        keywords = {}
+        if os.path.exists(keywords_json):
+            with open(keywords_json, "r") as f:
+                keywords = json.load(f)
+        else:
+            print(f"Warning: {keywords_json} not found; indexing themes only")
+
+        themes = {}
+        if os.path.exists(themes_json):
+            with open(themes_json, "r") as f:
+                themes = json.load(f)
+        else:
+            print(f"Warning: {themes_json} not found; indexing keywords only")
+
+        os.makedirs(os.path.dirname(index_file) or ".", exist_ok=True)
+        tmp_path = index_file + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        db = sqlite3.connect(tmp_path)
+        db.executescript(
+            "CREATE TABLE articles (id INTEGER PRIMARY KEY, link TEXT);"
+            "CREATE TABLE themes (id INTEGER PRIMARY KEY, name TEXT UNIQUE, size INTEGER);"
+            "CREATE TABLE keywords (article_id INTEGER, keyword TEXT);"
+            "CREATE TABLE keyword_postings (term TEXT, article_id INTEGER, PRIMARY KEY (term, article_id))"
+            " WITHOUT ROWID;"
+            "CREATE TABLE theme_postings (term TEXT, theme_id INTEGER, PRIMARY KEY (term, theme_id)) WITHOUT ROWID;"
+            "CREATE TABLE article_themes (article_id INTEGER, theme_id INTEGER, PRIMARY KEY (article_id, theme_id))"
+            " WITHOUT ROWID;"
+        )
+        db.executemany("INSERT INTO articles VALUES (?, ?)", links.items())
+
+        keyword_rows, keyword_postings = [], set()
+        for link, article_keywords in keywords.items():
+            article_id = id_by_link.get(link)
+            if article_id is None:
+                continue
+            for keyword in article_keywords:
+                keyword_rows.append((article_id, keyword))
+                keyword_postings.update((term, article_id) for term in normalize_terms(keyword))
+        db.executemany("INSERT INTO keywords VALUES (?, ?)", keyword_rows)
+        db.executemany("INSERT INTO keyword_postings VALUES (?, ?)", keyword_postings)
+
+        theme_postings, article_themes = set(), set()
+        for theme_id, (theme, ids) in enumerate(themes.items()):
+            db.execute("INSERT INTO themes VALUES (?, ?, ?)", (theme_id, theme, len(ids)))
+            theme_postings.update((term, theme_id) for term in normalize_terms(theme))
+            article_themes.update((int(article_id), theme_id) for article_id in ids)
+        db.executemany("INSERT INTO theme_postings VALUES (?, ?)", theme_postings)
+        db.executemany("INSERT INTO article_themes VALUES (?, ?)", article_themes)
+        db.execute("CREATE INDEX keywords_article ON keywords (article_id)")
+        db.execute("CREATE INDEX article_themes_theme ON article_themes (theme_id)")
+        db.commit()
+        db.execute("VACUUM")
+        db.close()
+        os.replace(tmp_path, index_file)
+
+        counts = {"articles": len(links), "themes": len(themes),
+                  "postings": len(keyword_postings) + len(theme_postings)}
+        print(f"Indexed {counts['articles']} articles, {counts['themes']} themes and "
+              f"{counts['postings']} postings into {index_file}")
+        return counts
+
+    except Exception as e:
+        raise Exception(f"Error building search index: {e}")
+
+
+class SearchIndex:
+    """
+    Read-only queries over an index built by `build_index`. Only the postings
+    for the query terms are read, so queries do not depend on corpus size.
+
+    Args:
+        index_file (str): Path to the index
+    """
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE):
+        if not os.path.exists(index_file):
+            raise Exception(f"{index_file} not found. Run `python main.py index` first.")
+        self.db = sqlite3.connect(f"file:{index_file}?mode=ro", uri=True)
+
+    def close(self):
+        self.db.close()
+
+    def _matching_themes(self, terms):
+        """
+        Theme IDs whose names contain every query term.
+        """
+        placeholders = ",".join("?" * len(terms))
+        rows = self.db.execute(
+            f"SELECT theme_id FROM theme_postings WHERE term IN ({placeholders}) "
+            "GROUP BY theme_id HAVING COUNT(*) = ?",
+            (*terms, len(terms)),
+        )
+        return [theme_id for (theme_id,) in rows]
+
+    def articles_about(self, query, limit=20):
+        """
+        Find articles about a topic: articles whose keywords contain every
+        query term, plus articles in themes whose names contain every term.
+        Articles matching both ways rank first.
+
+        Args:
+            query (str): Free-text topic, e.g. "heart disease"
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Dicts with id, link, score, themes and keywords
+        """
+        terms = normalize_terms(query)
+        if not terms:
+            return []
+        placeholders = ",".join("?" * len(terms))
+        scores = {}
+        for (article_id,) in self.db.execute(
+            f"SELECT article_id FROM keyword_postings WHERE term IN ({placeholders}) "
+            "GROUP BY article_id HAVING COUNT(*) = ?",
+            (*terms, len(terms)),
+        ):
+            scores[article_id] = scores.get(article_id, 0) + 2
+
+        theme_ids = self._matching_themes(terms)
+        if theme_ids:
+            theme_placeholders = ",".join("?" * len(theme_ids))
+            for (article_id,) in self.db.execute(
+                f"SELECT DISTINCT article_id FROM article_themes WHERE theme_id IN ({theme_placeholders})",
+                theme_ids,
+            ):
+                scores[article_id] = scores.get(article_id, 0) + 1
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [self._describe(article_id, score) for article_id, score in ranked]
+
+    def _describe(self, article_id, score):
+        link = self.db.execute("SELECT link FROM articles WHERE id = ?", (article_id,)).fetchone()
+        themes = [name for (name,) in self.db.execute(
+            "SELECT t.name FROM article_themes a JOIN themes t ON t.id = a.theme_id WHERE a.article_id = ?",
+            (article_id,),
+        )]
+        keywords = [keyword for (keyword,) in self.db.execute(
+            "SELECT keyword FROM keywords WHERE article_id = ?", (article_id,)
+        )]
+        return {"id": article_id, "link": link[0] if link else None, "score": score,
+                "themes": themes, "keywords": keywords}
+
+    def themes_for_keyword(self, keyword, limit=20):
+        """
+        Find the themes of articles tagged with a keyword, with the number of
+        such articles in each theme.
+
+        Args:
+            keyword (str): Keyword, e.g. "blood pressure"
+            limit (int): Maximum number of themes
+
+        Returns:
+            list: Dicts with theme, articles (co-occurring count) and size (theme size)
+        """
+        terms = normalize_terms(keyword)
+        if not terms:
+            return []
+        placeholders = ",".join("?" * len(terms))
+        rows = self.db.execute(
+            "SELECT t.name, COUNT(*) AS n, t.size FROM article_themes a JOIN themes t ON t.id = a.theme_id "
+            "WHERE a.article_id IN ("
+            f"  SELECT article_id FROM keyword_postings WHERE term IN ({placeholders}) "
+            "   GROUP BY article_id HAVING COUNT(*) = ?) "
+            "GROUP BY t.id ORDER BY n DESC, t.name LIMIT ?",
+            (*terms, len(terms), limit),
+        )
+        return [{"theme": name, "articles": n, "size": size} for name, n, size in rows]
+
+
+def search(query=None, keyword=None, index_file=DEFAULT_INDEX_FILE, limit=20):
+    """
+    Run a query against the index and print the results with the query time.
+
+    Args:
+        query (str): Topic for "articles about X"
+        keyword (str): Keyword for "themes co-occurring with keyword Y"
+        index_file (str): Path to the index
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Query results
+    """
+    index = SearchIndex(index_file)
+    try:
+        start = time.perf_counter()
+        if keyword:
+            results = index.themes_for_keyword(keyword, limit)
+        else:
+            results = index.articles_about(query, limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        index.close()
+
+    if keyword:
+        for result in results:
+            print(f"{result['articles']:>4} / {result['size']:<4} {result['theme']}")
+    else:
+        for result in results:
+            print(f"[{result['score']}] {result['link']}")
+            if result["themes"]:
+                print(f"      themes: {', '.join(result['themes'])}")
+            if result["keywords"]:
+                print(f"      keywords: {', '.join(result['keywords'])}")
+    print(f"{len(results)} result(s) in {elapsed_ms:.1f} ms")
+    return results
@@ -0,0 +1,459 @@
+import csv
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+from utils import canonicalize_url
+
+# Sharded backfills. A planner splits the canonical article URLs into N shards
+# by hash inside a shared directory; any number of workers (processes, or
+# containers mounting the directory) claim shards and run
+# scrape → clean → tag → summarize on them; a coordinator merges the shard
+# artifacts and clusters the whole archive once.
+#
+#   <shared>/plan.json
+#   <shared>/shards/shard-0003/links.txt            URLs of this shard
+#   <shared>/shards/shard-0003/claim                 worker holding the shard
+#   <shared>/shards/shard-0003/done                  written when the shard finished
+#   <shared>/shards/shard-0003/failures              number of failed attempts so far
+#   <shared>/shards/shard-0003/failed                written when the shard is given up
+#   <shared>/shards/shard-0003/*.csv, *.json         the usual stage artifacts
+
+SHARDS_DIR = "shards"
+PLAN_FILE = "plan.json"
+STALE_AFTER = 6 * 3600
+HEARTBEAT_INTERVAL = 300
+MAX_FAILURES = 3
+
+
+def shard_of(url, shards):
+    """
+    Stable shard number of a URL (independent of process and Python version).
+
+    Args:
+        url (str): Article URL
+        shards (int): Number of shards
+
+    Returns:
+        int: Shard number between 0 and shards - 1
+    """
+    digest = hashlib.sha1(canonicalize_url(url).encode()).hexdigest()
+    return int(digest[:8], 16) % shards
+
+
+def shard_dir(shared_dir, shard):
+    return os.path.join(shared_dir, SHARDS_DIR, f"shard-{shard:04d}")
+
+
+def load_plan(shared_dir):
+    """
+    Load the shard plan.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+
+    Returns:
+        dict: Plan with link, discovery, shards and total
+    """
+    path = os.path.join(shared_dir, PLAN_FILE)
+    if not os.path.exists(path):
+        raise Exception(f"{path} not found. Run `python main.py shard plan` first.")
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def plan_shards(link, shared_dir, shards, discovery="sitemap"):
+    """
+    Discover the article URLs once and split them into shards by hash.
+
+    Args:
+        link (str): Base URL to scrape health articles from
+        shared_dir (str): Shared coordination directory
+        shards (int): Number of shards
+        discovery (str): "sitemap" (sitemaps/RSS, crawler as fallback), "adaptive" or "crawl"
+
+    Returns:
+        dict: The written plan
+    """
+    from scraper import discover_article_links, extract_article_Links
+
+    if os.path.exists(os.path.join(shared_dir, PLAN_FILE)):
+        raise Exception(f"{shared_dir} already holds a shard plan; use a fresh directory")
+
+    links = set()
+    if discovery == "sitemap":
+        links, _, _ = discover_article_links(
+            link, output_file=os.path.join(shared_dir, "links.txt"),
+            state_file=os.path.join(shared_dir, "sitemap_state.json"),
+        )
+        if not links:
+            print("Sitemap/RSS discovery found no articles; falling back to crawling")
+    elif discovery == "adaptive":
+        from crawl_scheduler import adaptive_crawl
+
+        links, _ = adaptive_crawl(link, output_file=os.path.join(shared_dir, "links.txt"),
+                                  state_file=os.path.join(shared_dir, "crawl_state.json"))
+    if not links:
+        links = extract_article_Links(link, output_file=os.path.join(shared_dir, "links.txt"))
+    links = sorted({canonicalize_url(l) for l in links})
+    if not links:
+        raise Exception("No article links found to shard")
+
+    by_shard = {shard: [] for shard in range(shards)}
+    for url in links:
+        by_shard[shard_of(url, shards)].append(url)
+    for shard, urls in by_shard.items():
+        os.makedirs(shard_dir(shared_dir, shard), exist_ok=True)
+        with open(os.path.join(shard_dir(shared_dir, shard), "links.txt"), "w") as f:
+            f.writelines(url + "\n" for url in urls)
+
+    plan = {"link": link, "discovery": discovery, "shards": shards, "total": len(links), "created": time.time()}
+    with open(os.path.join(shared_dir, PLAN_FILE), "w") as f:
+        json.dump(plan, f, indent=2)
+    sizes = [len(urls) for urls in by_shard.values()]
+    print(f"Planned {len(links)} articles in {shards} shards ({min(sizes)}–{max(sizes)} per shard) in {shared_dir}")
+    return plan
+
+
+def claim_shard(shared_dir, worker_id, stale_after=STALE_AFTER, skip=()):
+    """
+    Claim the next shard that is neither done nor given up. Claims are files
+    created with O_EXCL, so two workers never get the same shard; a claim not
+    refreshed (see `touch_claim`) for `stale_after` seconds without a done
+    marker is assumed to belong to a dead worker and is taken over.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+        worker_id (str): Identifier recorded in the claim
+        stale_after (float): Seconds after which an unfinished claim may be taken over
+        skip (iterable): Shard numbers this worker should not claim, e.g. ones it failed
+
+    Returns:
+        int: Claimed shard number, or None when no shard is left
+    """
+    plan = load_plan(shared_dir)
+    for shard in range(plan["shards"]):
+        if shard in skip:
+            continue
+        directory = shard_dir(shared_dir, shard)
+        claim_path = os.path.join(directory, "claim")
+        if os.path.exists(os.path.join(directory, "done")) or os.path.exists(os.path.join(directory, "failed")):
+            continue
+        try:
+            if os.path.exists(claim_path) and time.time() - os.path.getmtime(claim_path) > stale_after:
+                if not _take_stale_claim(claim_path, worker_id, stale_after):
+                    continue
+                print(f"Taking over stale claim on shard {shard}")
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except (FileExistsError, FileNotFoundError):
+            continue
+        with os.fdopen(fd, "w") as f:
+            json.dump({"worker": worker_id, "claimed": time.time()}, f)
+        return shard
+    return None
+
+
+def _take_stale_claim(claim_path, worker_id, stale_after):
+    """
+    Move a stale claim out of the way so a new one can be created.
+
+    The claim is renamed to a name only this worker uses, so of several
+    workers that found it stale, only one rename succeeds. A slower worker's
+    rename may instead catch the fresh claim the winner just created; the
+    moved file is then no longer stale and is linked back in place.
+
+    Returns:
+        bool: True if the stale claim was removed by this worker
+    """
+    aside = f"{claim_path}.{worker_id}.{os.urandom(4).hex()}"
+    try:
+        os.rename(claim_path, aside)
+    except FileNotFoundError:
+        return False
+    if time.time() - os.path.getmtime(aside) > stale_after:
+        os.remove(aside)
+        return True
+    try:
+        os.link(aside, claim_path)
+    except FileExistsError:
+        pass
+    os.remove(aside)
+    return False
+
+
+def touch_claim(shared_dir, shard):
+    """
+    Refresh a claim so other workers do not consider it stale.
+    """
+    os.utime(os.path.join(shard_dir(shared_dir, shard), "claim"))
+
+
+class ClaimHeartbeat:
+    """
+    Keep a claim fresh from a background thread for as long as the shard is
+    being processed, so a stage running longer than the stale timeout (e.g.
+    summarizing a large shard under a low rate limit) does not lose its shard
+    to another worker.
+
+    Use as a context manager around the work on the shard.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+        shard (int): Claimed shard number
+        interval (float): Seconds between refreshes; must be well below the stale timeout
+    """
+
+    def __init__(self, shared_dir, shard, interval=HEARTBEAT_INTERVAL):
+        self.shared_dir = shared_dir
+        self.shard = shard
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                touch_claim(self.shared_dir, self.shard)
+            except OSError as e:
+                print(f"Warning: Could not refresh the claim on shard {self.shard}: {e}")
+
+    def __enter__(self):
+        touch_claim(self.shared_dir, self.shard)
+        self._thread = threading.Thread(target=self._run, name=f"claim-heartbeat-{self.shard}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def release_claim(shared_dir, shard):
+    """
+    Give up a claim, e.g. after the shard failed, so another worker can retry it.
+    """
+    try:
+        os.remove(os.path.join(shard_dir(shared_dir, shard), "claim"))
+    except FileNotFoundError:
+        pass
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def mark_done(shared_dir, shard, summary):
+    """
+    Record that a shard finished.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+        shard (int): Shard number
+        summary (dict): Information about the run, e.g. article counts
+    """
+    path = os.path.join(shard_dir(shared_dir, shard), "done")
+    with open(path + ".tmp", "w") as f:
+        json.dump(dict(summary, finished=time.time()), f)
+    os.replace(path + ".tmp", path)
+
+
+def record_failure(shared_dir, shard, error, max_failures=MAX_FAILURES):
+    """
+    Count a failed attempt on a claimed shard and give up the claim. After
+    `max_failures` attempts the shard is marked failed, so no worker retries
+    it and the coordinator stops waiting for it.
+
+    Only the worker holding the claim writes the counter, so it needs no lock.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+        shard (int): Shard number
+        error (str): Description of the failure
+        max_failures (int): Attempts after which the shard is given up
+
+    Returns:
+        bool: True if the shard is now marked failed
+    """
+    directory = shard_dir(shared_dir, shard)
+    path = os.path.join(directory, "failures")
+    failures = 0
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            failures = int(f.read().strip() or 0)
+    failures += 1
+    with open(path + ".tmp", "w") as f:
+        f.write(str(failures))
+    os.replace(path + ".tmp", path)
+
+    given_up = failures >= max_failures
+    if given_up:
+        with open(os.path.join(directory, "failed.tmp"), "w") as f:
+            json.dump({"failures": failures, "error": str(error), "finished": time.time()}, f)
+        os.replace(os.path.join(directory, "failed.tmp"), os.path.join(directory, "failed"))
+        print(f"Shard {shard} failed {failures} times; giving up on it")
+    release_claim(shared_dir, shard)
+    return given_up
+
+
+def shard_status(shared_dir):
+    """
+    Count done, failed, claimed and pending shards.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+
+    Returns:
+        dict: Shard number lists under "done", "failed", "claimed" and "pending"
+    """
+    plan = load_plan(shared_dir)
+    status = {"done": [], "failed": [], "claimed": [], "pending": []}
+    for shard in range(plan["shards"]):
+        directory = shard_dir(shared_dir, shard)
+        if os.path.exists(os.path.join(directory, "done")):
+            status["done"].append(shard)
+        elif os.path.exists(os.path.join(directory, "failed")):
+            status["failed"].append(shard)
+        elif os.path.exists(os.path.join(directory, "claim")):
+            status["claimed"].append(shard)
+        else:
+            status["pending"].append(shard)
+    return status
+
+
+def wait_for_shards(shared_dir, poll_interval=30, timeout=None):
+    """
+    Block until every shard is done or given up as failed.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+        poll_interval (float): Seconds between checks
+        timeout (float): Give up after this many seconds; None waits forever
+    """
+    start = time.time()
+    while True:
+        status = shard_status(shared_dir)
+        remaining = len(status["claimed"]) + len(status["pending"])
+        if not remaining:
+            if status["failed"]:
+                print(f"Warning: {len(status['failed'])} shard(s) failed and are left out: {status['failed']}")
+            return
+        if timeout is not None and time.time() - start >= timeout:
+            raise Exception(f"{remaining} shard(s) not finished: "
+                            f"{len(status['claimed'])} claimed, {len(status['pending'])} pending")
+        print(f"Waiting for {remaining} shard(s) ({len(status['done'])} done)...")
+        time.sleep(poll_interval)
+
+
+def scrape_shard(directory):
+    """
+    Download the articles listed in a shard's links.txt into its health_articles.csv.
+
+    Args:
+        directory (str): Shard directory
+
+    Returns:
+        DataFrame: DataFrame containing article links and content
+    """
+    import pandas as pd
+    from tqdm import tqdm
+    from scraper import get_content_from_link
+
+    with open(os.path.join(directory, "links.txt"), "r") as f:
+        links = [line.strip() for line in f if line.strip()]
+
+    df = pd.DataFrame(columns=["Link", "Content"])
+    for link in tqdm(links, desc=f"Scraping {os.path.basename(directory)}"):
+        get_content_from_link(link, df)
+    df.to_csv(os.path.join(directory, "health_articles.csv"), index=False)
+    print(f"Saved {len(df)} articles to {directory}/health_articles.csv")
+    return df
+
+
+def count_articles(directory):
+    """
+    Count the articles a shard's scrape stage downloaded, without loading them.
+
+    Args:
+        directory (str): Shard directory
+
+    Returns:
+        int: Number of rows in the shard's health_articles.csv
+    """
+    csv.field_size_limit(sys.maxsize)
+    with open(os.path.join(directory, "health_articles.csv"), "r", newline="", encoding="utf-8") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def merge_shards(shared_dir, results_dir="results", chunk_size=5000):
+    """
+    Concatenate the artifacts of the done shards into the results directory,
+    giving the articles new sequential Ids across shards. Failed shards and
+    shards without articles are left out. CSVs are copied in chunks, so
+    the merge does not hold the archive in memory.
+
+    Args:
+        shared_dir (str): Shared coordination directory
+        results_dir (str): Directory holding the pipeline outputs
+        chunk_size (int): Rows copied per chunk
+
+    Returns:
+        int: Number of merged articles
+    """
+    import pandas as pd
+
+    directories = []
+    for shard in shard_status(shared_dir)["done"]:
+        directory = shard_dir(shared_dir, shard)
+        with open(os.path.join(directory, "done"), "r") as f:
+            if json.load(f).get("articles", None) != 0:
+                directories.append(directory)
+    if not directories:
+        raise Exception("No finished shard has any articles to merge")
+    os.makedirs(results_dir, exist_ok=True)
+
+    # Raw articles have no Id and are simply concatenated
+    with open(os.path.join(results_dir, "health_articles.csv"), "w", newline="") as out:
+        header = True
+        for directory in directories:
+            for chunk in pd.read_csv(os.path.join(directory, "health_articles.csv"), chunksize=chunk_size):
+                chunk.to_csv(out, index=False, header=header)
+                header = False
+
+    # Cleaned and summarized rows get the same new Id, via the shard-local Id
+    total = 0
+    with open(os.path.join(results_dir, "cleaned_articles.csv"), "w", newline="") as cleaned_out, \
+            open(os.path.join(results_dir, "summarized_articles.csv"), "w", newline="") as summarized_out:
+        for directory in directories:
+            counts = {}
+            for name, out in (("cleaned_articles.csv", cleaned_out), ("summarized_articles.csv", summarized_out)):
+                counts[name] = 0
+                for chunk in pd.read_csv(os.path.join(directory, name), chunksize=chunk_size):
+                    chunk["Id"] = chunk["Id"] + total
+                    chunk.to_csv(out, index=False, header=(out.tell() == 0))
+                    counts[name] += len(chunk)
+            # Shard-local Ids are 0..n-1 over the cleaned articles
+            total += counts["cleaned_articles.csv"]
+
+    # Keywords are keyed by link, so the shard dicts are disjoint
+    keywords_path = os.path.join(results_dir, "document_keywords.json")
+    with open(keywords_path, "w") as out:
+        out.write("{")
+        first = True
+        for directory in directories:
+            path = os.path.join(directory, "document_keywords.json")
+            if not os.path.exists(path):
+                print(f"Warning: {path} not found; its articles have no keywords")
+                continue
+            with open(path, "r") as f:
+                for link, keywords in json.load(f).items():
+                    out.write(("" if first else ", ") + json.dumps(link) + ": " + json.dumps(keywords))
+                    first = False
+        out.write("}")
+
+    print(f"Merged {total} articles from {len(directories)} shards into {results_dir}")
+    return total
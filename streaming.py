@@ -0,0 +1,316 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+# Chunked, bounded-memory variants of the clean → tag → summarize → cluster →
+# aggregate stages. Each stage reads its input CSV in fixed-size windows and
+# appends its output to disk, so peak memory depends on the chunk size rather
+# than on the size of the archive. Outputs have the same format as the
+# in-memory stages.
+
+
+def stream_clean(raw_csv, cleaned_csv, chunk_size=1000):
+    """
+    Clean scraped articles chunk by chunk, assigning sequential Ids across chunks.
+
+    Args:
+        raw_csv (str): Path to health_articles.csv
+        cleaned_csv (str): Path of the cleaned CSV to write
+        chunk_size (int): Rows processed per chunk
+
+    Returns:
+        int: Number of cleaned articles written
+    """
+    from cleaner import clean_articles
+
+    written = 0
+    with open(cleaned_csv, "w", newline="") as out:
+        for chunk in pd.read_csv(raw_csv, chunksize=chunk_size):
+            cleaned = clean_articles(chunk)
+            if cleaned.empty:
+                continue
+            cleaned["Id"] = range(written, written + len(cleaned))
+            cleaned.to_csv(out, index=False, header=(written == 0))
+            written += len(cleaned)
+    print(f"Saved {written} cleaned articles to {cleaned_csv}")
+    return written
+
+
+def stream_summarize(cleaned_csv, summarized_csv, chunk_size=1000, compression=None):
+    """
+    Summarize cleaned articles chunk by chunk, appending to the summarized CSV.
+
+    Args:
+        cleaned_csv (str): Path to cleaned_articles.csv
+        summarized_csv (str): Path of the summarized CSV to write
+        chunk_size (int): Rows processed per chunk
+        compression (float): Share of each article's text kept by the
+            extractive pre-summary; None sends the full text
+
+    Returns:
+        int: Number of summarized articles written
+    """
+    from summarizer import summarize_article
+
+    written = 0
+    with open(summarized_csv, "w", newline="") as out:
+        for chunk in pd.read_csv(cleaned_csv, chunksize=chunk_size):
+            summarized = summarize_article(chunk, compression=compression)
+            summarized.to_csv(out, index=False, header=(written == 0))
+            written += len(summarized)
+            print(f"Summarized {written} articles so far")
+    return written
+
+
+def stream_tag(cleaned_csv, keywords_json, chunk_size=1000):
+    """
+    Tag cleaned articles chunk by chunk, writing the link → keywords JSON
+    object incrementally. The object is written to a temporary file that
+    replaces `keywords_json` only once complete, and a link repeated in a
+    later chunk keeps its first keywords, so the object has no duplicate keys.
+
+    Args:
+        cleaned_csv (str): Path to cleaned_articles.csv
+        keywords_json (str): Path of the keywords JSON to write
+        chunk_size (int): Rows processed per chunk
+
+    Returns:
+        int: Number of tagged articles written
+    """
+    from tagger import article_tagger
+
+    written = set()
+    tmp_path = keywords_json + ".tmp"
+    with open(tmp_path, "w") as out:
+        out.write("{")
+        for chunk in pd.read_csv(cleaned_csv, usecols=["Link", "Content"], chunksize=chunk_size):
+            for link, keywords in article_tagger(chunk).items():
+                if link in written:
+                    continue
+                out.write(("" if not written else ", ") + json.dumps(link) + ": " + json.dumps(keywords))
+                written.add(link)
+        out.write("}")
+    os.replace(tmp_path, keywords_json)
+    print(f"Successfully saved data to {keywords_json}")
+    return len(written)
+
+
+def stream_cluster(summarized_csv, themes_json, chunk_size=1000, batch_size=5, model_name="gpt-4",
+                   hierarchy_json=None, keywords_json=None):
+    """
+    Cluster summarized articles using compact records built from the Id, Link
+    and Summary columns only.
+
+    Args:
+        summarized_csv (str): Path to summarized_articles.csv
+        themes_json (str): Path of article_to_theme.json to write
+        chunk_size (int): Rows read per chunk
+        batch_size (int): Articles per clustering prompt
+        model_name (str): The OpenAI model to use for clustering
+        hierarchy_json (str): When given, cluster hierarchically and write the
+            domain → theme → ids hierarchy to this path
+        keywords_json (str): When given, pre-group articles by the keywords in
+            this document_keywords.json before clustering
+
+    Returns:
+        dict: Theme groups mapping themes to lists of article IDs
+    """
+    from cluster import cluster_article_records, iter_article_records
+    from utils import dump_json
+
+    articles = list(iter_article_records(summarized_csv, chunk_size))
+    document_keywords = None
+    if keywords_json:
+        from pregroup import load_keywords
+
+        document_keywords = load_keywords(keywords_json)
+    article_to_theme, hierarchy = cluster_article_records(
+        articles, batch_size=batch_size, model_name=model_name,
+        hierarchical=bool(hierarchy_json), document_keywords=document_keywords,
+    )
+    if hierarchy_json:
+        dump_json(hierarchy, hierarchy_json)
+    dump_json(article_to_theme, themes_json)
+    return article_to_theme
+
+
+def stream_aggregate(summarized_csv, themes_json, clusters_json, hierarchy_json=None, nested_clusters_json=None):
+    """
+    Rebuild cluster_results.json reading only the Id and Link columns.
+
+    Args:
+        summarized_csv (str): Path to summarized_articles.csv
+        themes_json (str): Path to article_to_theme.json
+        clusters_json (str): Path of cluster_results.json to write
+        hierarchy_json (str): Path to theme_hierarchy.json, in hierarchical mode
+        nested_clusters_json (str): Path of cluster_hierarchy.json to write, in hierarchical mode
+    """
+    from utils import create_document_to_theme_count_mapping_json
+
+    ids_and_links = pd.read_csv(summarized_csv, usecols=["Id", "Link"])
+    create_document_to_theme_count_mapping_json(ids_and_links, themes_json, clusters_json)
+    if hierarchy_json:
+        from hierarchy import create_hierarchy_mapping_json
+
+        create_hierarchy_mapping_json(ids_and_links, hierarchy_json, nested_clusters_json)
+
+
+# Memory bound of the chunked mode: the interpreter and pandas, a few copies of
+# one chunk of rows while it is parsed and cleaned, and a short cluster record
+# (Id and summary) per article, which the cluster stage needs all at once
+BASELINE_RSS_MB = 100
+CHUNK_COPIES = 4
+RECORD_BYTES = 1024
+
+
+def chunked_rss_bound_mb(n_articles, chunk_size, content_chars):
+    """
+    Peak RSS the chunked mode is allowed on an archive.
+
+    Args:
+        n_articles (int): Number of articles
+        chunk_size (int): Rows per chunk
+        content_chars (int): Approximate length of each article body
+
+    Returns:
+        float: Bound in MB
+    """
+    return BASELINE_RSS_MB + (CHUNK_COPIES * chunk_size * content_chars + RECORD_BYTES * n_articles) / 2 ** 20
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process.
+
+    Returns:
+        float: Peak RSS in MB
+    """
+    # ru_maxrss survives exec, so a benchmark worker started from a large
+    # parent would report the parent's peak; Linux's VmHWM belongs to this
+    # process image alone
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _fake_summaries(cleaned_csv, summarized_csv, chunk_size):
+    """
+    Stand-in for the LLM summarizer used by the benchmark: the summary is the
+    first 300 characters of the article.
+    """
+    written = 0
+    with open(summarized_csv, "w", newline="") as out:
+        for chunk in pd.read_csv(cleaned_csv, chunksize=chunk_size):
+            chunk["Summary"] = chunk["Content"].str.slice(0, 300)
+            chunk.to_csv(out, index=False, header=(written == 0))
+            written += len(chunk)
+
+
+def _benchmark_worker(mode, workdir, chunk_size):
+    """
+    Run the data-handling part of the pipeline (clean → summary column →
+    cluster input records) in one mode and print the peak RSS as JSON.
+    """
+    raw_csv = os.path.join(workdir, "health_articles.csv")
+    if mode == "eager":
+        from cleaner import clean_articles
+        from cluster import prepare_articles_from_df
+
+        df = pd.read_csv(raw_csv)
+        cleaned_df = clean_articles(df)
+        cleaned_df["Summary"] = cleaned_df["Content"].str.slice(0, 300)
+        summarized_df = cleaned_df.copy()
+        articles, article_by_id = prepare_articles_from_df(summarized_df)
+        count = len(articles)
+    else:
+        from cluster import iter_article_records
+
+        cleaned_csv = os.path.join(workdir, "cleaned_articles.csv")
+        summarized_csv = os.path.join(workdir, "summarized_articles.csv")
+        stream_clean(raw_csv, cleaned_csv, chunk_size)
+        _fake_summaries(cleaned_csv, summarized_csv, chunk_size)
+        articles = list(iter_article_records(summarized_csv, chunk_size))
+        count = len(articles)
+    print(json.dumps({"mode": mode, "articles": count, "peak_rss_mb": round(peak_rss_mb(), 1)}))
+
+
+def _measure_peak_rss(mode, n_articles, chunk_size, content_chars):
+    """
+    Write a synthetic archive and run one mode on it in a fresh subprocess, so
+    every peak is measured independently.
+
+    Returns:
+        dict: Mode, article count and peak RSS in MB
+    """
+    sentence = "Regular exercise and a balanced diet support healthy aging in older adults. "
+    body = (sentence * (content_chars // len(sentence) + 1))[:content_chars]
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "health_articles.csv"), "w", newline="") as f:
+            f.write("Link,Content\n")
+            for i in range(n_articles):
+                f.write(f"https://www.aarp.org/health/article-{i}/,\"{i} {body}\"\n")
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        output = subprocess.run(
+            [sys.executable, "-c",
+             f"import streaming; streaming._benchmark_worker({mode!r}, {workdir!r}, {chunk_size})"],
+            cwd=script_dir, capture_output=True, text=True, check=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark_peak_rss(n_articles=20000, chunk_size=1000, content_chars=6000):
+    """
+    Compare the peak memory of the in-memory and chunked data paths on a
+    synthetic archive, and check the chunked mode against its bound.
+
+    The chunked mode also runs on an archive a quarter of the size. Between
+    the two sizes its peak may only grow by the per-article cluster records;
+    growing faster means rows are being held beyond their chunk.
+
+    Args:
+        n_articles (int): Number of synthetic articles
+        chunk_size (int): Rows per chunk in chunked mode
+        content_chars (int): Approximate length of each article body
+
+    Returns:
+        list: One result dict per mode with the peak RSS in MB; the chunked
+            result also holds "bound_mb", "growth_kb_per_article" and "ok"
+    """
+    results = [_measure_peak_rss(mode, n_articles, chunk_size, content_chars) for mode in ("eager", "chunked")]
+    chunked = results[1]
+    chunked["bound_mb"] = round(chunked_rss_bound_mb(n_articles, chunk_size, content_chars), 1)
+    within_bound = chunked["peak_rss_mb"] <= chunked["bound_mb"]
+
+    smaller = max(chunk_size, n_articles // 4)
+    growing = False
+    if smaller < n_articles:
+        small = _measure_peak_rss("chunked", smaller, chunk_size, content_chars)
+        growth = (chunked["peak_rss_mb"] - small["peak_rss_mb"]) * 2 ** 20 / (n_articles - smaller)
+        chunked["growth_kb_per_article"] = round(growth / 1024, 2)
+        growing = growth > RECORD_BYTES
+    chunked["ok"] = within_bound and not growing
+
+    print(f"{'mode':<10}{'articles':>10}{'peak RSS (MB)':>16}")
+    for result in results:
+        print(f"{result['mode']:<10}{result['articles']:>10}{result['peak_rss_mb']:>16}")
+    print(f"Chunked bound for {chunk_size}-row chunks: {chunked['bound_mb']} MB "
+          f"({'within' if within_bound else 'EXCEEDED'})")
+    if "growth_kb_per_article" in chunked:
+        print(f"Chunked growth from {smaller} to {n_articles} articles: {chunked['growth_kb_per_article']} KB/article "
+              f"({'grows with the archive' if growing else f'within {RECORD_BYTES / 1024:g} KB/article'})")
+    return results
@@ -0,0 +1,163 @@
+import json
+import re
+
+# Local parsing and repair of JSON replies from the LLMs. Common defects
+# (markdown fences, prose around the object, smart quotes, trailing commas,
+# Python literals, comments, a truncated tail) are fixed without another LLM
+# call.
+
+SMART_QUOTES = {"“": '"', "”": '"', "‘": "'", "’": "'"}
+# A double-quoted string literal, possibly cut off at the end of the text
+STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"?', re.DOTALL)
+
+
+def extract_json(text):
+    """
+    Cut the JSON object out of a reply that may wrap it in markdown fences or prose.
+
+    Args:
+        text (str): Raw reply text
+
+    Returns:
+        str: The first JSON object, from its "{" to the matching "}" (or to
+            the end when the reply was truncated)
+    """
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced and "{" in fenced.group(1):
+        text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object in the reply")
+    end = _object_end(text, start)
+    return text[start:end] if end is not None else text[start:]
+
+
+def _object_end(text, start):
+    """
+    Position just after the bracket closing the object that opens at `start`,
+    or None when it is never closed. Brackets inside strings are ignored.
+    """
+    depth = 0
+    in_string = escaped = False
+    for position in range(start, len(text)):
+        char = text[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return position + 1
+    return None
+
+
+def _sub_outside_strings(pattern, replacement, text):
+    """
+    re.sub applied only to the parts of the text outside double-quoted
+    strings, so that e.g. a theme name containing ", Word:" is left alone.
+    """
+    parts = []
+    position = 0
+    for literal in STRING_LITERAL.finditer(text):
+        parts.append(re.sub(pattern, replacement, text[position:literal.start()]))
+        parts.append(literal.group())
+        position = literal.end()
+    parts.append(re.sub(pattern, replacement, text[position:]))
+    return "".join(parts)
+
+
+def _close_brackets(text):
+    """
+    Drop a cut-off string and close the arrays and objects left open by a
+    truncated reply.
+    """
+    stack = []
+    in_string = escaped = False
+    string_start = 0
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            string_start = position
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        # A cut-off string would turn into a wrong value, so drop it
+        text = text[:string_start]
+    # A dangling key or comma cannot be completed, so drop it as well
+    text = re.sub(r'(,|(?<=[{\[]))\s*("[^"]*"\s*:?\s*)?$', "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text):
+    """
+    Fix common defects in LLM-written JSON.
+
+    Args:
+        text (str): JSON-like text
+
+    Returns:
+        str: Repaired text (not guaranteed to parse)
+    """
+    for smart, plain in SMART_QUOTES.items():
+        text = text.replace(smart, plain)
+    # Line comments outside strings, e.g. `"3": "Sleep", // unsure`
+    text = re.sub(r'(?m)^((?:[^"\n]*"[^"\n]*")*[^"\n]*?)\s*//.*$', r"\1", text)
+    # Single-quoted keys and values when the reply uses no double quotes at all
+    if '"' not in text:
+        text = text.replace("'", '"')
+    text = _sub_outside_strings(r"\bNone\b", "null", text)
+    text = _sub_outside_strings(r"\bTrue\b", "true", text)
+    text = _sub_outside_strings(r"\bFalse\b", "false", text)
+    # Unquoted keys such as {doc_to_theme: ...} or {12: "Sleep"}
+    text = _sub_outside_strings(r'([{,]\s*)([A-Za-z_0-9]+)(\s*:)', r'\1"\2"\3', text)
+    text = _close_brackets(text)
+    # Trailing commas before a closing bracket
+    text = _sub_outside_strings(r",\s*([}\]])", r"\1", text)
+    # Missing commas between values on separate lines
+    text = re.sub(r'(["\d\]}])(\s*\n\s*)(")', r"\1,\2\3", text)
+    return text
+
+
+def parse_json_object(text):
+    """
+    Parse a JSON object from an LLM reply, repairing it locally if needed.
+
+    Args:
+        text (str): Raw reply text
+
+    Returns:
+        dict: Parsed object
+
+    Raises:
+        ValueError: If the reply cannot be parsed even after repair
+    """
+    # raw_decode stops after the first value, ignoring whatever follows it
+    decoder = json.JSONDecoder()
+    candidate = extract_json(text)
+    try:
+        data, _ = decoder.raw_decode(candidate)
+    except json.JSONDecodeError:
+        try:
+            data, _ = decoder.raw_decode(repair_json(candidate).strip())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Unparseable JSON after repair: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Reply is not a JSON object")
+    return data
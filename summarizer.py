@@ -1,68 +1,68 @@
-from groq import Groq
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-import time
-from utils import load_env_variables
+from llm_router import SUMMARY_ENDPOINTS, get_router
 
-def summarize(content):
+def build_summary_messages(content):
     """
-    Generate a concise summary of health article content using the Groq API.
+    Build the chat messages asking the LLM to summarize one article.
     
     Args:
         content (str): The article content to summarize
         
     Returns:
-        str: A 3-4 sentence summary of the article
+        list: Chat messages as {"role", "content"} dicts
     """
-    try:
-        env_vars = load_env_variables()
+    return [
+        {
+            "role": "system",
+            "content": (
+                # "You are an expert medical journalist. "
+                # "Your job is to capture the essence of a health article by naming its main topic, "
+                # "summarizing the most important facts or insights, and noting any unique perspective. "
+                # "Write in 3–4 clear sentences."
+                "You are an expert medical journalist. "
+                "Your job is to capture the essence of a health article by naming its main topic, "
+                "summarizing the most important facts or insights, and noting any unique perspective. "
+                "Write in 3–4 clear sentences. "
+                "IMPORTANT: Start directly with the content. Do NOT begin with phrases like "
+                "'Here is a summary', 'The article discusses', or 'This article explores'. "
+                "Jump straight into the medical content."
+            )
+        },
+        {
+            "role": "user", 
+            "content": (
+                # "Summarize the following article content, focusing on:\n"
+                # "1) The central theme or question it addresses.\n"
+                # "2) The key findings or recommendations.\n"
+                # "3) Any novel or surprising insight.\n\n"
+                # f"{content}"
+                "Summarize the following article content, focusing on:\n"
+                "1) The central theme or question it addresses.\n"
+                "2) The key findings or recommendations.\n"
+                "3) Any novel or surprising insight.\n\n"
+                "Remember: Start directly with the medical content, no introductory phrases.\n\n"
+                f"{content}"
+            )
+        }
+    ]
 
-        # Check if API key is available
-        if not env_vars.get("groq_api_key"):
-            print("Error: Groq API key not found. Check your environment variables.")
-            return "Error: API key missing"
 
-        client = Groq(api_key=env_vars["groq_api_key"])
-        
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",  
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        # "You are an expert medical journalist. "
-                        # "Your job is to capture the essence of a health article by naming its main topic, "
-                        # "summarizing the most important facts or insights, and noting any unique perspective. "
-                        # "Write in 3–4 clear sentences."
-                        "You are an expert medical journalist. "
-                        "Your job is to capture the essence of a health article by naming its main topic, "
-                        "summarizing the most important facts or insights, and noting any unique perspective. "
-                        "Write in 3–4 clear sentences. "
-                        "IMPORTANT: Start directly with the content. Do NOT begin with phrases like "
-                        "'Here is a summary', 'The article discusses', or 'This article explores'. "
-                        "Jump straight into the medical content."
-                    )
-                },
-                {
-                    "role": "user", 
-                    "content": (
-                        # "Summarize the following article content, focusing on:\n"
-                        # "1) The central theme or question it addresses.\n"
-                        # "2) The key findings or recommendations.\n"
-                        # "3) Any novel or surprising insight.\n\n"
-                        # f"{content}"
-                        "Summarize the following article content, focusing on:\n"
-                        "1) The central theme or question it addresses.\n"
-                        "2) The key findings or recommendations.\n"
-                        "3) Any novel or surprising insight.\n\n"
-                        "Remember: Start directly with the medical content, no introductory phrases.\n\n"
-                        f"{content}"
-                    )
-                }
-            ],
-            temperature=0.2
-        )
+def summarize(content):
+    """
+    Generate a concise summary of health article content, routed to the
+    fastest healthy summarization backend (Groq by default).
+    
+    Args:
+        content (str): The article content to summarize
         
-        return completion.choices[0].message.content.strip()
+    Returns:
+        str: A 3-4 sentence summary of the article
+    """
+    try:
+        router = get_router("summarize", SUMMARY_ENDPOINTS)
+        completion = router.complete(build_summary_messages(content), temperature=0.2)
+        return completion.content
     
     except Exception as e:
 
@@ -70,53 +70,66 @@ def summarize(content):
         return f"Error summarizing content: {str(e)[:100]}"
 
 
-def summarize_article_with_rate_limits(dataframe):
+def summarize_article_with_rate_limits(dataframe, max_workers=None, compression=None):
     """
-    Summarize articles with Groq rate limit handling
+    Summarize articles with Groq rate limit handling.
+
+    Requests run concurrently within the summarization backends' rate budgets
+    (see ratelimit.py and llm_router.py); each summary is written back to its
+    own row, so the result does not depend on completion order.
     
     Args:
         dataframe (DataFrame): DataFrame containing articles to summarize
+        max_workers (int): Concurrent requests; defaults to the backends' concurrency budget
+        compression (float): If set, send only the most salient sentences making
+            up this share of each article (see extractive.py)
         
     Returns:
         DataFrame: DataFrame with added 'Summary' column
     """
-    processed_count = 0
-    for index, row in tqdm(dataframe.iterrows(), total=len(dataframe), desc="Processing articles"):
-        try:
+    router = get_router("summarize", SUMMARY_ENDPOINTS)
+    rows = list(dataframe.iterrows())
+    contents = dataframe['Content'].tolist()
+    if compression:
+        from extractive import compress_articles
 
-            content = row['Content']
-            summary = summarize(content)
-            dataframe.at[index, 'Summary'] = summary
-            
-            processed_count += 1
-         
-            # Rate limit handling
-            if processed_count % 25 == 0:
-                print(f"\nProcessed {processed_count}/{len(dataframe)} articles")
-                print("Taking 60-second break to respect rate limits...")
-                time.sleep(60)  
-            else:
-                time.sleep(2) 
-                
+        compressed = compress_articles(contents, ratio=compression)
+        kept = sum(len(c) for c in compressed) / max(1, sum(len(c) for c in contents if isinstance(c, str)))
+        print(f"Extractive pre-summaries keep {kept:.0%} of the article text")
+        contents = compressed
+
+    def summarize_row(position):
+        index, row = rows[position]
+        try:
+            content = contents[position]
+            return summarize(content)
         except Exception as e:
             raise Exception(f"Error processing article {index}: {e}")
 
-    
-    print(f"\nCompleted! Processed {processed_count} articles")
+    summaries = [None] * len(rows)
+    with ThreadPoolExecutor(max_workers=max_workers or router.max_concurrency) as executor:
+        futures = {executor.submit(summarize_row, position): position for position in range(len(rows))}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing articles"):
+            summaries[futures[future]] = future.result()
+
+    dataframe['Summary'] = summaries
+    print(f"\nCompleted! Processed {len(summaries)} articles")
     return dataframe
 
-def summarize_article(dataframe):
+def summarize_article(dataframe, compression=None):
     """
     Main function - wrapper for backwards compatibility
     
     Args:
         dataframe (DataFrame): DataFrame containing articles to summarize
+        compression (float): Share of each article's text kept by the
+            extractive pre-summary; None sends the full text
         
     Returns:
         DataFrame: DataFrame with added 'Summary' column
     """
     try:
-        return summarize_article_with_rate_limits(dataframe)
+        return summarize_article_with_rate_limits(dataframe, compression=compression)
     except Exception as e:
         raise Exception(f"Error in summarize_article: {e}")
 
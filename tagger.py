@@ -1,11 +1,53 @@
-from groq import Groq
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from utils import load_env_variables
+from llm_router import TAG_ENDPOINTS, get_router
+
+def build_tag_messages(content):
+    """
+    Build the chat messages asking the LLM for an article's keywords.
+    
+    Args:
+        content (str): The article content to analyze
+        
+    Returns:
+        list: Chat messages as {"role", "content"} dicts
+    """
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are an expert medical content analyst. "
+                "Identify the 5 most important keywords that represent "
+                "the main topics of a health article. "
+                "Provide ONLY the 5 keywords separated by commas, no additional text."
+            )
+        },
+        {
+            "role": "user", 
+            "content": f"Extract exactly 5 keywords from this health article:\n\n{content}"
+        }
+    ]
+
+
+def parse_keywords(keywords_text):
+    """
+    Split the LLM's comma-separated reply into at most 5 keywords.
+    
+    Args:
+        keywords_text (str): Raw reply text
+        
+    Returns:
+        list: Keywords
+    """
+    keywords = [k.strip() for k in keywords_text.strip().split(',')]
+    # Ensure exactly 5 keywords are returned
+    return keywords[:5]
+
 
 def tag(content):
     """
-    Extract 5 important keywords from health article content using the Groq API.
+    Extract 5 important keywords from health article content, routed to the
+    fastest healthy tagging backend (Groq by default).
     
     Args:
         content (str): The article content to analyze
@@ -14,40 +56,9 @@ def tag(content):
         list: List of 5 keywords representing the main topics of the article
     """
     try:
-        env_vars = load_env_variables()
-        # Check if API key is available
-        if not env_vars["groq_api_key"]:
-            print("Error: Groq API key not found. Check your environment variables.")
-            return ["API key missing"]
-        
-        client = Groq(api_key=env_vars["groq_api_key"])
-        
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert medical content analyst. "
-                        "Identify the 5 most important keywords that represent "
-                        "the main topics of a health article. "
-                        "Provide ONLY the 5 keywords separated by commas, no additional text."
-                    )
-                },
-                {
-                    "role": "user", 
-                    "content": f"Extract exactly 5 keywords from this health article:\n\n{content}"
-                }
-            ],
-            temperature=0.1
-        )
-        
-        keywords_text = completion.choices[0].message.content.strip()
-        keywords = [k.strip() for k in keywords_text.split(',')]
-        # Ensure exactly 5 keywords are returned
-        keywords = keywords[:5]
-        
-        return keywords
+        router = get_router("tag", TAG_ENDPOINTS)
+        completion = router.complete(build_tag_messages(content), temperature=0.1)
+        return parse_keywords(completion.content)
     
     except Exception as e:
         print(f"Error in tag function: {e}")
@@ -55,42 +66,49 @@ def tag(content):
     
         
 
-def article_tagger(df):
+def article_tagger(df, max_workers=None):
     """
     Process all articles in the DataFrame to extract keywords.
+
+    Requests run concurrently within the tagging backends' rate budgets (see
+    ratelimit.py and llm_router.py); the returned mapping follows the
+    DataFrame's row order regardless of completion order.
     
     Args:
         df (DataFrame): DataFrame containing article content
+        max_workers (int): Concurrent requests; defaults to the backends' concurrency budget
         
     Returns:
         dict: Mapping of article links to their extracted keywords
     """
+    router = get_router("tag", TAG_ENDPOINTS)
+    rows = list(df.iterrows())
 
-    document_to_tags = {}
-    
-    for index, row in tqdm(df.iterrows(), total=len(df)):
+    def tag_row(position):
+        index, row = rows[position]
         try:
              # Skip articles with missing content
             if not isinstance(row.get('Content'), str) or row.get('Content', '').strip() == '':
                 print(f"Skipping article {index}: Missing or empty content")
-                document_to_tags[row.get('Link', f"unknown_{index}")] = []
-                continue
+                return row.get('Link', f"unknown_{index}"), []
 
             # Extract content and link
             content = row['Content']
             keywords = tag(content)
-            document_to_tags[row['Link']] = keywords
-
-            # Rate limiting
-            if (index + 1) % 25 == 0:
-                print(f"Processed {index + 1} articles. Taking a 60-second break to respect rate limits...")
-                time.sleep(60)
-            else:
-                time.sleep(2)
+            return row['Link'], keywords
                 
         except Exception as e:
             print(f"Error processing article {index}: {e}")
             raise Exception(f"Error processing article {index}: {e}")
-    
-    return document_to_tags
 
+    results = [None] * len(rows)
+    with ThreadPoolExecutor(max_workers=max_workers or router.max_concurrency) as executor:
+        futures = {executor.submit(tag_row, position): position for position in range(len(rows))}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Tagging articles"):
+            results[futures[future]] = future.result()
+
+    # Merge in row order so the output does not depend on completion order
+    document_to_tags = {}
+    for link, keywords in results:
+        document_to_tags[link] = keywords
+    return document_to_tags
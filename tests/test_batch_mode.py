@@ -0,0 +1,105 @@
+import json
+import re
+from argparse import Namespace
+
+import pandas as pd
+
+import batch_mode
+import main
+from batch_mode import LocalBatchBackend
+
+ARTICLES = pd.DataFrame({
+    "Id": [0, 1, 2, 3],
+    "Link": [f"https://x.org/health/{i}/" for i in range(4)],
+    "Content": ["Article zero on sleep.", "Article one on eyes.", "Article two on sleep.", "Article three on eyes."],
+})
+
+
+class CannedResponder:
+    """
+    Answers summarize and theme-mapping requests, failing each request in
+    `fail_once` the first time it is seen.
+    """
+
+    def __init__(self, fail_once=()):
+        self.fail_once = set(fail_once)
+        self.seen = []
+
+    def __call__(self, body):
+        prompt = body["messages"][-1]["content"]
+        if "new_articles:" in prompt:
+            real_input = prompt.rsplit("existing_themes:", 1)[1]
+            ids = re.findall(r'"article_id": "(\d+)"', real_input)
+            key = "themes:" + ",".join(ids)
+            reply = json.dumps({"doc_to_theme": {i: "Sleep" if int(i) % 2 == 0 else "Eye Health" for i in ids}})
+        else:
+            key = re.search(r"Article (\w+) on", prompt).group(0)
+            reply = f"Summary of {key.lower()}."
+        self.seen.append(key)
+        if key in self.fail_once:
+            self.fail_once.discard(key)
+            raise RuntimeError(f"{key} failed")
+        return reply
+
+
+def use_responder(monkeypatch, responder):
+    monkeypatch.setattr(batch_mode, "LocalBatchBackend",
+                        lambda directory: LocalBatchBackend(directory, responder))
+
+
+def batch_args(action, kind, wait=True):
+    return Namespace(action=action, kind=kind, backend="local", wait=wait, poll_interval=0,
+                     batch_size=None, model_name="gpt-4")
+
+
+def test_request_lines_use_the_chat_completions_format():
+    line = batch_mode.request_line("themes-0", "gpt-4o", [{"role": "user", "content": "hi"}], 0.1, json_mode=True)
+    assert line == {
+        "custom_id": "themes-0", "method": "POST", "url": "/v1/chat/completions",
+        "body": {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.1,
+                 "response_format": {"type": "json_object"}},
+    }
+
+    lines = batch_mode.build_requests("themes", ARTICLES.assign(Summary=ARTICLES["Content"]), batch_size=3)
+    assert [line["custom_id"] for line in lines] == ["themes-0", "themes-1"]
+
+
+def test_summaries_are_retried_and_ingested(tmp_path, monkeypatch):
+    responder = CannedResponder(fail_once={"Article two on"})
+    use_responder(monkeypatch, responder)
+    ARTICLES.to_csv(tmp_path / "cleaned_articles.csv", index=False)
+
+    assert main.batch_command(batch_args("submit", "summarize"), str(tmp_path))
+    assert main.batch_command(batch_args("collect", "summarize"), str(tmp_path))
+
+    # Only the failed request was sent again
+    assert responder.seen.count("Article two on") == 2
+    assert len(responder.seen) == 5
+    summaries = pd.read_csv(tmp_path / "summarized_articles.csv")
+    assert list(summaries["Summary"]) == [f"Summary of article {n} on." for n in ("zero", "one", "two", "three")]
+
+
+def test_themes_are_retried_on_the_next_collect_and_kept(tmp_path, monkeypatch):
+    use_responder(monkeypatch, CannedResponder(fail_once={"themes:2,3"}))
+    ARTICLES.assign(Summary=ARTICLES["Content"]).to_csv(tmp_path / "summarized_articles.csv", index=False)
+    args = batch_args("submit", "themes")
+    args.batch_size = 2
+
+    assert main.batch_command(args, str(tmp_path))
+    # Without --wait, collect resubmits the failed batch and stops
+    assert main.batch_command(batch_args("collect", "themes", wait=False), str(tmp_path))
+    assert not (tmp_path / "article_to_theme.json").exists()
+    assert main.batch_command(batch_args("collect", "themes", wait=False), str(tmp_path))
+
+    with open(tmp_path / "article_to_theme.json") as f:
+        assert json.load(f) == {"Sleep": ["0", "2"], "Eye Health": ["1", "3"]}
+    assert (tmp_path / "cluster_results.json").exists()
+
+    # The collected themes are up to date for `run` ...
+    assert main.build_pipeline(results_dir=str(tmp_path)).plan(only=["cluster", "aggregate"]) == []
+
+    # ... and seed the next theme batch
+    assert main.batch_command(args, str(tmp_path))
+    with open(tmp_path / "batch" / "themes_requests.jsonl") as f:
+        prompt = json.loads(f.readline())["body"]["messages"][0]["content"]
+    assert json.loads(prompt.rsplit("existing_themes:", 1)[1].split("new_articles:")[0]) == ["Eye Health", "Sleep"]
@@ -0,0 +1,56 @@
+import json
+import math
+
+import pytest
+
+from cluster_benchmark import (
+    adjusted_rand_index,
+    freeze_reference,
+    normalized_mutual_info,
+    score_mapping,
+    stability,
+)
+
+# Reference [0 0 0 1 1 1] against prediction [0 0 1 1 2 2]
+REFERENCE = {"A": ["1", "2", "3"], "B": ["4", "5", "6"]}
+PREDICTED = {"x": ["1", "2"], "y": ["3", "4"], "z": ["5", "6"]}
+
+
+def labels(groups):
+    return {i: theme for theme, ids in groups.items() for i in ids}
+
+
+def test_known_partition_pair():
+    reference, predicted = labels(REFERENCE), labels(PREDICTED)
+    # Index 2, expected 6 * 3 / 15, maximum 4.5
+    assert adjusted_rand_index(reference, predicted) == pytest.approx(8 / 33)
+    # MI = 2/3 ln 2 over the mean of the entropies ln 2 and ln 3
+    assert normalized_mutual_info(reference, predicted) == pytest.approx(
+        (2 / 3) * math.log(2) / ((math.log(2) + math.log(3)) / 2))
+
+
+def test_relabelled_partition_scores_one():
+    renamed = {"Other name": REFERENCE["B"], "Another": REFERENCE["A"]}
+    scores = score_mapping(renamed, REFERENCE)
+    assert scores["ari"] == pytest.approx(1.0)
+    assert scores["nmi"] == pytest.approx(1.0)
+    assert scores["coverage"] == 1.0
+    assert stability([REFERENCE, renamed]) == pytest.approx(1.0)
+
+
+def test_unassigned_articles_lower_coverage_only():
+    partial = {"A": ["1", "2", "3"], "B": ["4"]}
+    scores = score_mapping(partial, REFERENCE)
+    assert scores["coverage"] == pytest.approx(4 / 6)
+    assert scores["singleton_ratio"] == 0.5
+    assert scores["ari"] == pytest.approx(1.0)
+
+
+def test_reference_is_frozen_once(tmp_path):
+    source, reference = tmp_path / "article_to_theme.json", tmp_path / "benchmarks" / "reference.json"
+    source.write_text(json.dumps(REFERENCE))
+    freeze_reference(str(reference), str(source))
+
+    source.write_text(json.dumps(PREDICTED))
+    freeze_reference(str(reference), str(source))
+    assert json.loads(reference.read_text()) == REFERENCE
@@ -0,0 +1,42 @@
+import crawl_scheduler
+
+BASE = "https://www.aarp.org/health/"
+ARTICLE = "https://www.aarp.org/health/conditions/walking-lowers-blood-pressure/"
+
+
+class FakeResponse:
+    def __init__(self, content, cache_status):
+        self.content = content
+        self.cache_status = cache_status
+
+    def raise_for_status(self):
+        pass
+
+
+def crawl(monkeypatch, tmp_path, cache_status, now):
+    pages = {
+        BASE: f'<a href="{ARTICLE}">Walking</a>'.encode(),
+        ARTICLE: b'<div class="articlecontentfragment">Walking helps.</div>',
+    }
+    monkeypatch.setattr(crawl_scheduler, "fetch", lambda url: FakeResponse(pages[url], cache_status))
+    monkeypatch.setattr(crawl_scheduler.time, "time", lambda: now)
+    crawl_scheduler.adaptive_crawl(BASE, output_file=str(tmp_path / "links.txt"),
+                                   state_file=str(tmp_path / "crawl_state.json"), min_score=0.0)
+    return crawl_scheduler.load_crawl_state(str(tmp_path / "crawl_state.json"))[ARTICLE]
+
+
+def test_cache_hits_do_not_count_as_visits(monkeypatch, tmp_path):
+    first = crawl(monkeypatch, tmp_path, "miss", now=1000.0)
+    assert first["visits"] == 1
+
+    cached = crawl(monkeypatch, tmp_path, "hit", now=1000.0 + 3 * crawl_scheduler.DAY)
+    assert cached["visits"] == 1
+    assert cached["last_visit"] == first["last_visit"]
+
+
+def test_revalidations_count_as_unchanged_visits(monkeypatch, tmp_path):
+    crawl(monkeypatch, tmp_path, "miss", now=1000.0)
+    revalidated = crawl(monkeypatch, tmp_path, "revalidated", now=1000.0 + 3 * crawl_scheduler.DAY)
+    assert revalidated["visits"] == 2
+    assert revalidated["changes"] == 0
+    assert revalidated["last_visit"] == 1000.0 + 3 * crawl_scheduler.DAY
@@ -0,0 +1,49 @@
+import random
+
+from extractive import compress_articles, split_sentences
+
+WORDS = ["blood", "pressure", "heart", "sleep", "walking", "vitamin", "doctor", "memory", "diet", "exercise",
+         "study", "risk", "older", "adults", "daily", "habits", "muscle", "balance", "hearing", "vision"]
+
+
+def article(seed, sentences=20):
+    rng = random.Random(seed)
+    return " ".join(
+        " ".join(rng.choices(WORDS, k=rng.randint(6, 14))).capitalize() + "." for _ in range(sentences)
+    )
+
+
+def test_kept_text_follows_the_ratio_budget():
+    texts = [article(seed) for seed in range(5)]
+    for ratio in (0.2, 0.5):
+        for text, compressed in zip(texts, compress_articles(texts, ratio=ratio, min_sentences=1)):
+            longest = max(len(sentence) + 1 for sentence in split_sentences(text))
+            # The sentence that crosses the budget is kept too
+            assert ratio * len(text) <= len(compressed) + 1 <= ratio * len(text) + longest
+
+
+def test_sentences_keep_their_original_order():
+    text = article(7)
+    sentences = split_sentences(text)
+    kept = split_sentences(compress_articles([text], ratio=0.4)[0])
+    positions = [sentences.index(sentence) for sentence in kept]
+    assert positions == sorted(positions)
+    assert len(kept) < len(sentences)
+
+
+def test_short_articles_keep_min_sentences():
+    text = article(3, sentences=6)
+    kept = split_sentences(compress_articles([text], ratio=0.01, min_sentences=3)[0])
+    assert len(kept) == 3
+    # An article with fewer sentences than the floor is kept whole
+    short = article(4, sentences=2)
+    assert compress_articles([short], ratio=0.01, min_sentences=3) == [short]
+
+
+def test_non_text_rows_pass_through_in_place():
+    texts = [article(1), None, float("nan"), article(2)]
+    compressed = compress_articles(texts, ratio=0.3)
+    assert len(compressed) == 4
+    assert compressed[1] == compressed[2] == ""
+    assert compressed[0] == compress_articles([texts[0], texts[3]], ratio=0.3)[0]
+    assert compress_articles([None]) == [""]
@@ -0,0 +1,67 @@
+import json
+import re
+
+import pandas as pd
+
+from cluster import Article
+from hierarchy import OTHER_DOMAIN, assign_domains, cluster_hierarchical, create_hierarchy_mapping_json
+from llm_router import Router, StubBackend, set_router
+
+ARTICLES = [Article(article_id=str(i), summary=f"Summary {i}.", url=f"https://x.org/{i}") for i in range(6)]
+
+
+def article_ids(prompt, marker):
+    return re.findall(r'"article_id": "(\d+)"', prompt.rsplit(marker, 1)[1])
+
+
+def domain_reply(messages):
+    # 0-2 are about sleep, 3 gets an unknown domain name and 4-5 are left out
+    ids = article_ids(messages[-1]["content"], "articles:")
+    domains = {"0": "Sleep", "1": "Sleep", "2": "Sleep", "3": "Gardening"}
+    return "Sure! " + json.dumps({"doc_to_domain": {i: domains[i] for i in ids if i in domains}})
+
+
+def theme_reply(messages):
+    ids = article_ids(messages[-1]["content"], "new_articles:")
+    return json.dumps({"doc_to_theme": {i: "Insomnia" if int(i) < 3 else "General Health" for i in ids}})
+
+
+def use_stubs(name):
+    set_router("domains", Router([StubBackend(f"stub-domains-{name}", responder=domain_reply)], hedge=False))
+    set_router("cluster", Router([StubBackend(f"stub-themes-{name}", responder=theme_reply)], hedge=False))
+
+
+def remove_stubs():
+    set_router("domains", None)
+    set_router("cluster", None)
+
+
+def test_unknown_and_missing_domains_fall_back_to_other():
+    use_stubs("assign")
+    try:
+        article_to_domain = assign_domains(ARTICLES, batch_size=4)
+    finally:
+        remove_stubs()
+    assert article_to_domain == {"0": "Sleep", "1": "Sleep", "2": "Sleep",
+                                 "3": OTHER_DOMAIN, "4": OTHER_DOMAIN, "5": OTHER_DOMAIN}
+
+
+def test_themes_are_found_within_each_domain(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    use_stubs("cluster")
+    try:
+        theme_groups, hierarchy = cluster_hierarchical(None, batch_size=2, articles=ARTICLES, max_workers=2)
+    finally:
+        remove_stubs()
+
+    assert hierarchy == {"Sleep": {"Insomnia": ["0", "1", "2"]},
+                         OTHER_DOMAIN: {"General Health": ["3", "4", "5"]}}
+    assert theme_groups == {"Insomnia": ["0", "1", "2"], "General Health": ["3", "4", "5"]}
+
+    hierarchy_json = tmp_path / "theme_hierarchy.json"
+    hierarchy_json.write_text(json.dumps(hierarchy))
+    df = pd.DataFrame({"Id": range(6), "Link": [a.url for a in ARTICLES]})
+    create_hierarchy_mapping_json(df, str(hierarchy_json), str(tmp_path / "cluster_hierarchy.json"))
+    with open(tmp_path / "cluster_hierarchy.json") as f:
+        nested = json.load(f)
+    assert nested["Sleep"] == {"count": 3, "themes": {"Insomnia": {"links": [a.url for a in ARTICLES[:3]], "count": 3}}}
@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_cache import HttpCache, freshness_lifetime
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Path → (ETag of the current version, extra headers); requests are recorded
+    pages = {}
+    requests = []
+
+    def do_GET(self):
+        etag, extra = self.pages[self.path]
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        status = 304 if self.headers.get("If-None-Match") else 200
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "max-age=0")
+        for name, value in extra.items():
+            self.send_header(name, value)
+        body = b"" if status == 304 else b"<html>page</html>"
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.pages, Handler.requests = {}, []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_304_refreshes_the_stored_validators(server, tmp_path):
+    Handler.pages["/page"] = ('"v1"', {})
+    HttpCache(str(tmp_path)).get(server + "/page")
+
+    # A new process revalidates; the server sends a new ETag with its 304
+    Handler.pages["/page"] = ('"v2"', {})
+    response = HttpCache(str(tmp_path)).get(server + "/page")
+    assert response.cache_status == "revalidated"
+    assert response.content == b"<html>page</html>"
+
+    HttpCache(str(tmp_path)).get(server + "/page")
+    assert [etag for _, etag in Handler.requests] == [None, '"v1"', '"v2"']
+
+
+def test_responses_varying_on_request_headers_are_not_stored(server, tmp_path):
+    Handler.pages["/varies"] = ('"v1"', {"Vary": "Cookie"})
+    Handler.pages["/encoded"] = ('"v1"', {"Vary": "Accept-Encoding"})
+    cache = HttpCache(str(tmp_path))
+    cache.get(server + "/varies")
+    cache.get(server + "/encoded")
+
+    cache = HttpCache(str(tmp_path))
+    assert cache.get(server + "/varies").cache_status == "miss"
+    assert cache.get(server + "/encoded").cache_status == "revalidated"
+
+
+def test_stats_count_every_request_across_threads(server, tmp_path):
+    Handler.pages["/page"] = ('"v1"', {})
+    cache = HttpCache(str(tmp_path))
+    # Fetched once; the process then serves the page from disk
+    cache.get(server + "/page")
+
+    threads = [threading.Thread(target=lambda: [cache.get(server + "/page") for _ in range(50)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats == {"hit": 400, "revalidated": 0, "miss": 1}
+
+
+def test_age_counts_against_max_age():
+    assert freshness_lifetime({"Cache-Control": "max-age=600", "Age": "450"}) == (150, True)
+    assert freshness_lifetime({"Cache-Control": "max-age=600", "Age": "900"}) == (0, True)
+    assert freshness_lifetime({"Cache-Control": "max-age=600", "Age": "bogus"}) == (600, True)
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from llm_router import Router, StubBackend, get_router
+
+MESSAGES = [{"role": "user", "content": "Summarize this article."}]
+
+
+def stub(name, **options):
+    # Each test uses its own model names, so the shared rate limiters and
+    # their request windows are not shared between tests
+    return StubBackend(f"stub-{name}", **options)
+
+
+def test_fails_over_on_error():
+    primary, secondary = stub("error-a", fail_first=1), stub("error-b")
+    router = Router([primary, secondary], hedge=False)
+
+    completion = router.complete(MESSAGES)
+
+    assert completion.backend == secondary.name
+    assert primary.stats.errors == 1
+    # An ordinary error does not take the backend out of rotation
+    assert primary.is_healthy()
+
+
+def test_rate_limit_error_puts_backend_in_cooldown():
+    primary, secondary = stub("429-a", fail_first=1, fail_status=429), stub("429-b")
+    router = Router([primary, secondary], hedge=False)
+
+    assert router.complete(MESSAGES).backend == secondary.name
+    assert not primary.is_healthy()
+
+    # While cooling down, the primary gets no requests
+    for _ in range(3):
+        assert router.complete(MESSAGES).backend == secondary.name
+    assert primary.calls == 1
+
+    # After the cooldown it is back in rotation
+    primary.stats.cooldown_until = time.monotonic() - 1
+    assert primary.is_healthy()
+
+
+def test_raises_when_every_backend_fails():
+    router = Router([stub("all-a", fail_first=5), stub("all-b", fail_first=5)], hedge=False)
+    with pytest.raises(Exception, match="All backends failed"):
+        router.complete(MESSAGES)
+
+
+def test_hedges_requests_past_the_p90_latency():
+    # Fast for the first 20 calls, then one call hangs
+    primary = stub("hedge-a", latency=lambda call: 0.01 if call <= 20 else 2.0)
+    secondary = stub("hedge-b")
+    for _ in range(20):
+        primary.complete(MESSAGES)
+    router = Router([primary, secondary], hedge_quantile=0.9)
+
+    start = time.monotonic()
+    completion = router.complete(MESSAGES)
+
+    assert completion.backend == secondary.name
+    assert time.monotonic() - start < 1.0
+
+
+def test_does_not_hedge_without_hedging_enabled():
+    primary = stub("nohedge-a", latency=lambda call: 0.01 if call <= 20 else 0.3)
+    secondary = stub("nohedge-b")
+    for _ in range(20):
+        primary.complete(MESSAGES)
+    router = Router([primary, secondary], hedge=False)
+
+    assert router.complete(MESSAGES).backend == primary.name
+    assert secondary.calls == 0
+
+
+def test_get_router_keys_on_router_options():
+    endpoints = [("stub", "stub-options")]
+    hedged = get_router("options-test", endpoints)
+
+    assert get_router("options-test", endpoints) is hedged
+    unhedged = get_router("options-test", endpoints, hedge=False)
+    assert unhedged is not hedged
+    assert not unhedged.hedge
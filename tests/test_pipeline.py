@@ -0,0 +1,89 @@
+import pytest
+
+from pipeline import Pipeline, Stage
+
+
+def writer(path, text, calls, fail=False):
+    """
+    Stage function that appends to `calls` and writes `text` to `path`.
+    """
+    def run():
+        calls.append(path.name)
+        if fail:
+            raise RuntimeError(f"{path.name} broke")
+        path.write_text(text)
+    return run
+
+
+def build(tmp_path, calls, failing=()):
+    # raw -> clean -> tag (optional) -> index, with clean -> index as well
+    source = tmp_path / "source.txt"
+    if not source.exists():
+        source.write_text("raw")
+    paths = {name: tmp_path / f"{name}.txt" for name in ("clean", "tag", "index")}
+    stages = [
+        Stage("clean", writer(paths["clean"], "clean", calls, "clean" in failing),
+              inputs=[str(source)], outputs=[str(paths["clean"])]),
+        Stage("tag", writer(paths["tag"], "tag", calls, "tag" in failing),
+              inputs=[str(paths["clean"])], outputs=[str(paths["tag"])], deps=["clean"], optional=True),
+        Stage("index", writer(paths["index"], "index", calls, "index" in failing),
+              inputs=[str(paths["clean"])], outputs=[str(paths["index"])], deps=["clean", "tag"]),
+    ]
+    return Pipeline(stages, state_file=str(tmp_path / "state.json")), source
+
+
+def test_up_to_date_stages_are_skipped(tmp_path):
+    calls = []
+    pipeline, source = build(tmp_path, calls)
+    assert pipeline.run() == {"clean": "ran", "tag": "ran", "index": "ran"}
+
+    calls.clear()
+    assert pipeline.run() == {"clean": "skipped", "tag": "skipped", "index": "skipped"}
+    assert calls == []
+
+    # Changing an input re-runs the stage and everything downstream of it
+    source.write_text("new raw")
+    assert pipeline.run() == {"clean": "ran", "tag": "ran", "index": "ran"}
+
+
+def test_forced_stages_rerun_with_their_dependents(tmp_path):
+    calls = []
+    pipeline, _ = build(tmp_path, calls)
+    pipeline.run()
+
+    calls.clear()
+    assert pipeline.run(force=["tag"]) == {"clean": "skipped", "tag": "ran", "index": "ran"}
+    assert sorted(calls) == ["index.txt", "tag.txt"]
+
+    calls.clear()
+    pipeline.run(force=["all"])
+    assert sorted(calls) == ["clean.txt", "index.txt", "tag.txt"]
+
+
+def test_failure_blocks_dependents(tmp_path):
+    calls = []
+    pipeline, _ = build(tmp_path, calls, failing={"clean"})
+    with pytest.raises(Exception, match="failed stage\\(s\\): clean, index"):
+        pipeline.run()
+    assert calls == ["clean.txt"]
+
+
+def test_failed_optional_stage_does_not_stop_the_run(tmp_path):
+    calls = []
+    pipeline, _ = build(tmp_path, calls, failing={"tag"})
+    assert pipeline.run() == {"clean": "ran", "tag": "failed", "index": "ran"}
+
+
+def test_blocked_optional_dependency_does_not_hang(tmp_path):
+    # clean fails, so optional tag is blocked; report only needs tag and must still be scheduled
+    calls = []
+    out = {name: tmp_path / f"{name}.txt" for name in ("clean", "tag", "report")}
+    pipeline = Pipeline([
+        Stage("clean", writer(out["clean"], "clean", calls, fail=True), outputs=[str(out["clean"])]),
+        Stage("tag", writer(out["tag"], "tag", calls), outputs=[str(out["tag"])], deps=["clean"], optional=True),
+        Stage("report", writer(out["report"], "report", calls), outputs=[str(out["report"])], deps=["tag"]),
+    ], state_file=str(tmp_path / "state.json"))
+
+    with pytest.raises(Exception, match="failed stage\\(s\\): clean$"):
+        pipeline.run(only=["clean", "tag", "report"])
+    assert calls == ["clean.txt", "report.txt"]
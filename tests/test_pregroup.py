@@ -0,0 +1,80 @@
+import itertools
+import random
+
+from pregroup import UnionFind, build_groups, expand_theme_groups, jaccard, orphaned_members
+
+
+def brute_force_groups(term_sets, threshold):
+    union_find = UnionFind(term_sets)
+    for a, b in itertools.combinations(term_sets, 2):
+        if jaccard(term_sets[a], term_sets[b]) >= threshold:
+            union_find.union(a, b)
+    return sorted(sorted(group) for group in union_find.groups())
+
+
+def test_prefix_filtering_finds_every_similar_pair():
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(200)]
+    weights = [1 / (i + 1) for i in range(200)]
+    term_sets = {str(i): set(rng.choices(vocabulary, weights, k=5)) for i in range(800)}
+
+    for threshold in (0.3, 0.5, 0.8):
+        groups = build_groups(term_sets, threshold, max_df=1.0, max_posting=len(term_sets))
+        assert sorted(sorted(group) for group in groups) == brute_force_groups(term_sets, threshold)
+
+
+def test_common_terms_alone_do_not_join_articles():
+    term_sets = {str(i): {"health", f"topic{i}"} for i in range(20)}
+    groups = build_groups(term_sets, threshold=0.3, max_posting=5)
+    assert all(len(group) == 1 for group in groups)
+
+
+def test_members_of_unassigned_representatives_are_reported():
+    theme_groups = {"Sleep": ["1"]}
+    members_by_rep = {"1": ["2", "3"], "4": ["5"]}
+
+    assert orphaned_members(theme_groups, members_by_rep) == ["5"]
+    assert expand_theme_groups(theme_groups, members_by_rep) == {"Sleep": ["1", "2", "3"]}
+
+
+def test_orphans_join_themes_already_found(monkeypatch):
+    import json
+    import re
+
+    from cluster import Article, cluster_article_records
+    from llm_router import Router, StubBackend, set_router
+    from pregroup import pregroup_articles
+
+    topics = ["sleep apnea", "sleep hygiene", "vision", "hearing", "dental", "skin"]
+    themes = ["Sleep Health", "Sleep Health", "Eye Health", "Hearing", "Oral Health", "Skin Care"]
+    articles, keywords, theme_of = [], {}, {}
+    for group, topic in enumerate(topics):
+        for member in range(3):
+            article_id = str(group * 3 + member)
+            url = f"https://x.org/{article_id}"
+            articles.append(Article(article_id=article_id, summary=f"About {topic}.", url=url))
+            keywords[url] = [f"{topic} basics", f"{topic} risks", f"{topic} care"]
+            theme_of[article_id] = themes[group]
+
+    _, members_by_rep = pregroup_articles(articles, keywords)
+    # The representative of the second sleep group is never assigned
+    failing_rep = next(rep for rep in members_by_rep if rep in {"3", "4", "5"})
+
+    def responder(messages):
+        prompt = messages[-1]["content"].rsplit("existing_themes:", 1)[1]
+        existing = json.loads(prompt.split("new_articles:")[0])
+        ids = re.findall(r'"article_id": "(\d+)"', prompt)
+        # Without the themes found so far, the model invents a new name for the second sleep group
+        name = lambda i: "Sleep Quality" if i in {"3", "4", "5"} and "Sleep Health" not in existing else theme_of[i]
+        return json.dumps({"doc_to_theme": {i: name(i) for i in ids if i != failing_rep}})
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    set_router("cluster", Router([StubBackend("stub-orphans", responder=responder)], hedge=False))
+    try:
+        theme_groups, _ = cluster_article_records(articles, batch_size=1, document_keywords=keywords)
+    finally:
+        set_router("cluster", None)
+
+    assert "Sleep Quality" not in theme_groups
+    assert sorted(theme_groups["Sleep Health"], key=int) == ["0", "1", "2"] + sorted(
+        {"3", "4", "5"} - {failing_rep}, key=int)
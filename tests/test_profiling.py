@@ -0,0 +1,61 @@
+import json
+import pstats
+import threading
+import time
+
+import pytest
+
+from profiling import StageProfiler
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def waiting_worker(seconds):
+    time.sleep(seconds)
+
+
+def stage():
+    worker = threading.Thread(target=waiting_worker, args=(0.1,), name="pool-worker")
+    worker.start()
+    busy_loop(0.1)
+    worker.join()
+    return "done"
+
+
+def test_wrapped_stage_is_timed_profiled_and_sampled(tmp_path, capsys):
+    profiler = StageProfiler(str(tmp_path), sample_interval=0.002, top=5)
+
+    assert profiler.wrap("tag", stage)() == "done"
+
+    timing = profiler.timings["tag"]
+    assert timing["wall"] >= 0.1
+    assert timing["cpu_thread"] > 0.02
+    assert timing["samples"] > 0
+
+    # cProfile only sees the stage's own thread ...
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / "tag.pstats")).stats}
+    assert "busy_loop" in functions
+    assert "waiting_worker" not in functions
+    # ... while the sampled stacks include the worker thread
+    collapsed = (tmp_path / "tag.collapsed").read_text()
+    assert any(line.startswith("pool-worker;") and "waiting_worker" in line for line in collapsed.splitlines())
+
+    profiler.report()
+    assert set(json.loads((tmp_path / "timings.json").read_text())) == {"tag"}
+    assert "busy_loop" in capsys.readouterr().out
+
+
+def test_failing_stage_is_still_timed(tmp_path):
+    profiler = StageProfiler(str(tmp_path))
+
+    def broken():
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError):
+        profiler.wrap("clean", broken)()
+    assert "clean" in profiler.timings
+    assert (tmp_path / "clean.pstats").exists()
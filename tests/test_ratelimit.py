@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pandas as pd
+
+from llm_router import Router, StubBackend, set_router
+from ratelimit import RateLimiter
+
+
+def test_concurrent_callers_stay_within_both_budgets():
+    limiter = RateLimiter(requests_per_minute=5, max_concurrency=2, window=0.5)
+    starts, in_flight, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with limiter:
+            with lock:
+                starts.append(time.monotonic())
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+    starts.sort()
+    # Any 6 consecutive starts span at least one window (less scheduling jitter)
+    assert all(starts[i + 5] - starts[i] >= 0.45 for i in range(len(starts) - 5))
+
+
+def slow_first_router(name, reply):
+    """
+    Router whose replies for early articles take longest, so calls finish in
+    reverse order.
+    """
+    def responder(messages):
+        number = int(messages[-1]["content"].rsplit("article ", 1)[1].split()[0])
+        time.sleep(0.01 * (8 - number))
+        return reply(number)
+    return Router([StubBackend(f"stub-order-{name}", responder=responder)], hedge=False)
+
+
+def test_results_follow_row_order():
+    from summarizer import summarize_article_with_rate_limits
+    from tagger import article_tagger
+
+    df = pd.DataFrame({
+        "Link": [f"https://x.org/{i}" for i in range(8)],
+        "Content": [f"Text of article {i} here." for i in range(8)],
+    })
+    set_router("tag", slow_first_router("tag", lambda n: f"k{n}, common"))
+    set_router("summarize", slow_first_router("summarize", lambda n: f"Summary {n}."))
+    try:
+        keywords = article_tagger(df, max_workers=4)
+        summarized = summarize_article_with_rate_limits(df.copy(), max_workers=4)
+    finally:
+        set_router("tag", None)
+        set_router("summarize", None)
+
+    assert list(keywords.items()) == [(f"https://x.org/{i}", [f"k{i}", "common"]) for i in range(8)]
+    assert list(summarized["Summary"]) == [f"Summary {i}." for i in range(8)]
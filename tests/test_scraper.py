@@ -0,0 +1,114 @@
+import io
+
+import pytest
+
+import scraper
+
+SITEMAP_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+class FakeResponse:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def documents(monkeypatch):
+    """
+    URL → XML text served by the stream opener instead of the network.
+    """
+    served = {}
+
+    def open_stream(url):
+        if url not in served:
+            raise scraper.requests.RequestException(f"404 for {url}")
+        return FakeResponse(), io.BytesIO(served[url].encode())
+
+    monkeypatch.setattr(scraper, "_open_xml_stream", open_stream)
+    return served
+
+
+def urlset(*entries):
+    body = "".join(
+        f"<url><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0"?><urlset {SITEMAP_NS}>{body}</urlset>'
+
+
+def test_parse_sitemap_reads_a_urlset(documents):
+    documents["https://x.org/sitemap.xml"] = urlset(("https://x.org/health/a/", "2026-01-01"),
+                                                     ("https://x.org/health/b/", None))
+    assert list(scraper.parse_sitemap("https://x.org/sitemap.xml")) == [
+        ("https://x.org/health/a/", "2026-01-01"), ("https://x.org/health/b/", None),
+    ]
+
+
+def test_parse_sitemap_follows_a_sitemap_index(documents):
+    documents["https://x.org/index.xml"] = (
+        f'<sitemapindex {SITEMAP_NS}>'
+        "<sitemap><loc>https://x.org/one.xml</loc><lastmod>2026-01-02</lastmod></sitemap>"
+        "<sitemap><loc>https://x.org/two.xml</loc></sitemap>"
+        "</sitemapindex>"
+    )
+    documents["https://x.org/one.xml"] = urlset(("https://x.org/health/a/", "2026-01-01"))
+    documents["https://x.org/two.xml"] = urlset(("https://x.org/health/b/", "2026-01-03"))
+
+    assert list(scraper.parse_sitemap("https://x.org/index.xml")) == [
+        ("https://x.org/health/a/", "2026-01-01"), ("https://x.org/health/b/", "2026-01-03"),
+    ]
+
+
+def test_parse_feed_reads_rss_and_atom(documents):
+    documents["https://x.org/rss"] = (
+        "<rss><channel><link>https://x.org/</link>"
+        "<item><link>https://x.org/health/a/</link><pubDate>Mon, 05 Jan 2026</pubDate></item>"
+        "<item><link>https://x.org/health/b/</link></item>"
+        "</channel></rss>"
+    )
+    documents["https://x.org/atom"] = (
+        '<feed xmlns="http://www.w3.org/2005/Atom"><link href="https://x.org/"/>'
+        '<entry><link href="https://x.org/health/c/"/><updated>2026-01-06</updated></entry>'
+        "</feed>"
+    )
+    assert list(scraper.parse_feed("https://x.org/rss")) == [
+        ("https://x.org/health/a/", "Mon, 05 Jan 2026"), ("https://x.org/health/b/", None),
+    ]
+    assert list(scraper.parse_feed("https://x.org/atom")) == [("https://x.org/health/c/", "2026-01-06")]
+
+
+def test_discovery_reports_new_and_changed_articles(documents, monkeypatch, tmp_path):
+    monkeypatch.setattr(scraper, "find_sitemaps_and_feeds", lambda base_url: (["https://x.org/sitemap.xml"], []))
+    state_file = str(tmp_path / "sitemap_state.json")
+    output_file = str(tmp_path / "links.txt")
+    documents["https://x.org/sitemap.xml"] = urlset(
+        ("https://x.org/health/a/", "2026-01-01"), ("https://x.org/health/b/", None),
+        ("https://x.org/news/c/", "2026-01-01"),
+    )
+
+    links, changed, lastmods = scraper.discover_article_links("https://x.org/health", output_file, state_file)
+    assert links == changed == {"https://x.org/health/a/", "https://x.org/health/b/"}
+    scraper.save_sitemap_state(lastmods, state_file)
+
+    documents["https://x.org/sitemap.xml"] = urlset(
+        ("https://x.org/health/a/", "2026-02-01"), ("https://x.org/health/b/", None),
+        ("https://x.org/health/d/", "2026-02-01"),
+    )
+    links, changed, _ = scraper.discover_article_links("https://x.org/health", output_file, state_file)
+    assert links == {"https://x.org/health/a/", "https://x.org/health/b/", "https://x.org/health/d/"}
+    # b has no lastmod, so it only counted as changed when first seen
+    assert changed == {"https://x.org/health/a/", "https://x.org/health/d/"}
+
+
+def test_sitemap_mode_falls_back_to_crawling(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    crawled = {"https://x.org/health/a/", "https://x.org/health/b/"}
+    monkeypatch.setattr(scraper, "discover_article_links", lambda link, state_file: (set(), set(), {}))
+    monkeypatch.setattr(scraper, "extract_article_Links", lambda link: crawled)
+    monkeypatch.setattr(scraper, "get_content_from_link", lambda link, df: df.loc.__setitem__(len(df), [link, "text"]))
+
+    df = scraper.extract_article_content("https://x.org/health", "sitemap", results_dir=str(tmp_path / "results"))
+
+    assert sorted(df["Link"]) == sorted(crawled)
+    assert (tmp_path / "results" / "health_articles.csv").exists()
+    assert not (tmp_path / "results" / "sitemap_state.json").exists()
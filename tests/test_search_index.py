@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from search_index import build_index, search
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    (tmp_path / "articles.csv").write_text(
+        "Id,Link,Content\n"
+        "0,https://x.org/0,Text\n"
+        "1,https://x.org/1,Text\n"
+        "2,https://x.org/2,Text\n"
+    )
+    (tmp_path / "keywords.json").write_text(json.dumps({
+        "https://x.org/0": ["heart disease", "blood pressure"],
+        "https://x.org/1": ["blood pressure", "salt"],
+        "https://x.org/2": ["sleep"],
+    }))
+    (tmp_path / "themes.json").write_text(json.dumps({"Heart Health": ["0", "1"], "Sleep Health": ["2"]}))
+    index_file = str(tmp_path / "index.sqlite")
+    counts = build_index(str(tmp_path / "articles.csv"), str(tmp_path / "keywords.json"),
+                         str(tmp_path / "themes.json"), index_file)
+    assert counts["articles"] == 3 and counts["themes"] == 2
+    return index_file
+
+
+def test_articles_matching_keywords_and_theme_rank_first(index_file):
+    results = search("heart", index_file=index_file)
+    # Article 0 matches by keyword and theme, article 1 by theme only
+    assert [(r["id"], r["score"]) for r in results] == [(0, 3), (1, 1)]
+    assert results[0]["link"] == "https://x.org/0"
+    assert results[0]["themes"] == ["Heart Health"]
+    assert results[0]["keywords"] == ["heart disease", "blood pressure"]
+
+
+def test_every_query_term_must_match(index_file):
+    # Query terms are stemmed like the indexed keywords
+    assert [(r["id"], r["score"]) for r in search("blood pressures", index_file=index_file)] == [(0, 2), (1, 2)]
+    assert search("blood sleep", index_file=index_file) == []
+
+
+def test_themes_for_keyword(index_file):
+    assert search(keyword="blood pressure", index_file=index_file) == [
+        {"theme": "Heart Health", "articles": 2, "size": 2},
+    ]
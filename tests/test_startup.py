@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing main must stay well under a second. The time is measured inside a
+# fresh interpreter, so the interpreter's own startup is not counted
+IMPORT_BUDGET = 0.5
+HEAVY_MODULES = ("pandas", "groq", "langchain", "bs4", "pydantic", "tqdm")
+
+
+def imported_modules(statement):
+    """
+    Run a statement in a fresh interpreter from the repository root.
+
+    Returns:
+        Tuple of (seconds the statement took, top-level module names loaded afterwards)
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'elapsed': elapsed, 'modules': sorted({m.split('.')[0] for m in sys.modules})}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout.strip().splitlines()[-1])
+    return output["elapsed"], set(output["modules"])
+
+
+def heavy(modules):
+    # langchain also matches langchain_community, langchain_openai, ...
+    return sorted(m for m in modules if m.startswith(HEAVY_MODULES))
+
+
+def test_import_main_within_budget():
+    elapsed, _ = imported_modules("import main")
+    assert elapsed < IMPORT_BUDGET, f"import main took {elapsed:.3f}s"
+
+
+def test_import_main_loads_no_heavy_modules():
+    _, modules = imported_modules("import main")
+    assert heavy(modules) == []
+
+
+def test_building_the_pipeline_loads_no_stage_modules():
+    # Planning a stage such as clean or aggregate must not pull in the LLM stages
+    _, modules = imported_modules("import main; main.build_pipeline()")
+    assert heavy(modules) == []
+    assert not modules & {"summarizer", "tagger", "cluster"}
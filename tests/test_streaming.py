@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import streaming
+import tagger
+
+
+def test_chunked_peak_rss_stays_within_bound():
+    eager, chunked = streaming.benchmark_peak_rss(n_articles=6000, chunk_size=200, content_chars=4000)
+
+    assert chunked["peak_rss_mb"] <= chunked["bound_mb"]
+    # Only the per-article cluster records may grow with the archive
+    assert chunked["growth_kb_per_article"] <= streaming.RECORD_BYTES / 1024
+    assert chunked["ok"]
+    assert chunked["peak_rss_mb"] < eager["peak_rss_mb"]
+
+
+def test_chunked_bound_scales_with_chunk_size():
+    small = streaming.chunked_rss_bound_mb(10000, 100, 6000)
+    large = streaming.chunked_rss_bound_mb(10000, 1000, 6000)
+    assert large - small == pytest.approx(streaming.CHUNK_COPIES * 900 * 6000 / 2 ** 20)
+
+
+def write_cleaned(path, links):
+    pd.DataFrame({"Link": links, "Content": [f"Text {i}" for i in range(len(links))]}).to_csv(path, index=False)
+
+
+def test_stream_tag_skips_links_already_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(tagger, "article_tagger",
+                        lambda chunk: {link: [content] for link, content in zip(chunk["Link"], chunk["Content"])})
+    write_cleaned(tmp_path / "cleaned.csv", ["a", "b", "c", "a"])
+
+    assert streaming.stream_tag(str(tmp_path / "cleaned.csv"), str(tmp_path / "keywords.json"), chunk_size=2) == 3
+    with open(tmp_path / "keywords.json") as f:
+        assert json.load(f) == {"a": ["Text 0"], "b": ["Text 1"], "c": ["Text 2"]}
+
+
+def test_stream_tag_failure_keeps_the_previous_output(tmp_path, monkeypatch):
+    calls = []
+
+    def failing_tagger(chunk):
+        calls.append(len(chunk))
+        if len(calls) == 2:
+            raise RuntimeError("tagging failed")
+        return {link: ["k"] for link in chunk["Link"]}
+
+    monkeypatch.setattr(tagger, "article_tagger", failing_tagger)
+    write_cleaned(tmp_path / "cleaned.csv", ["a", "b", "c"])
+    (tmp_path / "keywords.json").write_text('{"old": ["k"]}')
+
+    with pytest.raises(RuntimeError):
+        streaming.stream_tag(str(tmp_path / "cleaned.csv"), str(tmp_path / "keywords.json"), chunk_size=2)
+    assert (tmp_path / "keywords.json").read_text() == '{"old": ["k"]}'
@@ -0,0 +1,55 @@
+import pytest
+
+from structured_output import parse_json_object, repair_json
+
+
+def test_repair_leaves_string_contents_alone():
+    reply = '{"doc_to_theme": {"1": "Heart, Brain: Health", "2": "Sleep",}}'
+    assert parse_json_object(reply) == {"doc_to_theme": {"1": "Heart, Brain: Health", "2": "Sleep"}}
+
+
+def test_repair_quotes_unquoted_keys_and_python_literals():
+    reply = '{doc_to_theme: {1: "Falls, None: True"}, ok: True, note: None}'
+    assert parse_json_object(reply) == {"doc_to_theme": {"1": "Falls, None: True"}, "ok": True, "note": None}
+
+
+def test_prose_after_the_object_is_ignored():
+    reply = 'Here you go: {"doc_to_theme": {"1": "Sleep"}} Example of the format: {"2": "Diet"}'
+    assert parse_json_object(reply) == {"doc_to_theme": {"1": "Sleep"}}
+
+
+def test_braces_inside_strings_do_not_end_the_object():
+    assert parse_json_object('{"a": "x } y", "b": 1} trailing }') == {"a": "x } y", "b": 1}
+
+
+def test_truncated_reply_keeps_complete_entries():
+    reply = '```json\n{"doc_to_theme": {"1": "Sleep", "2": "Heart Hea'
+    assert parse_json_object(reply) == {"doc_to_theme": {"1": "Sleep"}}
+
+
+def test_unparseable_reply_raises():
+    with pytest.raises(ValueError):
+        parse_json_object("no object here")
+
+
+def test_repair_strips_trailing_commas_outside_strings_only():
+    assert repair_json('{"a": ",}", "b": [1, 2,],}') == '{"a": ",}", "b": [1, 2]}'
+
+
+def test_no_backoff_after_the_last_attempt(monkeypatch):
+    import cluster
+
+    class FailingLLM:
+        def complete(self, messages, **options):
+            raise Exception("provider down")
+
+    sleeps = []
+    monkeypatch.setattr(cluster.time, "sleep", sleeps.append)
+    batches = [[cluster.Article(article_id="1", summary="Walking helps.")]]
+
+    _, article_to_theme = cluster.process_batches(
+        batches, set(), {}, FailingLLM(), "{existing_themes_json} {new_articles_json}", max_attempts=3,
+    )
+
+    assert article_to_theme == {}
+    assert sleeps == [1, 2]
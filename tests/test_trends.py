@@ -0,0 +1,35 @@
+import json
+
+import trends
+
+
+def write_clusters(path, themes):
+    with open(path, "w") as f:
+        json.dump({name: {"links": links, "count": len(links)} for name, links in themes.items()}, f)
+
+
+def test_identical_results_are_recorded_once(tmp_path):
+    clusters = tmp_path / "cluster_results.json"
+    history = tmp_path / "history"
+    write_clusters(clusters, {"Sleep": ["https://www.aarp.org/health/a/"]})
+
+    first = trends.record_run(str(clusters), str(history), run_time=1000)
+    again = trends.record_run(str(clusters), str(history), run_time=2000)
+
+    assert again == first
+    assert len(trends.load_index(str(history))) == 1
+
+
+def test_runs_in_the_same_second_get_unique_ordered_ids(tmp_path):
+    clusters = tmp_path / "cluster_results.json"
+    history = tmp_path / "history"
+    runs = []
+    for i in range(3):
+        write_clusters(clusters, {"Sleep": [f"https://www.aarp.org/health/{i}/"]})
+        runs.append(trends.record_run(str(clusters), str(history), run_time=1000)["run"])
+    write_clusters(clusters, {"Diet": ["https://www.aarp.org/health/3/"]})
+    runs.append(trends.record_run(str(clusters), str(history), run_time=1001)["run"])
+
+    assert len(set(runs)) == 4
+    assert runs == sorted(runs)
+    assert [entry["run"] for entry in trends.load_index(str(history))] == runs
@@ -0,0 +1,55 @@
+import re
+
+# Text normalization shared by the search index, keyword pre-grouping,
+# theme-name merging and extractive summaries: stopwords, a crude suffix
+# stemmer and term extraction.
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "of", "on", "or", "the", "to", "with", "your", "you", "about", "how", "what", "why",
+}
+
+# Suffixes stripped by `stem`, longest first
+SUFFIXES = ("ational", "ization", "fulness", "iveness", "ations", "ation", "ities", "ments", "ness",
+            "ment", "ings", "ing", "ies", "ity", "ers", "al", "ed", "er", "es", "ly", "s")
+
+
+def stem(word):
+    """
+    Reduce a word to a crude stem by stripping common English suffixes, so that
+    e.g. "vaccines", "vaccination" and "vaccine" share a term.
+
+    Args:
+        word (str): Lower-case word
+
+    Returns:
+        str: Stemmed word
+    """
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[: -len(suffix)]
+            break
+    # "vaccin" and "vaccine" should match, so drop a trailing e as well
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def normalize_terms(text):
+    """
+    Split text into normalized, stemmed index terms.
+
+    Args:
+        text (str): Keyword, theme name or query
+
+    Returns:
+        list: Unique terms in order of appearance
+    """
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        term = stem(word)
+        if term not in terms:
+            terms.append(term)
+    return terms
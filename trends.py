@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+import time
+
+from utils import canonicalize_url
+
+# Theme history across pipeline runs. Every run's theme → links mapping is
+# appended to a month-partitioned store, and each theme gets a stable id by
+# matching its members against the previous run, so counts stay comparable
+# when the LLM renames a theme.
+#
+#   results/history/index.jsonl               one line per run: run id, time, digest, theme id → count
+#   results/history/themes.json               theme id → current name, names seen, first/last run
+#   results/history/2026-10/20261019T031500.json   theme id → name and links of that run
+#
+# Diffs and series only read index.jsonl, so a year of nightly runs is a few
+# hundred short lines; the partition files are read when matching a new run.
+
+DEFAULT_HISTORY_DIR = "results/history"
+INDEX_FILE = "index.jsonl"
+REGISTRY_FILE = "themes.json"
+
+
+def load_index(history_dir=DEFAULT_HISTORY_DIR):
+    """
+    Load the run index.
+
+    Args:
+        history_dir (str): History directory
+
+    Returns:
+        list: Run entries, oldest first
+    """
+    path = os.path.join(history_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_registry(history_dir=DEFAULT_HISTORY_DIR):
+    """
+    Load the theme registry.
+
+    Args:
+        history_dir (str): History directory
+
+    Returns:
+        dict: Theme id → {"name", "names", "first_run", "last_run"}
+    """
+    path = os.path.join(history_dir, REGISTRY_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_json_atomic(data, path):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_run_members(history_dir, entry):
+    """
+    Load the member links of every theme in a recorded run.
+
+    Args:
+        history_dir (str): History directory
+        entry (dict): Run entry from the index
+
+    Returns:
+        dict: Theme id → set of canonical links
+    """
+    with open(os.path.join(history_dir, entry["path"]), "r") as f:
+        return {theme_id: set(theme["links"]) for theme_id, theme in json.load(f).items()}
+
+
+def match_themes(current, previous, threshold=0.3):
+    """
+    Match this run's themes to the previous run's theme ids by member overlap.
+
+    Pairs are compared only when they share a link (found through a link →
+    theme id lookup) and are matched greedily from the highest Jaccard
+    similarity down, so every id is used at most once.
+
+    Args:
+        current (dict): Theme name → set of links in this run
+        previous (dict): Theme id → set of links in the previous run
+        threshold (float): Minimum Jaccard similarity for a match
+
+    Returns:
+        dict: Theme name → matched theme id (unmatched names are left out)
+    """
+    owner = {}
+    for theme_id, links in previous.items():
+        for link in links:
+            owner.setdefault(link, []).append(theme_id)
+
+    candidates = []
+    for name, links in current.items():
+        shared = {}
+        for link in links:
+            for theme_id in owner.get(link, ()):
+                shared[theme_id] = shared.get(theme_id, 0) + 1
+        for theme_id, overlap in shared.items():
+            similarity = overlap / (len(links) + len(previous[theme_id]) - overlap)
+            if similarity >= threshold:
+                candidates.append((similarity, name, theme_id))
+
+    matches, used = {}, set()
+    for _, name, theme_id in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        if name not in matches and theme_id not in used:
+            matches[name] = theme_id
+            used.add(theme_id)
+    return matches
+
+
+def record_run(clusters_json, history_dir=DEFAULT_HISTORY_DIR, threshold=0.3, run_time=None):
+    """
+    Append a run's theme assignments to the history.
+
+    Themes matching a theme of the previous run by member overlap keep its id.
+    Otherwise a theme whose name was seen before gets that id back, and any
+    remaining theme gets a new id. A cluster_results.json identical to the
+    last recorded one (e.g. after `run --force aggregate`) is not recorded again.
+
+    Args:
+        clusters_json (str): cluster_results.json of the run (theme → links and count)
+        history_dir (str): History directory
+        threshold (float): Minimum Jaccard similarity of members to keep a theme id
+        run_time (float): Time of the run as a Unix timestamp; defaults to now
+
+    Returns:
+        dict: The appended index entry, or the last one if the file was already recorded
+    """
+    with open(clusters_json, "rb") as f:
+        raw = f.read()
+    current = {name: {canonicalize_url(link) for link in theme["links"]} for name, theme in json.loads(raw).items()}
+    if not current:
+        raise Exception(f"{clusters_json} holds no themes")
+
+    index = load_index(history_dir)
+    digest = hashlib.sha256(raw).hexdigest()
+    if index and index[-1].get("digest") == digest:
+        print(f"{clusters_json} is unchanged since run {index[-1]['run']}; not recorded again")
+        return index[-1]
+    registry = load_registry(history_dir)
+    previous = load_run_members(history_dir, index[-1]) if index else {}
+    matches = match_themes(current, previous, threshold)
+
+    used = set(matches.values())
+    by_name = {}
+    for theme_id, theme in registry.items():
+        for name in theme["names"]:
+            by_name.setdefault(name.lower(), theme_id)
+    next_number = max((int(theme_id[1:]) for theme_id in registry), default=0) + 1
+    for name in sorted(current):
+        if name in matches:
+            continue
+        theme_id = by_name.get(name.lower())
+        if theme_id is None or theme_id in used:
+            theme_id = f"T{next_number:05d}"
+            next_number += 1
+        matches[name] = theme_id
+        used.add(theme_id)
+
+    run_time = time.time() if run_time is None else run_time
+    run_id = time.strftime("%Y%m%dT%H%M%S", time.gmtime(run_time))
+    if index and run_id < index[-1]["run"][:len(run_id)]:
+        raise Exception(f"Run {run_id} is older than the last recorded run {index[-1]['run']}")
+    # Runs recorded within the same second get a counter suffix, which keeps
+    # the ids unique and in order
+    if index and index[-1]["run"].startswith(run_id):
+        last = index[-1]["run"][len(run_id) + 1:]
+        run_id = f"{run_id}-{int(last or 1) + 1:02d}"
+    partition = time.strftime("%Y-%m", time.gmtime(run_time))
+    os.makedirs(os.path.join(history_dir, partition), exist_ok=True)
+    path = os.path.join(partition, f"{run_id}.json")
+    _write_json_atomic(
+        {theme_id: {"name": name, "links": sorted(current[name])} for name, theme_id in matches.items()},
+        os.path.join(history_dir, path),
+    )
+
+    for name, theme_id in matches.items():
+        theme = registry.setdefault(theme_id, {"name": name, "names": [], "first_run": run_id})
+        theme["name"] = name
+        if name not in theme["names"]:
+            theme["names"].append(name)
+        theme["last_run"] = run_id
+    _write_json_atomic(registry, os.path.join(history_dir, REGISTRY_FILE))
+
+    entry = {
+        "run": run_id, "time": run_time, "path": path, "digest": digest,
+        "counts": {theme_id: len(current[name]) for name, theme_id in sorted(matches.items(), key=lambda m: m[1])},
+    }
+    # The index is only ever appended to; the line is written in one call
+    with open(os.path.join(history_dir, INDEX_FILE), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+    carried = len(current) - sum(1 for theme_id in matches.values() if registry[theme_id]["first_run"] == run_id)
+    print(f"Recorded run {run_id}: {len(current)} themes, {carried} carried over from earlier runs")
+    return entry
+
+
+def resolve_run(index, ref):
+    """
+    Find a run by id, id prefix (e.g. a date "20261019") or position ("-1" is
+    the latest run, "-2" the one before).
+
+    Args:
+        index (list): Run entries
+        ref (str): Run reference
+
+    Returns:
+        dict: Run entry
+    """
+    if not index:
+        raise Exception("No runs recorded yet")
+    try:
+        return index[int(ref)]
+    except ValueError:
+        pass
+    except IndexError:
+        raise Exception(f"Only {len(index)} runs recorded")
+    # Prefixes pick the latest matching run, e.g. the last run of a day
+    for entry in reversed(index):
+        if entry["run"].startswith(ref):
+            return entry
+    raise Exception(f"No recorded run matches '{ref}'")
+
+
+def diff_runs(old, new, min_change=1):
+    """
+    Compare theme volumes between two runs.
+
+    Args:
+        old (dict): Earlier run entry
+        new (dict): Later run entry
+        min_change (int): Minimum change in article count to report a theme as
+            growing or shrinking
+
+    Returns:
+        dict: "new", "gone", "growing" and "shrinking" lists of
+            (theme id, old count, new count), largest changes first
+    """
+    before, after = old["counts"], new["counts"]
+    report = {"new": [], "gone": [], "growing": [], "shrinking": []}
+    for theme_id in before.keys() | after.keys():
+        a, b = before.get(theme_id, 0), after.get(theme_id, 0)
+        if theme_id not in before:
+            report["new"].append((theme_id, a, b))
+        elif theme_id not in after:
+            report["gone"].append((theme_id, a, b))
+        elif b - a >= min_change:
+            report["growing"].append((theme_id, a, b))
+        elif a - b >= min_change:
+            report["shrinking"].append((theme_id, a, b))
+    for key, rows in report.items():
+        rows.sort(key=lambda row: (-abs(row[2] - row[1]), row[0]))
+    return report
+
+
+def find_themes(registry, query):
+    """
+    Find theme ids by id or by a case-insensitive substring of any of their names.
+
+    Args:
+        registry (dict): Theme registry
+        query (str): Theme id or name fragment
+
+    Returns:
+        list: Matching theme ids
+    """
+    if query in registry:
+        return [query]
+    query = query.lower()
+    return sorted(theme_id for theme_id, theme in registry.items()
+                  if any(query in name.lower() for name in theme["names"]))
+
+
+def theme_series(index, theme_ids, period=None):
+    """
+    Article counts of themes over the recorded runs.
+
+    Args:
+        index (list): Run entries
+        theme_ids (list): Theme ids to follow
+        period (str): None for one point per run, "day" or "month" for the mean
+            count per calendar period (UTC)
+
+    Returns:
+        list: (run id or period, {theme id: count}) tuples, oldest first
+    """
+    if period is None:
+        return [(entry["run"], {t: entry["counts"].get(t, 0) for t in theme_ids}) for entry in index]
+
+    width = {"day": 8, "month": 6}[period]
+    buckets = {}
+    for entry in index:
+        bucket = buckets.setdefault(entry["run"][:width], {"runs": 0, "totals": dict.fromkeys(theme_ids, 0)})
+        bucket["runs"] += 1
+        for theme_id in theme_ids:
+            bucket["totals"][theme_id] += entry["counts"].get(theme_id, 0)
+    return [(key, {t: total / bucket["runs"] for t, total in bucket["totals"].items()})
+            for key, bucket in buckets.items()]
+
+
+def print_diff(report, registry, old, new):
+    """
+    Print a diff report from diff_runs.
+    """
+    print(f"Themes from run {old['run']} ({len(old['counts'])} themes) to {new['run']} ({len(new['counts'])} themes)")
+    for key in ("new", "growing", "shrinking", "gone"):
+        rows = report[key]
+        print(f"\n{key.capitalize()} ({len(rows)}):")
+        for theme_id, a, b in rows:
+            print(f"  {theme_id}  {a:>5} → {b:<5} {b - a:+5}  {registry.get(theme_id, {}).get('name', '?')}")
+
+
+def print_series(series, theme_ids, registry):
+    """
+    Print a series from theme_series as a table with one column per theme.
+    """
+    for theme_id in theme_ids:
+        print(f"{theme_id}: {registry[theme_id]['name']}")
+    print(f"{'run':<18}" + "".join(f"{theme_id:>9}" for theme_id in theme_ids))
+    for key, counts in series:
+        print(f"{key:<18}" + "".join(f"{counts[theme_id]:>9.4g}" for theme_id in theme_ids))
@@ -1,8 +1,6 @@
 import json
 import os
-from dotenv import load_dotenv
-from groq import Groq
-from langchain_community.chat_models import ChatOpenAI
+from urllib.parse import urlsplit, urlunsplit
 
 
 
@@ -18,6 +16,11 @@ def validate_api_keys(groq_api_key, openai_api_key):
     Raises:
         Exception: If either API key is invalid
     """
+    # Imported here so that commands which never talk to an LLM do not pay
+    # for loading the groq and langchain packages
+    from groq import Groq
+    from langchain_community.chat_models import ChatOpenAI
+
     # Validate the Groq API key with a simple test call
     try:
         groq_client = Groq(api_key=groq_api_key)
@@ -46,15 +49,21 @@ def validate_api_keys(groq_api_key, openai_api_key):
 
 
 
-def load_env_variables():
+def load_env_variables(validate=True):
     """
     Load environment variables from a specific .env file located in the same
-    directory as the script, and validate the API keys with a test call.
+    directory as the script, and optionally validate the API keys with a test call.
+    
+    Args:
+        validate (bool): Make a live test call to both APIs. When False the keys
+            are only checked for presence, which keeps startup offline and fast.
     
     Returns:
         dict: Dictionary containing API keys and other environment variables
     """
     try:
+        from dotenv import load_dotenv
+
         # Get the directory where the script is located
         script_dir = os.path.dirname(os.path.abspath(__file__))
         
@@ -81,7 +90,8 @@ def load_env_variables():
             raise Exception(f"OPENAI_API_KEY not found in .env file at {env_path}")
             
         # Validate both API keys using the separate validation function
-        validate_api_keys(groq_api_key, openai_api_key)
+        if validate:
+            validate_api_keys(groq_api_key, openai_api_key)
         
         return {
             "groq_api_key": groq_api_key,
@@ -95,13 +105,14 @@ def load_env_variables():
         
 
 
-def create_document_to_theme_count_mapping_json(df,themes_json_path):
+def create_document_to_theme_count_mapping_json(df,themes_json_path, output_file='results/cluster_results.json'):
     """
     Create a mapping of themes to document links and counts.
     
     Args:
         df (DataFrame): DataFrame containing article data
         themes_json_path (str): Path to the JSON file with theme data
+        output_file (str): Path of the theme → links/count JSON to write
     """
     try:
         with open(themes_json_path, 'r') as file:
@@ -121,7 +132,6 @@ def create_document_to_theme_count_mapping_json(df,themes_json_path):
                 'count': len(links)
             }
 
-        output_file = 'results/cluster_results.json'
         with open(output_file, 'w') as file:
             json.dump(theme_mapping, file, indent=2)
 
@@ -131,7 +141,7 @@ def create_document_to_theme_count_mapping_json(df,themes_json_path):
         print(f"Error creating theme mapping: {e}")
         # Create a minimal output file to prevent downstream errors
         try:
-            with open('results/cluster_results.json', 'w') as file:
+            with open(output_file, 'w') as file:
                 json.dump({}, file)
             print("Created empty mapping file due to error")
         except:
@@ -160,5 +170,22 @@ def dump_json(data, file_path):
     except Exception as e:
         print(f"Error saving JSON to {file_path}: {e}")
 
-\
 
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so that the same page always maps to the same string:
+    lower-case scheme and host, no fragment, no default port, and a non-empty path.
+    
+    Args:
+        url (str): URL to normalize
+        
+    Returns:
+        str: Canonical URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))